@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lambdas.process_bronze_to_silver.src.processor import BronzeToSilverProcessor
+
+OBJECTS = 250
+# Typical first-byte latency of a small S3 GET from Lambda in the same region.
+GET_LATENCY_MS = 20
+WORKERS = [1, 4, 16, 32]
+
+
+class LatentS3Service:
+    # Stands in for S3Service; each GET only waits, like a real one waiting on the network.
+    def __init__(self, latency):
+        self.latency = latency
+        self.logger = MagicMock()
+
+    def load_json(self, bucket, key):
+        time.sleep(self.latency)
+        return {"id": key.rsplit("/", 1)[-1][:-5], "title": "Movie"}
+
+
+def main():
+    keys = [f"bronze/2025-01-01/tt{i:07d}.json" for i in range(OBJECTS)]
+    s3_service = LatentS3Service(GET_LATENCY_MS / 1000)
+
+    print(f"Loading {OBJECTS} bronze objects at {GET_LATENCY_MS} ms per GET")
+    print(f"{'workers':>7} | {'wall time':>9} | {'speed-up':>8}")
+    baseline = None
+    for workers in WORKERS:
+        processor = BronzeToSilverProcessor(s3_service, "source", "target", max_workers=workers)
+        start = time.perf_counter()
+        result = processor.load_many(keys)
+        elapsed = time.perf_counter() - start
+        assert [key for key, _ in result] == keys
+        baseline = baseline or elapsed
+        print(f"{workers:>7} | {elapsed:>8.2f}s | {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
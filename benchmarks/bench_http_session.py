@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import time
+import threading
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lambdas.enrich_and_store_movies.src.omdb_service import OMDBService
+from lambdas.enrich_and_store_movies.src.http_session import get_session
+
+CALLS = 200
+# Simulated per-connection setup cost (DNS + TCP + TLS to a remote API); 0 is plain loopback.
+CONNECT_DELAYS_MS = [0, 20]
+
+OMDB_PAYLOAD = json.dumps({
+    "Title": "The Shawshank Redemption", "Year": "1994", "Runtime": "142 min",
+    "imdbRating": "9.3", "imdbVotes": "2,900,000", "Response": "True"
+}).encode("utf-8")
+
+
+def make_handler(connect_delay):
+    class OMDbStandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            time.sleep(connect_delay)
+            super().setup()
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(OMDB_PAYLOAD)))
+            self.end_headers()
+            self.wfile.write(OMDB_PAYLOAD)
+
+        def log_message(self, *args):
+            pass
+
+    return OMDbStandIn
+
+
+class PerCallSession:
+    # Previous behaviour: module-level requests.get opens a new connection every call.
+    def get(self, url, timeout):
+        return requests.get(url, timeout=timeout)
+
+
+def measure(service):
+    latencies = []
+    for i in range(CALLS):
+        start = time.perf_counter()
+        assert service.fetch_movie_data(f"tt{i:07d}", "key")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    print(f"{CALLS} sequential OMDb lookups against a local stand-in server")
+    print(f"{'connect cost':>12} | {'per-call p50':>12} | {'pooled p50':>10} | {'per-call total':>14} | {'pooled total':>12}")
+    for delay_ms in CONNECT_DELAYS_MS:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(delay_ms / 1000))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        results = {}
+        for name, session in (("per_call", PerCallSession()), ("pooled", get_session())):
+            service = OMDBService(base_url, 1, 0, MagicMock(), session=session)
+            results[name] = measure(service)
+
+        server.shutdown()
+        server.server_close()
+        print(
+            f"{delay_ms:>10}ms | {statistics.median(results['per_call']) * 1000:>10.2f}ms | "
+            f"{statistics.median(results['pooled']) * 1000:>8.2f}ms | "
+            f"{sum(results['per_call']):>13.2f}s | {sum(results['pooled']):>11.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
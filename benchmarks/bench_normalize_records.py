@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lambdas.process_bronze_to_silver.src.processor import ColumnBuffers
+
+SIZES = [250, 50_000, 1_000_000]
+
+
+def generate_records(count):
+    # Shaped like an enriched bronze object; the nested Ratings list is kept, the dict dropped.
+    for i in range(count):
+        yield {
+            "id": f"tt{i:07d}", "rank": i + 1, "title": f"Movie {i}", "Year": "1994", "Rated": "R",
+            "Released": "14 Oct 1994", "Runtime": "142 min", "Genre": "Drama", "Director": "Frank Darabont",
+            "imdbRating": "9.3", "imdbVotes": "2,900,000", "Metascore": "82", "BoxOffice": "$28,767,189",
+            "Ratings": [{"Source": "Internet Movie Database", "Value": "9.3/10"}],
+            "Nested": {"ignored": True}, "Response": "True"
+        }
+
+
+def list_of_dicts(records):
+    # Previous implementation: every raw object in a list, then a flattened dict per record, then the frame.
+    json_objects = list(records)
+    flattened = [
+        {k.lower(): v for k, v in obj.items() if isinstance(v, (str, int, float, bool, list))}
+        for obj in json_objects
+    ]
+    return pd.DataFrame(flattened)
+
+
+def streaming(records):
+    buffers = ColumnBuffers()
+    for record in records:
+        buffers.append(record)
+    return buffers.to_frame()
+
+
+def measure(build, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = build(generate_records(count))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(df) == count
+    return elapsed, peak / 2**20
+
+
+def main():
+    print(f"{'records':>9} | {'list peak':>10} | {'stream peak':>11} | {'list time':>9} | {'stream time':>11}")
+    for count in SIZES:
+        list_time, list_peak = measure(list_of_dicts, count)
+        stream_time, stream_peak = measure(streaming, count)
+        print(
+            f"{count:>9,} | {list_peak:>8.1f}MB | {stream_peak:>9.1f}MB | "
+            f"{list_time:>8.2f}s | {stream_time:>10.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
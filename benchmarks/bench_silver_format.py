@@ -0,0 +1,72 @@
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lambdas.process_bronze_to_silver.src.processor import ColumnBuffers
+from lambdas.process_bronze_to_silver.src.schema import apply_schema
+from lambdas.process_silver_to_gold.src.processor import ANALYTICS_COLUMNS
+
+SIZES = [250, 50_000, 500_000]
+CODECS = ["snappy", "zstd"]
+
+
+def silver_frame(count):
+    # Shaped like an enriched bronze object, including the long free-text fields gold never reads.
+    buffers = ColumnBuffers()
+    for i in range(count):
+        buffers.append({
+            "id": f"tt{i:07d}", "rank": i + 1, "title": f"Movie {i}", "Year": str(1920 + i % 100), "Rated": "R",
+            "Released": "14 Oct 1994", "Runtime": f"{90 + i % 90} min", "Genre": "Crime, Drama",
+            "Director": f"Director {i % 500}", "Writer": "Stephen King, Frank Darabont",
+            "Actors": "Tim Robbins, Morgan Freeman, Bob Gunton", "Language": "English", "Country": "United States",
+            "Plot": "Over the course of several years, two convicts form a friendship, seeking consolation "
+                    "and, eventually, redemption through basic compassion.",
+            "Awards": "Nominated for 7 Oscars. 21 wins & 42 nominations total", "imdbRating": f"{5 + i % 50 / 10}",
+            "imdbRatingCount": 2_900_000 - i, "imdbVotes": f"{2_900_000 - i:,}", "Metascore": str(40 + i % 60),
+            "BoxOffice": f"${28_767_189 + i:,}", "Ratings": [{"Source": "Internet Movie Database", "Value": "9.3/10"}]
+        })
+    return apply_schema(buffers.to_frame())
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def csv_round_trip(df):
+    body, write = timed(lambda: df.to_csv(index=False).encode("utf-8"))
+    # CSV has no projection: gold parses every column and then drops the ones it does not use.
+    _, read = timed(lambda: pd.read_csv(io.BytesIO(body))[ANALYTICS_COLUMNS])
+    return len(body), write, read
+
+
+def parquet_round_trip(df, codec):
+    def write_parquet():
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False, compression=codec)
+        return buffer.getvalue()
+
+    body, write = timed(write_parquet)
+    _, read = timed(lambda: pd.read_parquet(io.BytesIO(body), columns=ANALYTICS_COLUMNS))
+    return len(body), write, read
+
+
+def main():
+    print("Silver file size, write time and gold's read time (analytics columns only)")
+    print(f"{'records':>9} | {'format':>14} | {'size':>9} | {'write':>8} | {'read':>8}")
+    for count in SIZES:
+        df = silver_frame(count)
+        rows = [("csv", *csv_round_trip(df))]
+        rows += [(f"parquet/{codec}", *parquet_round_trip(df, codec)) for codec in CODECS]
+        for name, size, write, read in rows:
+            print(f"{count:>9,} | {name:>14} | {size / 2**20:>7.2f}MB | {write:>7.3f}s | {read:>7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import tracemalloc
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lambdas.fetch_top_movies.src.imdb_service import IMDBService
+
+TOP_N = 250
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def generate_items(count):
+    # Lazy permutation of 1..count (the stride is coprime with every size above),
+    # so the generator itself holds no per-item state.
+    for i in range(count):
+        rank = (i * 1_000_003) % count + 1
+        yield {"id": f"tt{rank:07d}", "rank": str(rank), "title": f"Movie {rank}"}
+
+
+def sort_top_rated_movies(items, top_n):
+    # Previous implementation: collect every valid movie, full sort, slice.
+    valid_movies = []
+    for m in items:
+        if 'rank' in m and m['rank'] not in ('', 'N/A'):
+            try:
+                m['rank'] = int(m['rank'])
+                valid_movies.append(m)
+            except ValueError:
+                continue
+    return sorted(valid_movies, key=lambda m: m['rank'])[:top_n]
+
+
+def measure(select, count):
+    start = time.perf_counter()
+    result = select(generate_items(count), TOP_N)
+    elapsed = time.perf_counter() - start
+    assert [m['rank'] for m in result] == list(range(1, TOP_N + 1))
+
+    tracemalloc.start()
+    select(generate_items(count), TOP_N)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    heap_select = IMDBService(url=None, max_retries=1, base_delay=0, logger=MagicMock()).get_top_rated_movies
+
+    print(f"top_n={TOP_N}, items streamed from a generator")
+    print(f"{'items':>10} | {'sort time':>10} | {'heap time':>10} | {'sort peak':>10} | {'heap peak':>10}")
+    for count in SIZES:
+        sort_time, sort_peak = measure(sort_top_rated_movies, count)
+        heap_time, heap_peak = measure(heap_select, count)
+        print(
+            f"{count:>10,} | {sort_time:>9.3f}s | {heap_time:>9.3f}s | "
+            f"{sort_peak / 2**20:>8.1f}MB | {heap_peak / 2**20:>8.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,23 @@ import os
 import json
 import logging
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
-from src.utils import build_response
-from src.secrets_service import SecretsService
+from botocore.config import Config
+from src.utils import build_batch_response
+from src.secrets_service import SecretsService, SecretCache, DEFAULT_SECRET_TTL_SECONDS
 from src.omdb_service import OMDBService
-from src.s3_service import S3Service
+from src.s3_service import S3Service, batch_object_key
+from src.processed_ledger import ProcessedLedger
+from src.run_ledger import RunLedger
+from src.message_codec import resolve_message_body
+from src.rate_limiter import RateLimiter
+from src.omdb_cache import (
+    OMDbCache, MemoryCacheTier, S3CacheTier,
+    DEFAULT_VOLATILE_TTL_SECONDS, DEFAULT_STATIC_TTL_SECONDS, DEFAULT_MAX_ENTRIES
+)
+from src.http_session import get_session, DEFAULT_POOL_SIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 
 # Logger setup
 logger = logging.getLogger()
@@ -20,67 +31,247 @@ OMDB_URL = os.environ.get("OMDB_URL")
 
 MAX_RETRIES = int(os.environ.get("MAX_RETRIES", "3"))
 BASE_DELAY_SECONDS = int(os.environ.get("BASE_DELAY_SECONDS", "1"))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", DEFAULT_POOL_SIZE))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+SECRET_CACHE_TTL_SECONDS = int(os.environ.get("SECRET_CACHE_TTL_SECONDS", DEFAULT_SECRET_TTL_SECONDS))
+ENRICH_CONCURRENCY = int(os.environ.get("ENRICH_CONCURRENCY", "1"))
+OMDB_REQUESTS_PER_SECOND = float(os.environ.get("OMDB_REQUESTS_PER_SECOND", "0")) or None
+OMDB_DAILY_LIMIT = int(os.environ.get("OMDB_DAILY_LIMIT", "0")) or None
+# "object" writes one JSON object per movie; "ndjson" writes one object per SQS message.
+BRONZE_LAYOUT = os.environ.get("BRONZE_LAYOUT", "object").lower()
+BRONZE_SKIP_IDENTICAL = os.environ.get("BRONZE_SKIP_IDENTICAL", "false").lower() == "true"
+PROCESSED_LEDGER_ENABLED = os.environ.get("PROCESSED_LEDGER_ENABLED", "false").lower() == "true"
+
+# Module scope so the daily count survives warm invocations. Each concurrent
+# execution environment keeps its own count, so size the limits per environment.
+omdb_rate_limiter = RateLimiter(OMDB_REQUESTS_PER_SECOND, OMDB_DAILY_LIMIT)
+
+OMDB_CACHE_ENABLED = os.environ.get("OMDB_CACHE_ENABLED", "false").lower() == "true"
+OMDB_CACHE_S3_BUCKET = os.environ.get("OMDB_CACHE_S3_BUCKET")
+OMDB_CACHE_MAX_ENTRIES = int(os.environ.get("OMDB_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+OMDB_CACHE_VOLATILE_TTL_SECONDS = int(os.environ.get("OMDB_CACHE_VOLATILE_TTL_SECONDS", DEFAULT_VOLATILE_TTL_SECONDS))
+OMDB_CACHE_STATIC_TTL_SECONDS = int(os.environ.get("OMDB_CACHE_STATIC_TTL_SECONDS", DEFAULT_STATIC_TTL_SECONDS))
+
+# The memory tier outlives a single invocation; the S3 tier outlives the container.
+omdb_memory_cache = MemoryCacheTier(OMDB_CACHE_MAX_ENTRIES)
+
+def build_omdb_cache():
+    if not OMDB_CACHE_ENABLED:
+        return None
+    tiers = [omdb_memory_cache]
+    if OMDB_CACHE_S3_BUCKET:
+        tiers.append(S3CacheTier(get_client("s3"), OMDB_CACHE_S3_BUCKET, MAX_RETRIES, BASE_DELAY_SECONDS, logger))
+    return OMDbCache(tiers, OMDB_CACHE_VOLATILE_TTL_SECONDS, OMDB_CACHE_STATIC_TTL_SECONDS)
 
 today_str = datetime.now().strftime("%Y-%m-%d")
 
+# Reused across warm invocations: with BatchSize 1 every message is an invocation,
+# and rebuilding clients or re-reading the secret each time dominates its latency.
+_clients = {}
+secret_cache = SecretCache(SECRET_CACHE_TTL_SECONDS)
+
+def get_client(service_name):
+    if service_name not in _clients:
+        # botocore pools 10 connections by default; concurrent uploads need one per worker.
+        config = Config(max_pool_connections=max(10, ENRICH_CONCURRENCY))
+        _clients[service_name] = boto3.client(service_name, config=config)
+    return _clients[service_name]
+
+def run_complete(run_ledger, run_date, body, movies):
+    run_id = body.get("run_id")
+    if not run_id:
+        # Producers that send no completion counts rely on the final batch arriving last.
+        return body.get("is_final_batch", False)
+
+    run_ledger.record_done(run_date, run_id, movies)
+    messages, movie_count = run_ledger.progress(run_date, run_id)
+    logger.info(
+        f"Run {run_id}: {messages} of {body['expected_messages']} message(s) and "
+        f"{movie_count} of {body['expected_movies']} movie(s) stored."
+    )
+    if messages < body["expected_messages"] or movie_count < body["expected_movies"]:
+        return False
+    # Several consumers can see the run complete at once; only the one that wins the claim closes it.
+    return run_ledger.claim(run_date, run_id)
+
+def enrich_movie(movie, omdb_service, omdb_api_key):
+    logger.info(f"Processing: {movie.get('title', 'Unknown Title')} (ID: {movie['id']})")
+    enriched_data = omdb_service.fetch_movie_data(movie["id"], omdb_api_key)
+    return {**movie, **(enriched_data or {})}, enriched_data is not None
+
+def enrich_movies(movies, omdb_service, omdb_api_key):
+    def enrich(movie):
+        return enrich_movie(movie, omdb_service, omdb_api_key)
+
+    if ENRICH_CONCURRENCY <= 1 or len(movies) <= 1:
+        return [enrich(movie) for movie in movies]
+    # OMDb calls are I/O bound and the pooled session is thread-safe.
+    with ThreadPoolExecutor(max_workers=min(ENRICH_CONCURRENCY, len(movies))) as executor:
+        return list(executor.map(enrich, movies))
+
+def store_movies(movies, run_date, s3_service, batch_key=None):
+    if BRONZE_LAYOUT == "ndjson":
+        # A single PUT for the whole message; it either lands for every movie or for none.
+        if s3_service.upload_ndjson(TARGET_S3_BUCKET, batch_key, movies, skip_if_identical=BRONZE_SKIP_IDENTICAL):
+            return []
+        return [movie["id"] for movie in movies]
+
+    items = [(f"bronze/{run_date}/{movie['id']}.json", movie) for movie in movies]
+    uploaded = s3_service.upload_json_many(
+        TARGET_S3_BUCKET, items, max_workers=ENRICH_CONCURRENCY, skip_if_identical=BRONZE_SKIP_IDENTICAL
+    )
+    return [movie["id"] for key, movie in items if not uploaded.get(key)]
+
+def load_stored_batch(s3_service, batch_key, movie_ids):
+    # The NDJSON object is rewritten whole, so a redelivery reuses what its earlier attempt stored.
+    try:
+        lines = s3_service.download_bytes(TARGET_S3_BUCKET, batch_key).decode("utf-8").splitlines()
+    except Exception as e:
+        logger.warning(f"Could not read stored batch {batch_key}; enriching all of its movies again: {e}")
+        return {}
+    records = (json.loads(line) for line in lines if line.strip())
+    return {record["id"]: record for record in records if record.get("id") in movie_ids}
+
+class MessageFailed(Exception):
+    pass
+
 def lambda_handler(event, context):
     logger.info("Starting EnrichAndStoreMovie Lambda execution.")
+    records = event.get("Records", [])
+    all_message_ids = [record.get("messageId", "N/A") for record in records]
 
     if not TARGET_S3_BUCKET:
         logger.error("Missing TARGET_S3_BUCKET environment variable.")
-        return build_response(500, "Missing environment variables.")
+        return build_batch_response(500, "Missing environment variables.", all_message_ids)
 
-    secrets_service = SecretsService(boto3.client("secretsmanager"), MAX_RETRIES, BASE_DELAY_SECONDS, logger)
-    omdb_service = OMDBService(OMDB_URL, MAX_RETRIES, BASE_DELAY_SECONDS, logger)
-    s3_service = S3Service(boto3.client("s3"), MAX_RETRIES, BASE_DELAY_SECONDS, logger)
+    secrets_service = SecretsService(get_client("secretsmanager"), MAX_RETRIES, BASE_DELAY_SECONDS, logger, cache=secret_cache)
+    omdb_service = OMDBService(
+        OMDB_URL, MAX_RETRIES, BASE_DELAY_SECONDS, logger,
+        session=get_session(HTTP_POOL_SIZE),
+        timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+        rate_limiter=omdb_rate_limiter,
+        cache=build_omdb_cache()
+    )
+    s3_service = S3Service(get_client("s3"), MAX_RETRIES, BASE_DELAY_SECONDS, logger)
+    run_ledger = RunLedger(get_client("s3"), TARGET_S3_BUCKET, MAX_RETRIES, BASE_DELAY_SECONDS, logger)
+    processed_ledger = None
+    if PROCESSED_LEDGER_ENABLED:
+        processed_ledger = ProcessedLedger(get_client("s3"), TARGET_S3_BUCKET, MAX_RETRIES, BASE_DELAY_SECONDS, logger)
 
     try:
         omdb_api_key = secrets_service.get_omdb_api_key(OMDB_API_SECRET_NAME)
     except Exception as e:
         logger.error(f"Secret error: {e}")
-        return build_response(500, str(e))
+        return build_batch_response(500, str(e), all_message_ids)
 
-    for record in event.get("Records", []):
+    failures, failed_groups = {}, set()
+    for record in records:
         message_id = record.get("messageId", "N/A")
+        message_group = record.get("attributes", {}).get("MessageGroupId")
+        if message_group is not None and message_group in failed_groups:
+            # FIFO order: nothing in a group may be processed after an earlier message of it failed,
+            # or a final batch could close the run while that message is still being retried.
+            logger.warning(f"Message ID {message_id}: returned to the queue behind a failed message in group {message_group}.")
+            failures[message_id] = f"Message ID {message_id} not processed after an earlier failure in its message group"
+            continue
         try:
-            body = json.loads(record["body"])
+            body = resolve_message_body(record["body"], s3_service)
             movies = body.get("movies")
-            is_final_batch = body.get("is_final_batch", False)
+            run_date = body.get("run_date", today_str)
 
             if not isinstance(movies, list):
                 logger.error(f"Message ID {message_id}: Invalid 'movies' type: {type(movies)}")
                 continue
 
+            valid_movies = []
             for movie in movies:
-                imdb_id = movie.get("id")
-                title = movie.get("title", "Unknown Title")
-
-                if not imdb_id:
+                if not movie.get("id"):
                     logger.warning(f"Message ID {message_id}: Movie without ID. Skipping.")
                     continue
+                valid_movies.append(movie)
+
+            batch_key = batch_object_key(run_date, movies)
+            processed = processed_ledger.load(run_date, movies) if processed_ledger else set()
+            stored_records = {}
+            if processed and BRONZE_LAYOUT == "ndjson" and any(movie["id"] not in processed for movie in valid_movies):
+                stored_records = load_stored_batch(s3_service, batch_key, processed)
+                processed = set(stored_records)
+
+            pending = [movie for movie in valid_movies if movie["id"] not in processed]
+            if len(pending) < len(valid_movies):
+                logger.info(
+                    f"Message ID {message_id}: {len(valid_movies) - len(pending)} movie(s) already enriched "
+                    f"and stored by an earlier delivery."
+                )
+
+            if pending:
+                results = enrich_movies(pending, omdb_service, omdb_api_key)
 
-                logger.info(f"Processing: {title} (ID: {imdb_id})")
+                if omdb_service.auth_failed:
+                    # The cached key may have been rotated; fetch it again and redo the movies it failed on.
+                    logger.warning("OMDb rejected the API key. Refreshing it from Secrets Manager.")
+                    omdb_service.auth_failed = False
+                    omdb_api_key = secrets_service.get_omdb_api_key(OMDB_API_SECRET_NAME, force_refresh=True)
+                    retry = [movie for movie, (_, enriched) in zip(pending, results) if not enriched]
+                    results = [result for result in results if result[1]] + enrich_movies(retry, omdb_service, omdb_api_key)
 
-                enriched_data = omdb_service.fetch_movie_data(imdb_id, omdb_api_key) or {}
-                enriched_movie = {**movie, **enriched_data}
+                not_enriched = [movie["id"] for movie, enriched in results if not enriched]
+                if not_enriched:
+                    logger.warning(f"Message ID {message_id}: stored without OMDb data: {', '.join(not_enriched)}")
 
-                s3_key = f"bronze/{today_str}/{imdb_id}.json"
-                if not s3_service.upload_json(TARGET_S3_BUCKET, s3_key, enriched_movie):
-                    logger.error(f"Failed to upload {imdb_id} to S3.")
-                    return build_response(500, f"Failed to upload {imdb_id} to S3.")
+                # One parallel flush for the whole message instead of a PUT per movie in turn.
+                failed_uploads = store_movies(
+                    list(stored_records.values()) + [movie for movie, _ in results], run_date, s3_service,
+                    batch_key=batch_key
+                )
+                if processed_ledger:
+                    # Movies stored without OMDb data stay off the ledger so a redelivery tries them again.
+                    done = processed | {movie["id"] for movie, enriched in results if enriched} - set(failed_uploads)
+                    if done - processed:
+                        processed_ledger.record(run_date, movies, done)
+                if failed_uploads:
+                    logger.error(f"Failed to upload {', '.join(failed_uploads)} to S3.")
+                    raise MessageFailed(f"Failed to upload {', '.join(failed_uploads)} to S3.")
 
             logger.info(f"Processed message ID {message_id} with {len(movies)} movie(s).")
 
-            if is_final_batch:
-                logger.info("Final batch detected. Writing _SUCCESS marker...")
-                if not s3_service.upload_string(TARGET_S3_BUCKET, f"bronze/{today_str}/_SUCCESS", " "):
+            if run_complete(run_ledger, run_date, body, movies):
+                logger.info("All movies of the run are stored. Writing _SUCCESS marker...")
+                try:
+                    written = s3_service.upload_string(TARGET_S3_BUCKET, f"bronze/{run_date}/_SUCCESS", body.get("run_id", " "))
+                except Exception as e:
+                    # with_retries re-raises every error as a plain Exception, so failures rarely return False.
+                    logger.error(f"Error writing _SUCCESS marker: {e}")
+                    written = False
+                if not written:
                     logger.error("Failed to write _SUCCESS marker to S3.")
-                    return build_response(500, "Failed to write _SUCCESS marker to S3.")
+                    # A claim left behind would make every redelivery lose it and the marker never appear.
+                    if body.get("run_id"):
+                        run_ledger.release(run_date, body["run_id"])
+                    raise MessageFailed("Failed to write _SUCCESS marker to S3.")
 
+        except MessageFailed as e:
+            failures[message_id] = str(e)
+            failed_groups.add(message_group)
         except Exception as e:
             logger.error(f"Unhandled error in message ID {message_id}: {e}")
-            return build_response(500, f"Error in message ID {message_id}")
+            failures[message_id] = f"Error in message ID {message_id}"
+            failed_groups.add(message_group)
 
+    if BRONZE_SKIP_IDENTICAL:
+        logger.info(
+            f"Bronze writes: {s3_service.stats['written']} written, "
+            f"{s3_service.stats['skipped']} skipped as identical to the stored object."
+        )
+    if omdb_service.cache:
+        logger.info(f"OMDb cache stats: {omdb_service.cache.stats}")
+    remaining = omdb_service.quota_remaining()
+    if remaining is not None:
+        logger.info(f"OMDb daily quota remaining in this environment: {remaining} request(s).")
+    if failures:
+        logger.error(f"{len(failures)} of {len(records)} message(s) failed and will be retried.")
+        return build_batch_response(500, "; ".join(failures.values()), list(failures))
     logger.info("Finished processing all records.")
-    return build_response(200, "All records processed.")
+    return build_batch_response(200, "All records processed.", [])
     
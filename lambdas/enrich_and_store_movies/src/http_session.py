@@ -0,0 +1,21 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 3
+DEFAULT_READ_TIMEOUT = 10
+
+# Kept at module scope so warm invocations reuse open connections instead of
+# paying DNS, TCP and TLS setup on every call.
+_sessions = {}
+
+def get_session(pool_size=DEFAULT_POOL_SIZE):
+    session = _sessions.get(pool_size)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        _sessions[pool_size] = session
+    return session
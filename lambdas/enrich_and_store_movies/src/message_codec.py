@@ -0,0 +1,22 @@
+import gzip
+import json
+import base64
+
+GZIP_ENCODING = "gzip+base64"
+GZIP_MAGIC = b"\x1f\x8b"
+
+def _gunzip(data):
+    return gzip.decompress(data) if data[:2] == GZIP_MAGIC else data
+
+def resolve_message_body(message_body, s3_service):
+    body = json.loads(message_body)
+
+    claim_check = body.get("claim_check")
+    if claim_check:
+        data = s3_service.download_bytes(claim_check["bucket"], claim_check["key"])
+        body = json.loads(_gunzip(data))
+
+    if body.get("encoding") == GZIP_ENCODING:
+        body = json.loads(gzip.decompress(base64.b64decode(body["payload"])))
+
+    return body
@@ -0,0 +1,133 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from botocore.exceptions import ClientError
+from .utils import with_retries
+
+VOLATILE_FIELDS = ("imdbVotes", "BoxOffice", "Metascore")
+# OMDb returns every field in one call, so the volatile ones cannot be refreshed on their own: a cache
+# hit always means votes and box office as of the run that fetched them. The pipeline runs once a day,
+# so a TTL under 24h never hits across runs and a longer one trades freshness for OMDb calls.
+# 36h sits between one and two runs: a movie is fetched on one run and served from the cache on the
+# next, which halves the calls while its volatile fields lag by at most one run.
+DEFAULT_VOLATILE_TTL_SECONDS = 36 * 3600
+DEFAULT_STATIC_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1024
+CACHE_PREFIX = "cache/omdb/"
+
+class MemoryCacheTier:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+class S3CacheTier:
+    def __init__(self, client, bucket, max_retries, base_delay, logger, prefix=CACHE_PREFIX):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.logger = logger
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}.json")
+            return json.loads(response["Body"].read())
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                self.logger.warning(f"Could not read OMDb cache entry {key}: {e}")
+            return None
+        except Exception as e:
+            self.logger.warning(f"Could not read OMDb cache entry {key}: {e}")
+            return None
+
+    def put(self, key, entry):
+        try:
+            with_retries(
+                self.logger,
+                self.max_retries,
+                self.base_delay,
+                self.client.put_object,
+                f"Writing OMDb cache entry {key}",
+                Bucket=self.bucket,
+                Key=f"{self.prefix}{key}.json",
+                Body=json.dumps(entry),
+                ContentType="application/json"
+            )
+        except Exception as e:
+            # A missed cache write only costs an OMDb call tomorrow.
+            self.logger.warning(f"Could not write OMDb cache entry {key}: {e}")
+
+class OMDbCache:
+    # Tiers are checked in order (fastest first); a hit in a later tier is copied into the earlier ones.
+    def __init__(self, tiers, volatile_ttl=DEFAULT_VOLATILE_TTL_SECONDS, static_ttl=DEFAULT_STATIC_TTL_SECONDS,
+                 clock=time.time):
+        self.tiers = tiers
+        self.volatile_ttl = volatile_ttl
+        self.static_ttl = static_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"hits": 0, "stale": 0, "misses": 0, "fallbacks": 0, "writes": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _lookup(self, imdb_id):
+        # A stale entry in a fast tier must not hide a fresher one another container wrote to a slower tier.
+        best = None
+        for idx, tier in enumerate(self.tiers):
+            entry = tier.get(imdb_id)
+            if entry is not None and (best is None or entry["fetched_at"] > best["fetched_at"]):
+                best = entry
+                for faster in self.tiers[:idx]:
+                    faster.put(imdb_id, entry)
+            if best is not None and self.clock() - best["fetched_at"] < self.volatile_ttl:
+                break
+        return best
+
+    def get(self, imdb_id):
+        # Returns (fresh data, static-only fallback); at most one of them is set.
+        entry = self._lookup(imdb_id)
+        age = self.clock() - entry["fetched_at"] if entry else None
+
+        if entry is None or age >= self.static_ttl:
+            self._count("misses")
+            return None, None
+        if age < self.volatile_ttl:
+            self._count("hits")
+            return entry["data"], None
+
+        # Votes and box office are out of date; the rest is still good enough if OMDb is unavailable.
+        self._count("stale")
+        static = {k: v for k, v in entry["data"].items() if k not in VOLATILE_FIELDS}
+        return None, static
+
+    def put(self, imdb_id, data):
+        entry = {"fetched_at": self.clock(), "data": data}
+        for tier in self.tiers:
+            tier.put(imdb_id, entry)
+        self._count("writes")
+
+    def record_fallback(self):
+        self._count("fallbacks")
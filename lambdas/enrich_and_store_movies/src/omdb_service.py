@@ -1,19 +1,83 @@
-import requests
 from .utils import with_retries
+from .http_session import get_session, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from .rate_limiter import QuotaExhaustedError, parse_retry_after
+
+# OMDb answers 401 with this error once the key's daily quota is used up.
+DAILY_LIMIT_ERROR = "Request limit reached!"
+# ...and with one of these when the key itself is rejected, e.g. after a rotation.
+AUTH_ERRORS = ("Invalid API key!", "No API key provided.")
 
 class OMDBService:
-    def __init__(self, base_url, max_retries, base_delay, logger):
+    def __init__(self, base_url, max_retries, base_delay, logger, session=None,
+                 timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT), rate_limiter=None, cache=None):
         self.base_url = base_url
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.logger = logger
+        self.session = session or get_session()
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.auth_failed = False
 
     def _get(self, url):
-        response = requests.get(url, timeout=10)
+        # A 429 is retried here, right after the limiter has waited out Retry-After, so with_retries
+        # only backs off on real failures and does not add its own delay on top of the server's.
+        for _ in range(max(1, self.max_retries) if self.rate_limiter else 1):
+            if self.rate_limiter:
+                try:
+                    self.rate_limiter.acquire()
+                except QuotaExhaustedError as e:
+                    # Returned rather than raised so with_retries does not back off on a spent quota.
+                    return {"Response": "False", "Error": str(e)}
+
+            response = self.session.get(url, timeout=self.timeout)
+            if not self.rate_limiter or response.status_code != 429:
+                break
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.logger.warning(f"OMDb throttled the request; pausing all calls for {retry_after:.1f}s.")
+            self.rate_limiter.pause(retry_after)
+
+        if response.status_code == 401:
+            # Neither case gets better by retrying, so the error is returned instead of raised.
+            error = self._error_message(response)
+            if error == DAILY_LIMIT_ERROR:
+                if self.rate_limiter:
+                    self.rate_limiter.exhaust()
+                return {"Response": "False", "Error": error}
+            if error in AUTH_ERRORS:
+                self.auth_failed = True
+                return {"Response": "False", "Error": error}
         response.raise_for_status()
         return response.json()
 
+    def _error_message(self, response):
+        try:
+            return response.json().get("Error")
+        except ValueError:
+            return None
+
+    def quota_remaining(self):
+        return self.rate_limiter.remaining() if self.rate_limiter else None
+
     def fetch_movie_data(self, imdb_id, api_key):
+        if not self.cache:
+            return self._fetch_movie_data(imdb_id, api_key)
+
+        cached, fallback = self.cache.get(imdb_id)
+        if cached is not None:
+            return cached
+
+        data = self._fetch_movie_data(imdb_id, api_key)
+        if data is not None:
+            self.cache.put(imdb_id, data)
+            return data
+        if fallback is not None:
+            self.logger.warning(f"Using cached static OMDb fields for {imdb_id}.")
+            self.cache.record_fallback()
+        return fallback
+
+    def _fetch_movie_data(self, imdb_id, api_key):
         if not self.base_url:
             raise ValueError("OMDB_URL not set.")
 
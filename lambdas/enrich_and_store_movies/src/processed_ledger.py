@@ -0,0 +1,52 @@
+import json
+from botocore.exceptions import ClientError
+from .utils import with_retries
+from .s3_service import batch_id
+
+LEDGER_DIR = "_processed"
+
+# One small object per message listing the movies it has already enriched and stored,
+# so a redelivered message only redoes the movies its earlier attempt did not finish.
+class ProcessedLedger:
+    def __init__(self, client, bucket, max_retries, base_delay, logger):
+        self.client = client
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.logger = logger
+
+    def key(self, run_date, movies):
+        return f"bronze/{run_date}/{LEDGER_DIR}/{batch_id(run_date, movies)}.json"
+
+    def load(self, run_date, movies):
+        key = self.key(run_date, movies)
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+            return set(json.loads(response["Body"].read()).get("enriched", []))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                self.logger.warning(f"Could not read processed ledger {key}: {e}")
+            return set()
+        except Exception as e:
+            self.logger.warning(f"Could not read processed ledger {key}: {e}")
+            return set()
+
+    def record(self, run_date, movies, enriched_ids):
+        key = self.key(run_date, movies)
+        try:
+            with_retries(
+                self.logger,
+                self.max_retries,
+                self.base_delay,
+                self.client.put_object,
+                f"Writing processed ledger {key}",
+                Bucket=self.bucket,
+                Key=key,
+                Body=json.dumps({"enriched": sorted(enriched_ids)}),
+                ContentType="application/json"
+            )
+            return True
+        except Exception as e:
+            # Without the ledger a redelivery only costs the OMDb calls again.
+            self.logger.warning(f"Could not write processed ledger {key}: {e}")
+            return False
@@ -0,0 +1,99 @@
+import time
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+
+class QuotaExhaustedError(Exception):
+    pass
+
+def parse_retry_after(value, now=None):
+    if not value:
+        return DEFAULT_RETRY_AFTER_SECONDS
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - (now or datetime.now(timezone.utc))).total_seconds())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SECONDS
+
+def utc_today():
+    return datetime.now(timezone.utc).date()
+
+# Token bucket for requests per second plus a daily request budget, shared by all threads.
+class RateLimiter:
+    def __init__(self, requests_per_second=None, daily_budget=None, burst=None,
+                 clock=time.monotonic, sleep=time.sleep, today=utc_today):
+        self.rate = requests_per_second
+        self.capacity = burst or max(1.0, requests_per_second or 1.0)
+        self.daily_budget = daily_budget
+        self.clock = clock
+        self.sleep = sleep
+        self.today = today
+
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self.day = today()
+        self.used_today = 0
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def _roll_day(self):
+        day = self.today()
+        if day != self.day:
+            self.day = day
+            self.used_today = 0
+            self.exhausted = False
+
+    def _budget_spent(self):
+        return self.exhausted or (self.daily_budget is not None and self.used_today >= self.daily_budget)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._roll_day()
+                if self._budget_spent():
+                    raise QuotaExhaustedError(f"Daily OMDb budget spent after {self.used_today} requests today.")
+
+                now = self.clock()
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if not self.rate:
+                        self.used_today += 1
+                        return
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.used_today += 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+    def pause(self, seconds):
+        # Every thread waits out a Retry-After, not just the one that was throttled.
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+    def exhaust(self):
+        # The server says the day's quota is gone, whatever our own count says.
+        with self._lock:
+            self._roll_day()
+            self.exhausted = True
+
+    def remaining(self):
+        with self._lock:
+            self._roll_day()
+            if self.exhausted:
+                return 0
+            if self.daily_budget is None:
+                return None
+            return max(0, self.daily_budget - self.used_today)
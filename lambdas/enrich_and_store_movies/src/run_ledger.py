@@ -0,0 +1,66 @@
+from botocore.exceptions import ClientError
+from .utils import with_retries
+from .s3_service import batch_id
+
+RUNS_DIR = "_runs"
+CLAIM_FILE = "_closed"
+CONDITION_FAILED_CODES = ("PreconditionFailed", "ConditionalRequestConflict")
+
+# Completion counters for one producer run: every message leaves a done marker whose name carries
+# its movie count, so a single LIST tells how much of the run has landed, in whatever order.
+class RunLedger:
+    def __init__(self, client, bucket, max_retries, base_delay, logger):
+        self.client = client
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.logger = logger
+
+    def prefix(self, run_date, run_id):
+        return f"bronze/{run_date}/{RUNS_DIR}/{run_id}/"
+
+    def record_done(self, run_date, run_id, movies):
+        # Keyed by the message's movies, so a redelivered message overwrites its own marker.
+        key = f"{self.prefix(run_date, run_id)}done/{batch_id(run_date, movies)}-{len(movies)}"
+        with_retries(
+            self.logger,
+            self.max_retries,
+            self.base_delay,
+            self.client.put_object,
+            f"Recording completed message at s3://{self.bucket}/{key}",
+            Bucket=self.bucket,
+            Key=key,
+            Body=b""
+        )
+
+    def progress(self, run_date, run_id):
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = with_retries(
+            self.logger,
+            self.max_retries,
+            self.base_delay,
+            lambda: list(paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix(run_date, run_id)}done/")),
+            f"Listing completed messages of run {run_id}"
+        )
+        keys = [obj["Key"] for page in pages for obj in page.get("Contents", [])]
+        return len(keys), sum(int(key.rsplit("-", 1)[1]) for key in keys)
+
+    def claim(self, run_date, run_id):
+        # A conditional create succeeds for exactly one caller, however many see the run complete at once.
+        key = f"{self.prefix(run_date, run_id)}{CLAIM_FILE}"
+        try:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=b"", IfNoneMatch="*")
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in CONDITION_FAILED_CODES:
+                self.logger.info(f"Run {run_id} was already closed by another message.")
+                return False
+            raise
+
+    def release(self, run_date, run_id):
+        # Lets a retry close the run again when writing the marker failed after the claim.
+        key = f"{self.prefix(run_date, run_id)}{CLAIM_FILE}"
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            self.logger.error(f"Could not release the claim on run {run_id}: {e}")
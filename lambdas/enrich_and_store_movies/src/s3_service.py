@@ -1,8 +1,23 @@
 import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 from .utils import with_retries
 
 CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_NDJSON = "application/x-ndjson"
+DEFAULT_UPLOAD_WORKERS = 8
+CONTENT_HASH_METADATA = "content-sha256"
+
+def batch_id(run_date, movies):
+    # Same formula as the producer's message deduplication id, so it can predict keys derived
+    # from it and a redelivered message maps to the same objects as its first delivery.
+    movie_ids = sorted(str(movie.get("id", "")) if isinstance(movie, dict) else str(movie) for movie in movies)
+    return hashlib.sha256(f"{run_date or ''}|{','.join(movie_ids)}".encode("utf-8")).hexdigest()[:16]
+
+def batch_object_key(run_date, movies):
+    return f"bronze/{run_date}/batch-{batch_id(run_date, movies)}.ndjson"
 
 class S3Service:
     def __init__(self, client, max_retries, base_delay, logger):
@@ -10,16 +25,55 @@ class S3Service:
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.logger = logger
+        self.stats = {"written": 0, "skipped": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _is_identical(self, bucket, key, data, digest):
+        try:
+            head = self.client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+                self.logger.warning(f"Could not check s3://{bucket}/{key} before writing: {e}")
+            return False
+        if head.get("Metadata", {}).get(CONTENT_HASH_METADATA) == digest:
+            return True
+        # Objects written without the hash: a single-part, non-KMS ETag is the MD5 of the body.
+        return head.get("ETag", "").strip('"') == hashlib.md5(data).hexdigest()
 
-    def upload_json(self, bucket, key, data):
+    def upload_json(self, bucket, key, data, skip_if_identical=False):
         try:
             body = json.dumps(data, indent=2)
-            return self.upload_string(bucket, key, body)
+            return self.upload_string(bucket, key, body, skip_if_identical=skip_if_identical)
         except Exception as e:
             self.logger.error(f"Failed to convert data to JSON: {e}")
             return False
 
-    def upload_string(self, bucket, key, body):
+    def upload_ndjson(self, bucket, key, records, skip_if_identical=False):
+        try:
+            body = "\n".join(json.dumps(record, separators=(",", ":")) for record in records)
+            return self.upload_string(
+                bucket, key, body, content_type=CONTENT_TYPE_NDJSON, skip_if_identical=skip_if_identical
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to convert data to NDJSON: {e}")
+            return False
+
+    def upload_string(self, bucket, key, body, content_type=CONTENT_TYPE_JSON, skip_if_identical=False):
+        extra = {}
+        if skip_if_identical:
+            # A HEAD is cheaper than a PUT and, unlike a PUT, fires no bucket notifications.
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            digest = hashlib.sha256(data).hexdigest()
+            if self._is_identical(bucket, key, data, digest):
+                self._count("skipped")
+                self.logger.info(f"s3://{bucket}/{key} is unchanged. Skipping upload.")
+                return True
+            extra["Metadata"] = {CONTENT_HASH_METADATA: digest}
+
         try:
             with_retries(
                 self.logger,
@@ -30,10 +84,53 @@ class S3Service:
                 Bucket=bucket,
                 Key=key,
                 Body=body,
-                ContentType=CONTENT_TYPE_JSON
+                ContentType=content_type,
+                **extra
             )
+            self._count("written")
             self.logger.info(f"Uploaded to s3://{bucket}/{key}")
             return True
         except ClientError as e:
             self.logger.error(f"Upload to S3 failed: {e}")
             return False
+
+    def upload_many(self, bucket, items, max_workers=DEFAULT_UPLOAD_WORKERS, skip_if_identical=False):
+        # items are (key, body) pairs; returns {key: uploaded?} so callers can act per object.
+        items = list(items)
+
+        def upload(item):
+            key, body = item
+            try:
+                return key, self.upload_string(bucket, key, body, skip_if_identical=skip_if_identical)
+            except Exception as e:
+                self.logger.error(f"Upload to s3://{bucket}/{key} failed: {e}")
+                return key, False
+
+        if max_workers <= 1 or len(items) <= 1:
+            return dict(map(upload, items))
+        # The client's connection pool must be at least max_workers wide, or threads queue for sockets.
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            return dict(executor.map(upload, items))
+
+    def upload_json_many(self, bucket, items, max_workers=DEFAULT_UPLOAD_WORKERS, skip_if_identical=False):
+        results, bodies = {}, []
+        for key, data in items:
+            try:
+                bodies.append((key, json.dumps(data, indent=2)))
+            except (TypeError, ValueError) as e:
+                self.logger.error(f"Failed to convert data for {key} to JSON: {e}")
+                results[key] = False
+        results.update(self.upload_many(bucket, bodies, max_workers, skip_if_identical=skip_if_identical))
+        return results
+
+    def download_bytes(self, bucket, key):
+        response = with_retries(
+            self.logger,
+            self.max_retries,
+            self.base_delay,
+            self.client.get_object,
+            f"Downloading s3://{bucket}/{key}",
+            Bucket=bucket,
+            Key=key
+        )
+        return response["Body"].read()
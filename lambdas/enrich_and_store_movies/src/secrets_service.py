@@ -1,14 +1,42 @@
 import json
+import time
+import threading
 from .utils import with_retries
 
+DEFAULT_SECRET_TTL_SECONDS = 300
+
+class SecretCache:
+    def __init__(self, ttl_seconds=DEFAULT_SECRET_TTL_SECONDS, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry and self.clock() - entry[1] < self.ttl_seconds:
+                return entry[0]
+            return None
+
+    def put(self, name, value):
+        with self._lock:
+            self.entries[name] = (value, self.clock())
+
 class SecretsService:
-    def __init__(self, client, max_retries, base_delay, logger):
+    def __init__(self, client, max_retries, base_delay, logger, cache=None):
         self.client = client
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.logger = logger
+        self.cache = cache
+
+    def get_secret_string(self, secret_name, force_refresh=False):
+        if self.cache and not force_refresh:
+            cached = self.cache.get(secret_name)
+            if cached is not None:
+                return cached
 
-    def get_secret_string(self, secret_name):
         response = with_retries(
             self.logger,
             self.max_retries,
@@ -17,10 +45,13 @@ class SecretsService:
             f"Retrieving secret: {secret_name}",
             SecretId=secret_name
         )
-        return response.get("SecretString")
+        secret_string = response.get("SecretString")
+        if self.cache and secret_string:
+            self.cache.put(secret_name, secret_string)
+        return secret_string
 
-    def get_omdb_api_key(self, secret_name):
-        secret_string = self.get_secret_string(secret_name)
+    def get_omdb_api_key(self, secret_name, force_refresh=False):
+        secret_string = self.get_secret_string(secret_name, force_refresh)
         if not secret_string:
             raise ValueError("OMDb API secret is empty.")
 
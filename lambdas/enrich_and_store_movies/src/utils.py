@@ -17,3 +17,9 @@ def build_response(status_code, body):
         "statusCode": status_code,
         "body": json.dumps({"message": body})
     }
+
+def build_batch_response(status_code, body, failed_message_ids):
+    # With ReportBatchItemFailures only the listed messages go back to the queue.
+    response = build_response(status_code, body)
+    response["batchItemFailures"] = [{"itemIdentifier": message_id} for message_id in failed_message_ids]
+    return response
@@ -1,10 +1,19 @@
 import os
 import logging
+from datetime import datetime
+
 import boto3
 
 from src.utils import build_response
-from src.imdb_service import IMDBService
-from src.sqs_service import SQSService
+from src.imdb_service import IMDBService, FEED_UNCHANGED
+from src.sqs_service import (
+    SQSService, pack_movies, partition_by_shard, batch_object_key, processed_ledger_key, run_id,
+    MAX_MESSAGE_BYTES
+)
+from src.state_store import S3StateStore
+from src.manifest_service import ManifestService
+from src.message_codec import MessageEncoder, ClaimCheckStore, DEFAULT_CLAIM_CHECK_BYTES
+from src.http_session import get_session, DEFAULT_POOL_SIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 
 # Logger setup
 logger = logging.getLogger()
@@ -15,6 +24,62 @@ SQS_QUEUE_URL = os.environ.get("SQS_QUEUE_URL")
 IMDB_DATA_URL = os.environ.get("IMDB_DATA_URL")
 MAX_RETRIES = int(os.environ.get("MAX_RETRIES", 3))
 BASE_DELAY_SECONDS = int(os.environ.get("BASE_DELAY_SECONDS", 1))
+STREAM_IMDB_FEED = os.environ.get("STREAM_IMDB_FEED", "false").lower() == "true"
+STATE_S3_BUCKET = os.environ.get("STATE_S3_BUCKET")
+STATE_PREFIX = "state/fetch_top_movies/"
+BRONZE_S3_BUCKET = os.environ.get("BRONZE_S3_BUCKET")
+# Only movies the consumer confirms in its processed ledgers are carried forward, so this needs
+# PROCESSED_LEDGER_ENABLED=true on EnrichAndStoreMovie; without it every movie is sent again daily.
+DELTA_ENQUEUE = os.environ.get("DELTA_ENQUEUE", "false").lower() == "true"
+MESSAGE_GROUPS = int(os.environ.get("MESSAGE_GROUPS", 1))
+COMPRESS_MESSAGES = os.environ.get("COMPRESS_MESSAGES", "false").lower() == "true"
+CLAIM_CHECK_S3_BUCKET = os.environ.get("CLAIM_CHECK_S3_BUCKET")
+CLAIM_CHECK_BYTES = int(os.environ.get("CLAIM_CHECK_BYTES", DEFAULT_CLAIM_CHECK_BYTES))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", DEFAULT_POOL_SIZE))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+# Must match the consumer's setting: "ndjson" stores each message's movies in one bronze object.
+BRONZE_LAYOUT = os.environ.get("BRONZE_LAYOUT", "object").lower()
+
+def commit_feed_state(imdb_service, manifest_service=None):
+    try:
+        if manifest_service:
+            manifest_service.commit()
+        imdb_service.commit_feed_state()
+    except Exception as e:
+        # Not fatal: the next run simply re-sends work it could have skipped.
+        logger.warning(f"Could not save IMDb feed state: {e}")
+
+def build_message_encoder():
+    if not COMPRESS_MESSAGES and not CLAIM_CHECK_S3_BUCKET:
+        return None
+    claim_check_store = None
+    if CLAIM_CHECK_S3_BUCKET:
+        claim_check_store = ClaimCheckStore(
+            client=boto3.client('s3'),
+            bucket=CLAIM_CHECK_S3_BUCKET,
+            max_retries=MAX_RETRIES,
+            base_delay=BASE_DELAY_SECONDS,
+            logger=logger
+        )
+    return MessageEncoder(COMPRESS_MESSAGES, claim_check_store, CLAIM_CHECK_BYTES)
+
+def build_manifest_service(state_store, top_n):
+    if not DELTA_ENQUEUE or not BRONZE_S3_BUCKET:
+        return None
+    # Processed ledgers and carried-forward references both live in the bronze bucket.
+    bronze_store = S3StateStore(
+        client=boto3.client('s3'),
+        bucket=BRONZE_S3_BUCKET,
+        prefix="",
+        max_retries=MAX_RETRIES,
+        base_delay=BASE_DELAY_SECONDS,
+        logger=logger
+    )
+    return ManifestService(state_store, f"movie_manifest_top_{top_n}.json", logger, bronze_store=bronze_store)
+
+def failed_movie_ids(failed_indexes, batches):
+    return [movie.get('id', 'N/A') for idx in failed_indexes for movie in batches[idx]]
 
 def lambda_handler(event, context):
     logger.info("Starting GetMoviesAndSendToQueue function")
@@ -24,14 +89,42 @@ def lambda_handler(event, context):
         return build_response(500, "Missing environment variables.")
 
     top_n = event.get('top_n', 10)
-    batch_size = event.get('batch_size', 1)
-    logger.info(f"Event params: top_n={top_n}, batch_size={batch_size}")
+    # Without an explicit batch_size, a byte budget alone decides how many movies share a message.
+    message_bytes = event.get('message_bytes', MAX_MESSAGE_BYTES)
+    batch_size = event.get('batch_size', None if 'message_bytes' in event else 1)
+    force_refresh = event.get('force_refresh', False)
+    run_date = event.get('run_date', datetime.now().strftime("%Y-%m-%d"))
+    message_groups = event.get('message_groups', MESSAGE_GROUPS)
+    sharded = message_groups > 1
+    logger.info(
+        f"Event params: top_n={top_n}, batch_size={batch_size}, message_bytes={message_bytes}, "
+        f"force_refresh={force_refresh}, run_date={run_date}, message_groups={message_groups}"
+    )
+
+    state_store = None
+    manifest_service = None
+    if STATE_S3_BUCKET:
+        state_store = S3StateStore(
+            client=boto3.client('s3'),
+            bucket=STATE_S3_BUCKET,
+            prefix=STATE_PREFIX,
+            max_retries=MAX_RETRIES,
+            base_delay=BASE_DELAY_SECONDS,
+            logger=logger
+        )
+        manifest_service = build_manifest_service(state_store, top_n)
 
     imdb_service = IMDBService(
         url=IMDB_DATA_URL,
         max_retries=MAX_RETRIES,
         base_delay=BASE_DELAY_SECONDS,
-        logger=logger
+        logger=logger,
+        state_store=state_store,
+        state_key=f"imdb_feed_top_{top_n}.json",
+        # An unchanged feed would otherwise end the run before unconfirmed movies are sent again.
+        force_refresh=force_refresh or bool(manifest_service and manifest_service.has_unconfirmed()),
+        session=get_session(HTTP_POOL_SIZE),
+        timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
     )
 
     sqs_service = SQSService(
@@ -39,38 +132,111 @@ def lambda_handler(event, context):
         queue_url=SQS_QUEUE_URL,
         max_retries=MAX_RETRIES,
         base_delay=BASE_DELAY_SECONDS,
-        logger=logger
+        logger=logger,
+        run_date=run_date,
+        encoder=build_message_encoder()
     )
 
     try:
-        logger.info("Fetching movie data from IMDB service.")
-        data = imdb_service.fetch_movie_data()
+        if STREAM_IMDB_FEED:
+            logger.info("Streaming movie data from IMDB service.")
+            items = imdb_service.stream_movie_items()
+        else:
+            logger.info("Fetching movie data from IMDB service.")
+            data = imdb_service.fetch_movie_data()
+            if data is FEED_UNCHANGED:
+                items = FEED_UNCHANGED
+            elif not data or 'items' not in data:
+                logger.error("Invalid or missing movie data.")
+                return build_response(500, "Failed to fetch movie data.")
+            else:
+                items = data['items']
     except Exception as e:
         logger.error(f"Error fetching movie data: {e}")
         return build_response(500, "Failed to fetch movie data.")
 
-    if not data or 'items' not in data:
-        logger.error("Invalid or missing movie data.")
-        return build_response(500, "Failed to fetch movie data.")
+    if items is FEED_UNCHANGED:
+        logger.info("IMDb feed unchanged since last run. Skipping downstream processing.")
+        return build_response(200, "No change in IMDb feed.")
+
+    top_movies = imdb_service.get_top_rated_movies(items, top_n)
+    if imdb_service.content_unchanged():
+        logger.info("IMDb feed unchanged since last run. Skipping downstream processing.")
+        commit_feed_state(imdb_service)
+        return build_response(200, "No change in IMDb feed.")
 
-    top_movies = imdb_service.get_top_rated_movies(data['items'], top_n)
     if not top_movies:
         logger.error("No valid top movies after sorting.")
         return build_response(500, "No valid movies to send.")
 
-    batches = [top_movies[i:i + batch_size] for i in range(0, len(top_movies), batch_size)]
-    logger.info(f"Prepared {len(batches)} message(s) to send to SQS, each with up to {batch_size} movies.")
+    movies_to_send = top_movies
+    if manifest_service:
+        try:
+            movies_to_send, carried_forward = manifest_service.plan(top_movies, run_date, ignore_previous=force_refresh)
+            manifest_service.save_references(run_date, carried_forward, top_movies)
+        except Exception as e:
+            logger.error(f"Error planning delta enqueue: {e}")
+            return build_response(500, "Failed to plan delta enqueue.")
 
     try:
-        for idx, batch in enumerate(batches):
-            is_last = (idx == len(batches) - 1)
-            if not sqs_service.send_batch(batch, is_final_batch=is_last):
-                logger.error("Batch sending failed. Aborting.")
-                return build_response(500, "Batch sending failed.")
-            
+        if sharded:
+            shard_movies = partition_by_shard(movies_to_send, message_groups)
+        else:
+            shard_movies = {None: movies_to_send}
+        shard_batches = {
+            shard: pack_movies(
+                movies,
+                max_bytes=message_bytes,
+                max_movies=batch_size,
+                message_limit=None if CLAIM_CHECK_S3_BUCKET else MAX_MESSAGE_BYTES
+            )
+            for shard, movies in shard_movies.items()
+        }
+    except ValueError as e:
+        logger.error(f"Error packing movies into messages: {e}")
+        return build_response(500, str(e))
+
+    # An empty batch still has to go out so a consumer closes the run and writes the _SUCCESS marker.
+    shard_batches = {shard: batches for shard, batches in shard_batches.items() if batches} or {0 if sharded else None: [[]]}
+    message_count = sum(len(batches) for batches in shard_batches.values())
+    if manifest_service:
+        batched = [(batch, movie) for batches in shard_batches.values() for batch in batches for movie in batch if movie.get("id")]
+        if BRONZE_LAYOUT == "ndjson":
+            manifest_service.assign_keys({movie["id"]: batch_object_key(run_date, batch) for batch, movie in batched})
+        manifest_service.assign_ledgers({movie["id"]: processed_ledger_key(run_date, batch) for batch, movie in batched})
+    logger.info(
+        f"Prepared {message_count} message(s) in {len(shard_batches)} message group(s), "
+        f"each with up to {batch_size or 'any number of'} movies and {message_bytes} bytes."
+    )
+
+    # Consumers close the run by counting what has landed, so message order no longer matters
+    # for completion; final batches still go out last for consumers that predate the counts.
+    pending = [(shard, batch) for shard, batches in shard_batches.items() for batch in batches[:-1]]
+    finals = [(shard, batches[-1]) for shard, batches in shard_batches.items()]
+    # Derived from the content like the deduplication ids, so a retried run adds its
+    # completion markers to the same run instead of starting one that never completes.
+    run = {
+        "run_id": run_id(run_date, [batch for batches in shard_batches.values() for batch in batches]),
+        "expected_messages": message_count,
+        "expected_movies": sum(len(batch) for batches in shard_batches.values() for batch in batches)
+    }
+
+    try:
+        for is_final_batch, messages in ((False, pending), (True, finals)):
+            batches = [batch for _, batch in messages]
+            shards = [shard for shard, _ in messages] if sharded else None
+            failed_indexes = sqs_service.send_batches(
+                batches, is_final_batch=is_final_batch, shards=shards, run=run
+            )
+            if failed_indexes:
+                failed_ids = failed_movie_ids(failed_indexes, batches)
+                logger.error(f"{len(failed_indexes)} batch(es) could not be sent. Failed movie IDs: {failed_ids}")
+                return build_response(500, f"Batch sending failed for movies: {', '.join(failed_ids)}")
+
     except Exception as e:
         logger.error(f"Error sending batches to SQS: {e}")
         return build_response(500, "Failed to send batches to SQS.")
 
     logger.info("All batches sent successfully.")
+    commit_feed_state(imdb_service, manifest_service)
     return build_response(200, "All movies sent to SQS.")
@@ -1,42 +1,162 @@
-import requests
+import heapq
+import hashlib
 from .utils import with_retries
+from .json_stream import iter_array_items
+from .http_session import get_session, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+
+STREAM_CHUNK_SIZE = 64 * 1024
+FEED_UNCHANGED = object()
 
 class IMDBService:
-    def __init__(self, url, max_retries, base_delay, logger):
+    def __init__(self, url, max_retries, base_delay, logger, chunk_size=STREAM_CHUNK_SIZE,
+                 state_store=None, state_key="imdb_feed.json", force_refresh=False, session=None,
+                 timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
         self.url = url
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.logger = logger
+        self.chunk_size = chunk_size
+        self.state_store = state_store
+        self.state_key = state_key
+        self.force_refresh = force_refresh
+        self.session = session or get_session()
+        self.timeout = timeout
+        self._previous_state = None
+        self._pending_state = None
 
     def _fetch(self, url):
-        response = requests.get(url, timeout=10)
+        response = self.session.get(url, timeout=self.timeout)
         response.raise_for_status()
         return response.json()
 
+    def _fetch_conditional(self, url, headers):
+        response = self.session.get(url, timeout=self.timeout, headers=headers)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        return response
+
+    def _open_stream(self, url, headers=None):
+        response = self.session.get(url, timeout=self.timeout, stream=True, headers=headers or {})
+        if response.status_code == 304:
+            response.close()
+            return None
+        response.raise_for_status()
+        return response
+
+    def _conditional_headers(self):
+        if not self.state_store or self.force_refresh:
+            return {}
+
+        self._previous_state = self.state_store.load(self.state_key) or {}
+        headers = {}
+        if self._previous_state.get("etag"):
+            headers["If-None-Match"] = self._previous_state["etag"]
+        if self._previous_state.get("last_modified"):
+            headers["If-Modified-Since"] = self._previous_state["last_modified"]
+        return headers
+
+    def _track(self, response, content_sha256):
+        self._pending_state = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_sha256": content_sha256
+        }
+
+    def content_unchanged(self):
+        return bool(
+            self._previous_state
+            and self._pending_state
+            and self._previous_state.get("content_sha256") == self._pending_state["content_sha256"]
+        )
+
+    def commit_feed_state(self):
+        if not self.state_store or not self._pending_state:
+            return False
+        self.state_store.save(self.state_key, self._pending_state)
+        self.logger.info(f"Saved IMDb feed state: {self._pending_state}")
+        return True
+
     def fetch_movie_data(self):
-        return with_retries(
+        if not self.state_store:
+            return with_retries(
+                self.logger,
+                self.max_retries,
+                self.base_delay,
+                self._fetch,
+                f"Fetching data from: {self.url}",
+                self.url
+            )
+
+        response = with_retries(
             self.logger,
             self.max_retries,
             self.base_delay,
-            self._fetch,
+            self._fetch_conditional,
             f"Fetching data from: {self.url}",
-            self.url
+            self.url,
+            self._conditional_headers()
         )
+        if response is None:
+            self.logger.info("IMDb feed not modified since last run (HTTP 304).")
+            return FEED_UNCHANGED
+
+        self._track(response, hashlib.sha256(response.content).hexdigest())
+        if self.content_unchanged():
+            self.logger.info("IMDb feed content hash matches last run.")
+            self.commit_feed_state()
+            return FEED_UNCHANGED
+        return response.json()
+
+    def stream_movie_items(self):
+        # Only opening the connection is retried: once items have been yielded
+        # the stream cannot be replayed without duplicating them.
+        response = with_retries(
+            self.logger,
+            self.max_retries,
+            self.base_delay,
+            self._open_stream,
+            f"Opening stream from: {self.url}",
+            self.url,
+            self._conditional_headers()
+        )
+        if response is None:
+            self.logger.info("IMDb feed not modified since last run (HTTP 304).")
+            return FEED_UNCHANGED
+        return self._iter_items(response)
+
+    def _iter_items(self, response):
+        digest = hashlib.sha256()
+
+        def hashed_chunks():
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                digest.update(chunk)
+                yield chunk
+
+        with response:
+            chunks = hashed_chunks()
+            yield from iter_array_items(chunks, "items")
+            # Drain whatever follows the items array so the hash covers the whole body.
+            for _ in chunks:
+                pass
+        self._track(response, digest.hexdigest())
+
+    def _ranked_movies(self, items):
+        for m in items:
+            if 'rank' in m and m['rank'] not in ('', 'N/A'):
+                try:
+                    yield int(m['rank']), m
+                except ValueError:
+                    self.logger.warning(f"Skipping movie with invalid rank: {m.get('id', 'N/A')}")
+                    continue
 
     def get_top_rated_movies(self, items, top_n):
         try:
-            valid_movies = []
-            for m in items:
-                if 'rank' in m and m['rank'] not in ('', 'N/A'):
-                    try:
-                        m['rank'] = int(m['rank'])
-                        valid_movies.append(m)
-                    except ValueError:
-                        self.logger.warning(f"Skipping movie with invalid rank: {m.get('id', 'N/A')}")
-                        continue
-
-            sorted_movies = sorted(valid_movies, key=lambda m: m['rank'])
-            return sorted_movies[:top_n]
+            # Bounded heap: O(n log k) time and O(k) memory, so the feed can be an iterator of any size.
+            top_movies = heapq.nsmallest(top_n, self._ranked_movies(items), key=lambda ranked: ranked[0])
+            for rank, m in top_movies:
+                m['rank'] = rank
+            return [m for _, m in top_movies]
 
         except Exception as e:
             self.logger.error(f"Error sorting movies: {e}")
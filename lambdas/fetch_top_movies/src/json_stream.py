@@ -0,0 +1,143 @@
+import re
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# What the scanner stops at inside a string, inside an object or array, and after a number or literal.
+_STRING_SPECIAL = re.compile(r'["\\]')
+_CONTAINER_SPECIAL = re.compile(r'["{}\[\]]')
+_SCALAR_END = re.compile(r'[,\]}\s]')
+
+
+class _Buffer:
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def read_more(self):
+        if self.exhausted:
+            return False
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.exhausted = True
+            self.text = self.text[self.pos:] + self.utf8.decode(b"", final=True)
+            self.pos = 0
+            return True
+        if isinstance(chunk, bytes):
+            chunk = self.utf8.decode(chunk)
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.read_more():
+                raise ValueError("Unexpected end of JSON stream.")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at JSON stream position, got '{self.text[self.pos]}'.")
+        self.pos += 1
+
+    def scan_value(self, keep=True):
+        # Finds where the value at pos ends and returns the text it spans in earlier chunks.
+        # Scan state (depth, inside a string) survives reading more, so every character is looked at
+        # once however the value is split; without keep, scanned text is dropped instead of collected.
+        first = self.peek()
+        parts, i, depth, in_string = [], self.pos, 0, False
+        if first == '"':
+            i, in_string = i + 1, True
+
+        while True:
+            end = self._scan(first, i, depth, in_string)
+            if isinstance(end, int):
+                return parts, end
+            i, depth, in_string = end
+            if self.exhausted:
+                # Truncated or a number ending the stream; decoding reports which.
+                return parts, len(self.text)
+            if keep:
+                parts.append(self.text[self.pos:i])
+            self.pos = i
+            self.read_more()
+            i = 0
+
+    def _scan(self, first, i, depth, in_string):
+        # Returns the end index, or the (index, depth, in_string) to resume from once more text is read.
+        text = self.text
+        while True:
+            if in_string:
+                match = _STRING_SPECIAL.search(text, i)
+                if match is None:
+                    return len(text), depth, True
+                if match.group() == "\\":
+                    if match.end() >= len(text):
+                        # The escaped character is in the next chunk.
+                        return match.start(), depth, True
+                    i = match.end() + 1
+                    continue
+                i, in_string = match.end(), False
+                if depth == 0:
+                    return i
+            elif first in "{[":
+                match = _CONTAINER_SPECIAL.search(text, i)
+                if match is None:
+                    return len(text), depth, False
+                i = match.end()
+                char = match.group()
+                if char == '"':
+                    in_string = True
+                elif char in "{[":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return i
+            else:
+                match = _SCALAR_END.search(text, i)
+                if match is None:
+                    return len(text), depth, False
+                return match.start()
+
+    def decode_value(self):
+        parts, end = self.scan_value()
+        if not parts:
+            value, self.pos = _decoder.raw_decode(self.text, self.pos)
+            return value
+        value = json.loads("".join(parts) + self.text[self.pos:end])
+        self.pos = end
+        return value
+
+    def skip_value(self):
+        _, self.pos = self.scan_value(keep=False)
+
+
+def iter_array_items(chunks, key):
+    buffer = _Buffer(chunks)
+    buffer.expect("{")
+
+    while buffer.peek() != "}":
+        if buffer.peek() == ",":
+            buffer.pos += 1
+        name = buffer.decode_value()
+        buffer.expect(":")
+
+        if name != key:
+            buffer.skip_value()
+            continue
+
+        buffer.expect("[")
+        while buffer.peek() != "]":
+            if buffer.peek() == ",":
+                buffer.pos += 1
+            yield buffer.decode_value()
+        return
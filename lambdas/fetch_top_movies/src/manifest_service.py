@@ -0,0 +1,116 @@
+import json
+import hashlib
+
+# Only these decide what OMDb returns for a movie. Rank and rating counts move daily for most of
+# the chart, so they are passed on to silver with the carried-forward references instead.
+ENRICHMENT_FIELDS = ("id", "title", "year")
+CARRIED_FORWARD_FILE = "_carried_forward.json"
+
+def movie_hash(movie):
+    fields = {name: movie.get(name) for name in ENRICHMENT_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+class ManifestService:
+    # bronze_store is the bronze bucket: it holds the consumer's processed ledgers
+    # (bronze/{date}/_processed/{batch}.json) and each run's carried-forward references. A movie sent for enrichment stays pending until its ledger lists it as stored, so one that never
+    # made it to bronze (dead-lettered, failed upload, stored without OMDb data) is sent again.
+    def __init__(self, state_store, state_key, logger, bronze_store=None):
+        self.state_store = state_store
+        self.state_key = state_key
+        self.logger = logger
+        self.bronze_store = bronze_store
+        self._pending_manifest = None
+        self._previous = None
+
+    def _load_previous(self):
+        if self._previous is None:
+            movies = (self.state_store.load(self.state_key) or {}).get("movies", {})
+            self._previous = (movies, self._confirmed(movies))
+        return self._previous
+
+    def has_unconfirmed(self):
+        # Movies sent on an earlier run that never reached bronze have to go out again, even when the
+        # IMDb feed itself has not changed since.
+        previous, confirmed = self._load_previous()
+        return any(imdb_id not in confirmed for imdb_id in previous)
+
+    def _confirmed(self, previous):
+        confirmed, ids_by_ledger = set(), {}
+        for imdb_id, entry in previous.items():
+            if not entry.get("pending"):
+                confirmed.add(imdb_id)
+            elif entry.get("ledger") and self.bronze_store:
+                ids_by_ledger.setdefault(entry["ledger"], set()).add(imdb_id)
+
+        found = 0
+        for ledger_key, ids in ids_by_ledger.items():
+            ledger = self.bronze_store.load(ledger_key)
+            found += ledger is not None
+            confirmed |= ids & set((ledger or {}).get("enriched", []))
+        if ids_by_ledger and not found:
+            self.logger.warning(
+                f"None of the {len(ids_by_ledger)} processed ledger(s) of the last run exist, so no movie is "
+                f"carried forward. Delta enqueue needs PROCESSED_LEDGER_ENABLED=true on the consumer."
+            )
+        return confirmed
+
+    def plan(self, movies, run_date, ignore_previous=False):
+        previous, confirmed = ({}, set()) if ignore_previous else self._load_previous()
+        # Read once per run; has_unconfirmed may already have loaded it.
+        self._previous = None
+
+        to_enqueue, carried_forward, manifest, unconfirmed = [], {}, {}, 0
+        for movie in movies:
+            imdb_id = movie.get("id")
+            digest = movie_hash(movie)
+            entry = previous.get(imdb_id)
+
+            if imdb_id and entry and entry.get("hash") == digest and entry.get("key"):
+                if imdb_id in confirmed:
+                    carried_forward[imdb_id] = entry["key"]
+                    manifest[imdb_id] = {"hash": digest, "key": entry["key"]}
+                    continue
+                unconfirmed += 1
+
+            to_enqueue.append(movie)
+            if imdb_id:
+                manifest[imdb_id] = {"hash": digest, "key": f"bronze/{run_date}/{imdb_id}.json", "pending": True}
+
+        self._pending_manifest = {"run_date": run_date, "movies": manifest}
+        self.logger.info(
+            f"Delta plan: {len(to_enqueue)} new or changed movie(s), {len(carried_forward)} carried forward, "
+            f"{unconfirmed} sent again because their earlier enrichment was never confirmed."
+        )
+        return to_enqueue, carried_forward
+
+    def save_references(self, run_date, carried_forward, movies):
+        # Unchanged movies are not re-enriched; silver reads them from their previous bronze objects and
+        # overlays today's feed entry, so rank and rating counts stay current. Written even when empty
+        # so a same-day rerun never leaves stale references behind.
+        self.bronze_store.save(f"bronze/{run_date}/{CARRIED_FORWARD_FILE}", {
+            "movies": carried_forward,
+            "feed": {movie["id"]: movie for movie in movies if movie.get("id") in carried_forward}
+        })
+
+    def assign_keys(self, keys):
+        # Points movies at the object they will actually be stored in, e.g. a shared NDJSON batch.
+        self._assign("key", keys)
+
+    def assign_ledgers(self, ledgers):
+        # Where the consumer will confirm each pending movie once its bronze object is stored.
+        self._assign("ledger", ledgers)
+
+    def _assign(self, field, values):
+        if not self._pending_manifest:
+            return
+        movies = self._pending_manifest["movies"]
+        for imdb_id, value in values.items():
+            if imdb_id in movies and movies[imdb_id].get("pending"):
+                movies[imdb_id][field] = value
+
+    def commit(self):
+        if not self._pending_manifest:
+            return False
+        self.state_store.save(self.state_key, self._pending_manifest)
+        self.logger.info(f"Saved movie manifest with {len(self._pending_manifest['movies'])} entries.")
+        return True
@@ -0,0 +1,58 @@
+import gzip
+import json
+import base64
+import hashlib
+from .utils import with_retries
+
+GZIP_ENCODING = "gzip+base64"
+CLAIM_CHECK_PREFIX = "claim-checks/"
+# SQS bills every 64 KB of a message as one request.
+DEFAULT_CLAIM_CHECK_BYTES = 64 * 1024
+
+def compress_body(message_body):
+    payload = base64.b64encode(gzip.compress(message_body.encode("utf-8"), mtime=0)).decode("ascii")
+    return json.dumps({"encoding": GZIP_ENCODING, "payload": payload})
+
+class ClaimCheckStore:
+    def __init__(self, client, bucket, max_retries, base_delay, logger, prefix=CLAIM_CHECK_PREFIX):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.logger = logger
+
+    def put(self, message_body, run_date=None):
+        data = message_body.encode("utf-8")
+        # Keyed by content so a resent message points at the object its first attempt wrote.
+        key = f"{self.prefix}{run_date or 'undated'}/{hashlib.sha256(data).hexdigest()}.json.gz"
+        with_retries(
+            self.logger,
+            self.max_retries,
+            self.base_delay,
+            self.client.put_object,
+            f"Storing claim check at s3://{self.bucket}/{key}",
+            Bucket=self.bucket,
+            Key=key,
+            Body=gzip.compress(data, mtime=0),
+            ContentType="application/json",
+            ContentEncoding="gzip"
+        )
+        return {"bucket": self.bucket, "key": key}
+
+class MessageEncoder:
+    def __init__(self, compress=False, claim_check_store=None, claim_check_bytes=DEFAULT_CLAIM_CHECK_BYTES):
+        self.compress = compress
+        self.claim_check_store = claim_check_store
+        self.claim_check_bytes = claim_check_bytes
+
+    def encode(self, message_body, run_date=None):
+        encoded = message_body
+        if self.compress:
+            compressed = compress_body(message_body)
+            if len(compressed) < len(encoded):
+                encoded = compressed
+
+        if self.claim_check_store and len(encoded.encode("utf-8")) > self.claim_check_bytes:
+            return json.dumps({"claim_check": self.claim_check_store.put(message_body, run_date)})
+        return encoded
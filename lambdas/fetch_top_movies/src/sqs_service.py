@@ -1,14 +1,75 @@
 import json
-import uuid
+import hashlib
+import zlib
 from .utils import with_retries
 
+MAX_ENTRIES_PER_CALL = 10
+MAX_PAYLOAD_BYTES_PER_CALL = 256 * 1024
+MAX_MESSAGE_BYTES = 256 * 1024
+# Room left in every message for the envelope ("is_final_batch", "run_date", ...).
+MESSAGE_ENVELOPE_RESERVE = 1024
+
+def pack_movies(movies, max_bytes=MAX_MESSAGE_BYTES, max_movies=None, message_limit=MAX_MESSAGE_BYTES):
+    # message_limit=None lifts the SQS cap, for batches that travel through a claim check.
+    limit = message_limit if message_limit is not None else max_bytes
+    budget = min(max_bytes, limit) - MESSAGE_ENVELOPE_RESERVE
+    batches, batch, batch_bytes = [], [], 0
+
+    for movie in movies:
+        # ", " separates list items in json.dumps output.
+        movie_bytes = len(json.dumps(movie).encode("utf-8")) + 2
+        if message_limit is not None and movie_bytes > message_limit - MESSAGE_ENVELOPE_RESERVE:
+            raise ValueError(f"Movie {movie.get('id', 'N/A')} is {movie_bytes} bytes, over the SQS message limit.")
+
+        full = max_movies is not None and len(batch) >= max_movies
+        if batch and (full or batch_bytes + movie_bytes > budget):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(movie)
+        batch_bytes += movie_bytes
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+def shard_of(movie_id, message_groups):
+    # crc32 rather than hash(): it must give the same shard in every Lambda process.
+    return zlib.crc32(str(movie_id).encode("utf-8")) % message_groups
+
+def partition_by_shard(movies, message_groups):
+    shards = {}
+    for movie in movies:
+        shards.setdefault(shard_of(movie.get("id", ""), message_groups), []).append(movie)
+    return dict(sorted(shards.items()))
+
+def deduplication_id(run_date, batch):
+    # Same date and same movies give the same id, so FIFO deduplication absorbs a re-fired run.
+    movie_ids = sorted(str(movie.get("id", "")) if isinstance(movie, dict) else str(movie) for movie in batch)
+    return hashlib.sha256(f"{run_date or ''}|{','.join(movie_ids)}".encode("utf-8")).hexdigest()
+
+def batch_object_key(run_date, batch):
+    # Where the consumer stores a message's movies under the NDJSON bronze layout.
+    return f"bronze/{run_date}/batch-{deduplication_id(run_date, batch)[:16]}.ndjson"
+
+def processed_ledger_key(run_date, batch):
+    # Where the consumer lists the movies of a message it has enriched and stored.
+    return f"bronze/{run_date}/_processed/{deduplication_id(run_date, batch)[:16]}.json"
+
+def run_id(run_date, batches):
+    # Derived from the message ids rather than the movie ids: the same movies split into different
+    # messages (another message size or group count) must not share completion markers.
+    message_ids = sorted(deduplication_id(run_date, batch) for batch in batches)
+    return hashlib.sha256(f"{run_date or ''}|{','.join(message_ids)}".encode("utf-8")).hexdigest()[:16]
+
 class SQSService:
-    def __init__(self, sqs_client, queue_url, max_retries, base_delay, logger):
+    def __init__(self, sqs_client, queue_url, max_retries, base_delay, logger, run_date=None, encoder=None):
         self.sqs = sqs_client
         self.queue_url = queue_url
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.logger = logger
+        self.run_date = run_date
+        self.encoder = encoder
 
     def _send_single(self, message_body, message_group_id, deduplication_id):
         self.sqs.send_message(
@@ -19,19 +80,93 @@ class SQSService:
         )
         return True
 
-    def send_batch(self, batch, is_final_batch=False):
-        message_body = json.dumps({
+    def _send_entries(self, entries):
+        response = self.sqs.send_message_batch(
+            QueueUrl=self.queue_url,
+            Entries=entries
+        )
+        return response.get("Failed", [])
+
+    def _group_id(self, shard):
+        return "movies-group" if shard is None else f"movies-group-{shard}"
+
+    def _build_body(self, batch, is_final_batch, shard=None, run=None):
+        body = {
             "movies": batch,
             "is_final_batch": is_final_batch
-        })
-
-        return with_retries(
-            self.logger,
-            self.max_retries,
-            self.base_delay,
-            self._send_single,
-            f"Sending batch with {len(batch)} movies to SQS",
-            message_body,
-            "movies-group",
-            str(uuid.uuid4())
-        )
+        }
+        if self.run_date:
+            body["run_date"] = self.run_date
+        if shard is not None:
+            body["shard"] = shard
+        if run:
+            # run_id and the expected message and movie counts; the consumer that stores the
+            # last of them writes _SUCCESS, whatever order the messages were processed in.
+            body.update(run)
+        message_body = json.dumps(body)
+        return self.encoder.encode(message_body, self.run_date) if self.encoder else message_body
+
+    def _build_entry(self, entry_id, batch, is_final_batch=False, shard=None, run=None):
+        return {
+            "Id": entry_id,
+            "MessageBody": self._build_body(batch, is_final_batch, shard, run),
+            "MessageGroupId": self._group_id(shard),
+            "MessageDeduplicationId": deduplication_id(self.run_date, batch)
+        }
+
+    def _chunk_entries(self, entries):
+        chunk, chunk_bytes = [], 0
+        for entry in entries:
+            entry_bytes = len(entry["MessageBody"].encode("utf-8"))
+            if chunk and (len(chunk) == MAX_ENTRIES_PER_CALL or chunk_bytes + entry_bytes > MAX_PAYLOAD_BYTES_PER_CALL):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append(entry)
+            chunk_bytes += entry_bytes
+        if chunk:
+            yield chunk
+
+    def send_batches(self, batches, is_final_batch=False, shards=None, run=None):
+        entries = [
+            self._build_entry(str(idx), batch, is_final_batch, shards[idx] if shards else None, run)
+            for idx, batch in enumerate(batches)
+        ]
+        failed_indexes = []
+
+        for chunk in self._chunk_entries(entries):
+            try:
+                failed = with_retries(
+                    self.logger,
+                    self.max_retries,
+                    self.base_delay,
+                    self._send_entries,
+                    f"Sending {len(chunk)} messages to SQS in one call",
+                    chunk
+                )
+            except Exception as e:
+                self.logger.error(f"Batch call to SQS failed: {e}")
+                failed_indexes.extend(int(entry["Id"]) for entry in chunk)
+                continue
+
+            entries_by_id = {entry["Id"]: entry for entry in chunk}
+            for failure in failed:
+                entry = entries_by_id[failure["Id"]]
+                self.logger.warning(
+                    f"Message {entry['Id']} rejected by SQS ({failure.get('Code')}: {failure.get('Message')}). Retrying individually."
+                )
+                try:
+                    with_retries(
+                        self.logger,
+                        self.max_retries,
+                        self.base_delay,
+                        self._send_single,
+                        f"Resending message {entry['Id']} to SQS",
+                        entry["MessageBody"],
+                        entry["MessageGroupId"],
+                        entry["MessageDeduplicationId"]
+                    )
+                except Exception as e:
+                    self.logger.error(f"Message {entry['Id']} could not be sent: {e}")
+                    failed_indexes.append(int(entry["Id"]))
+
+        return sorted(failed_indexes)
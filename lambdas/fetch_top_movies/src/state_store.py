@@ -0,0 +1,55 @@
+import json
+from botocore.exceptions import ClientError
+from .utils import with_retries
+
+class S3StateStore:
+    def __init__(self, client, bucket, prefix, max_retries, base_delay, logger):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.logger = logger
+
+    def _key(self, name):
+        return f"{self.prefix}{name}"
+
+    def load(self, name):
+        key = self._key(name)
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+            return json.loads(response["Body"].read())
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                self.logger.info(f"No previous state at s3://{self.bucket}/{key}")
+            else:
+                self.logger.warning(f"Could not load state from s3://{self.bucket}/{key}: {e}")
+            return None
+        except Exception as e:
+            self.logger.warning(f"Could not load state from s3://{self.bucket}/{key}: {e}")
+            return None
+
+    def save(self, name, data):
+        key = self._key(name)
+        with_retries(
+            self.logger,
+            self.max_retries,
+            self.base_delay,
+            self.client.put_object,
+            f"Saving state to s3://{self.bucket}/{key}",
+            Bucket=self.bucket,
+            Key=key,
+            Body=json.dumps(data),
+            ContentType="application/json"
+        )
+
+
+class InMemoryStateStore:
+    def __init__(self):
+        self.data = {}
+
+    def load(self, name):
+        return self.data.get(name)
+
+    def save(self, name, data):
+        self.data[name] = data
@@ -3,6 +3,7 @@ import logging
 from datetime import datetime
 from src.processor import BronzeToSilverProcessor
 from src.s3_service import S3Service
+from src.silver_table import SilverTable
 from src.utils import build_response
 
 logger = logging.getLogger()
@@ -12,6 +13,10 @@ S3_BUCKET_SOURCE = os.environ.get("S3_BUCKET_SOURCE")
 S3_BUCKET_TARGET = os.environ.get("S3_BUCKET_TARGET")
 MAX_RETRIES = int(os.environ.get("MAX_RETRIES", "3"))
 BASE_DELAY_SECONDS = int(os.environ.get("BASE_DELAY_SECONDS", "1"))
+LOAD_WORKERS = int(os.environ.get("LOAD_WORKERS", "16"))
+SILVER_FORMAT = os.environ.get("SILVER_FORMAT", "csv").lower()
+# "snapshot" rewrites silver/movies_normalized.* from one bronze date; "incremental" upserts into silver/movies/.
+SILVER_MODE = os.environ.get("SILVER_MODE", "snapshot").lower()
 
 def lambda_handler(event, context):
     logger.info("Starting process_bronze_to_silver Lambda...")
@@ -21,10 +26,14 @@ def lambda_handler(event, context):
         prefix = f"bronze/{date_str}/"
         logger.info(f"Triggered for date: {date_str}")
 
-        s3_service = S3Service(logger, MAX_RETRIES, BASE_DELAY_SECONDS)
-        processor = BronzeToSilverProcessor(s3_service, S3_BUCKET_SOURCE, S3_BUCKET_TARGET)
+        s3_service = S3Service(logger, MAX_RETRIES, BASE_DELAY_SECONDS, max_pool_connections=LOAD_WORKERS)
+        processor = BronzeToSilverProcessor(s3_service, S3_BUCKET_SOURCE, S3_BUCKET_TARGET, max_workers=LOAD_WORKERS,
+                                            output_format=SILVER_FORMAT)
 
-        record_count = processor.process(prefix)
+        if SILVER_MODE == "incremental":
+            record_count = processor.process_incremental(prefix, SilverTable(s3_service, S3_BUCKET_TARGET))
+        else:
+            record_count = processor.process(prefix)
 
         return build_response(200, f"Processed {record_count} records for {date_str}")
 
@@ -1,31 +1,262 @@
+import json
 import pandas as pd
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from .schema import apply_schema
+from .silver_table import KEY_COLUMN, bronze_date
+
+CARRIED_FORWARD_FILE = "_carried_forward.json"
+FEED_FIELDS = ("rank", "imdbratingcount")
+NDJSON_SUFFIX = ".ndjson"
+DEFAULT_LOAD_WORKERS = 1
+LOAD_AHEAD = 2
+SILVER_KEYS = {
+    "csv": "silver/movies_normalized.csv",
+    "parquet": "silver/movies_normalized.parquet"
+}
+DEFAULT_OUTPUT_FORMAT = "csv"
+
+def record_id(record):
+    return record.get("id") or record.get("imdbID")
+
+def feed_fields(feed_entry):
+    # The daily chart fields OMDb has no equivalent for. Title, year and rating also appear in the feed,
+    # but OMDb's values win in bronze, so they must not be replaced by the feed's on carried-forward rows.
+    return {name: value for name, value in feed_entry.items() if name.lower() in FEED_FIELDS}
+
+def overlay_feed(record, feed_entry):
+    # Today's rank and rating count win over the ones the record was enriched with, whatever the key's case.
+    fields = feed_fields(feed_entry)
+    names = {name.lower(): name for name in fields}
+    merged = {}
+    for key, value in record.items():
+        name = names.get(key.lower())
+        if name is None:
+            merged[key] = value
+        else:
+            merged[name] = fields[name]
+    merged.update(fields)
+    return merged
+
+class ColumnBuffers:
+    # Appends each record straight into per-column lists, so the frame is built once at the end
+    # without a list of per-record dicts alongside it. Columns keep first-seen order.
+    def __init__(self):
+        self.columns = {}
+        self.count = 0
+
+    def append(self, obj):
+        row = {
+            k.lower(): v for k, v in obj.items()
+            if isinstance(v, (str, int, float, bool, list))
+        }
+        for name, value in row.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = [None] * self.count
+            column.append(value)
+        self.count += 1
+        if len(row) < len(self.columns):
+            for column in self.columns.values():
+                if len(column) < self.count:
+                    column.append(None)
+
+    def to_frame(self):
+        columns, self.columns = self.columns, {}
+        return pd.DataFrame(columns, index=pd.RangeIndex(self.count))
 
 class BronzeToSilverProcessor:
-    def __init__(self, s3_service, source_bucket, target_bucket):
+    def __init__(self, s3_service, source_bucket, target_bucket, max_workers=DEFAULT_LOAD_WORKERS,
+                 output_format=DEFAULT_OUTPUT_FORMAT):
+        if output_format not in SILVER_KEYS:
+            raise ValueError(f"Unsupported silver format {output_format!r}, expected one of {', '.join(SILVER_KEYS)}")
         self.s3 = s3_service
         self.source_bucket = source_bucket
         self.target_bucket = target_bucket
+        self.max_workers = max_workers
+        self.output_format = output_format
 
     def process(self, prefix):
         object_keys = self.s3.list_json_objects(self.source_bucket, prefix)
-        if not object_keys:
+        buffers, present_ids = ColumnBuffers(), set()
+        for _, records in self.iter_many(object_keys):
+            for record in records:
+                present_ids.add(record_id(record))
+                buffers.append(record)
+
+        references = self.load_references(prefix)
+        carried_forward_keys = self.carried_forward_keys(references, present_ids)
+        if not object_keys and not carried_forward_keys:
             raise Exception(f"No .json files found under {prefix}")
 
-        json_objects = [self.s3.load_json(self.source_bucket, key) for key in object_keys]
-        df = self.normalize_records(json_objects)
+        for record in self.load_carried_forward(carried_forward_keys, references.get("feed")):
+            buffers.append(record)
+        self.s3.logger.info(f"Normalized {buffers.count} records from JSON objects")
+        # Gold reads Parquet by column name, so a file must have every schema column even when empty.
+        df = apply_schema(buffers.to_frame(), complete=self.output_format == "parquet")
 
-        output_key = "silver/movies_normalized.csv"
-        self.s3.save_csv(self.target_bucket, output_key, df.to_csv(index=False))
+        output_key = SILVER_KEYS[self.output_format]
+        if self.output_format == "parquet":
+            # Keeps the schema's types, so gold reads numbers and dates instead of re-parsing text.
+            self.s3.save_parquet(self.target_bucket, output_key, df)
+        else:
+            self.s3.save_csv(self.target_bucket, output_key, df.to_csv(index=False))
 
         return len(df)
 
-    def normalize_records(self, json_objects):
-        records = []
-        for obj in json_objects:
-            flattened = {
-                k.lower(): v for k, v in obj.items()
-                if isinstance(v, (str, int, float, bool, list))
-            }
-            records.append(flattened)
-        self.s3.logger.info(f"Normalized {len(records)} records from JSON objects")
-        return pd.DataFrame(records)
+    def process_incremental(self, prefix, table):
+        # Upserts only bronze objects written since the table's watermark, so a run costs in proportion
+        # to the movies that changed rather than to the whole catalog.
+        run_date = bronze_date(prefix)
+        table.load_state()
+        objects = self.s3.list_json_objects_since(self.source_bucket, "bronze/", start_after=table.list_start(run_date))
+        new_objects = table.newer_than_watermark(objects)
+
+        keys_by_date = {}
+        for obj in new_objects:
+            keys_by_date.setdefault(bronze_date(obj["Key"]), []).append(obj["Key"])
+
+        upserted = 0
+        for date in sorted(keys_by_date):
+            keys = keys_by_date[date]
+            upserted += self.upsert(table, date, self.iter_many(keys), keys)
+
+        # Unchanged movies are already in the table unless it was started after they were last enriched.
+        references = self.load_references(prefix)
+        carried_forward = self.carried_forward_keys(references, set())
+        backfill = {imdb_id: carried_forward[imdb_id] for imdb_id in table.missing(carried_forward)}
+        if backfill:
+            records = self.load_carried_forward(backfill)
+            upserted += self.upsert(table, run_date, [(None, records)], sorted(set(backfill.values())))
+
+        table.advance_watermark(new_objects)
+        dropped = table.retain(run_date, set(carried_forward))
+        # Their rows keep the feed fields of the day they were enriched; today's rank and counts are
+        # kept next to them in the state, so no row is rewritten just because the chart moved.
+        table.overlay_feed(run_date, self.normalize_feed(references.get("feed", {})))
+        table.commit()
+
+        self.s3.logger.info(
+            f"Upserted {upserted} movie(s) from {len(new_objects)} new bronze object(s); "
+            f"{dropped} dropped, {len(table.state['movies'])} current"
+        )
+        return upserted
+
+    def upsert(self, table, date, loaded, source_keys):
+        buffers, ids = ColumnBuffers(), []
+        for _, records in loaded:
+            for record in records:
+                imdb_id = record_id(record)
+                if not imdb_id:
+                    self.s3.logger.warning("Skipping a bronze record without an IMDb id")
+                    continue
+                ids.append(imdb_id)
+                buffers.append(record)
+        if not ids:
+            return 0
+
+        df = apply_schema(buffers.to_frame(), complete=True)
+        df[KEY_COLUMN] = ids
+        # Objects arrive oldest first, so the last row of a movie is its newest version.
+        df = df.drop_duplicates(subset=KEY_COLUMN, keep="last").reset_index(drop=True)
+        table.upsert(date, df, source_keys)
+        return len(df)
+
+    def load_records(self, key, missing_ok=False):
+        # Bronze holds either one JSON object per movie or one NDJSON object per enriched batch.
+        if key.endswith(NDJSON_SUFFIX):
+            load = self.s3.load_ndjson_if_exists if missing_ok else self.s3.load_ndjson
+            return load(self.source_bucket, key)
+        load = self.s3.load_json_if_exists if missing_ok else self.s3.load_json
+        obj = load(self.source_bucket, key)
+        return None if obj is None else [obj]
+
+    def iter_many(self, keys, missing_ok=False):
+        # Yields (key, records) pairs in key order as they arrive. Every key is attempted before
+        # failing, so one error message names all objects that could not be read.
+        def load(key):
+            try:
+                return key, self.load_records(key, missing_ok=missing_ok), None
+            except Exception as e:
+                return key, None, e
+
+        errors = {}
+        if self.max_workers <= 1 or len(keys) <= 1:
+            yield from self._collect(map(load, keys), errors)
+        else:
+            # GETs are latency bound; the S3 client's pool must be at least max_workers wide.
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(keys))) as executor:
+                yield from self._collect(self._bounded_map(executor, load, keys), errors)
+
+        if errors:
+            for key, error in errors.items():
+                self.s3.logger.error(f"Could not load {key}: {error}")
+            raise Exception(f"Failed to load {len(errors)} of {len(keys)} bronze object(s): {', '.join(errors)}")
+
+    def _bounded_map(self, executor, func, keys):
+        # executor.map submits every key up front, so a slow consumer would have the whole prefix
+        # downloaded and held in memory. At most LOAD_AHEAD loads per worker are in flight or waiting.
+        pending, keys = deque(), iter(keys)
+        for key in islice(keys, self.max_workers * LOAD_AHEAD):
+            pending.append(executor.submit(func, key))
+        while pending:
+            result = pending.popleft().result()
+            for key in islice(keys, 1):
+                pending.append(executor.submit(func, key))
+            yield result
+
+    def _collect(self, results, errors):
+        for key, records, error in results:
+            if error is not None:
+                errors[key] = error
+            else:
+                yield key, records
+
+    def load_many(self, keys, missing_ok=False):
+        return list(self.iter_many(keys, missing_ok=missing_ok))
+
+    def load_references(self, prefix):
+        # {"movies": {id: bronze key}, "feed": {id: today's feed entry}} for movies not enriched again.
+        return self.s3.load_json_if_exists(self.source_bucket, f"{prefix}{CARRIED_FORWARD_FILE}") or {}
+
+    def carried_forward_keys(self, references, present_ids):
+        if not references:
+            return {}
+
+        keys = {
+            imdb_id: key for imdb_id, key in references.get("movies", {}).items()
+            if imdb_id not in present_ids
+        }
+        self.s3.logger.info(f"Carrying forward {len(keys)} unchanged movie(s) from earlier runs")
+        return keys
+
+    def load_carried_forward(self, references, feed=None):
+        # Several movies can point at the same batch object, so each key is read only once.
+        wanted_by_key = {}
+        for imdb_id, key in references.items():
+            wanted_by_key.setdefault(key, set()).add(imdb_id)
+
+        json_objects = []
+        for key, records in self.load_many(list(wanted_by_key), missing_ok=True):
+            wanted = wanted_by_key[key]
+            if records is None:
+                self.s3.logger.warning(f"Carried forward object {key} no longer exists. Skipping.")
+                continue
+            if key.endswith(NDJSON_SUFFIX):
+                records = [record for record in records if record_id(record) in wanted]
+            if feed:
+                records = [overlay_feed(record, feed.get(record_id(record), {})) for record in records]
+            json_objects.extend(records)
+        return json_objects
+
+    def normalize_feed(self, feed):
+        # {id: {silver column: typed value}} in a JSON-safe form for the table state.
+        if not feed:
+            return {}
+        buffers = ColumnBuffers()
+        for entry in feed.values():
+            buffers.append(feed_fields(entry))
+        df = apply_schema(buffers.to_frame())
+        df.index = list(feed)
+        return json.loads(df.to_json(orient="index", date_format="iso"))
@@ -1,27 +1,77 @@
+import io
 import json
 import boto3
+from botocore.config import Config
 from src.utils import with_retries
 
+PARQUET_COMPRESSION = "zstd"
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+# botocore's default pool size; concurrent loads need at least one connection per worker.
+DEFAULT_POOL_CONNECTIONS = 10
+
 class S3Service:
-    def __init__(self, logger, max_retries, base_delay):
+    def __init__(self, logger, max_retries, base_delay, max_pool_connections=DEFAULT_POOL_CONNECTIONS):
         self.logger = logger
         self.max_retries = max_retries
         self.base_delay = base_delay
-        self.s3 = boto3.client("s3")
+        # Standard retry mode backs off on throttling, 5xx and dropped connections, but not on missing keys.
+        config = Config(
+            max_pool_connections=max(DEFAULT_POOL_CONNECTIONS, max_pool_connections),
+            retries={"max_attempts": max_retries, "mode": "standard"}
+        )
+        self.s3 = boto3.client("s3", config=config)
 
     def list_json_objects(self, bucket, prefix):
+        return [obj["Key"] for obj in self.list_json_objects_since(bucket, prefix)]
+
+    def list_json_objects_since(self, bucket, prefix, start_after=None):
+        # Returns {"Key", "LastModified"} for each movie object, optionally only keys sorting after start_after.
         paginator = self.s3.get_paginator("list_objects_v2")
+        params = {"Bucket": bucket, "Prefix": prefix}
+        if start_after:
+            params["StartAfter"] = start_after
         result = []
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for page in paginator.paginate(**params):
             for obj in page.get("Contents", []):
-                if obj["Key"].endswith(".json") and "_success" not in obj["Key"]:
-                    result.append(obj["Key"])
+                parts = obj["Key"].split("/")
+                # Files and folders starting with "_" are pipeline metadata (markers, references, ledgers), not movies.
+                if parts[-1].endswith((".json", ".ndjson")) and not any(part.startswith("_") for part in parts):
+                    result.append({"Key": obj["Key"], "LastModified": obj.get("LastModified")})
         return result
 
     def load_json(self, bucket, key):
         response = self.s3.get_object(Bucket=bucket, Key=key)
         return json.loads(response["Body"].read())
 
+    def load_json_if_exists(self, bucket, key):
+        try:
+            return self.load_json(bucket, key)
+        except self.s3.exceptions.NoSuchKey:
+            return None
+
+    def load_ndjson(self, bucket, key):
+        response = self.s3.get_object(Bucket=bucket, Key=key)
+        return [json.loads(line) for line in response["Body"].iter_lines() if line.strip()]
+
+    def load_ndjson_if_exists(self, bucket, key):
+        try:
+            return self.load_ndjson(bucket, key)
+        except self.s3.exceptions.NoSuchKey:
+            return None
+
+    def save_json(self, bucket, key, data):
+        with_retries(
+            self.logger,
+            self.max_retries,
+            self.base_delay,
+            self.s3.put_object,
+            f"Uploading silver file to {key}",
+            Bucket=bucket,
+            Key=key,
+            Body=json.dumps(data).encode("utf-8"),
+            ContentType="application/json"
+        )
+
     def save_csv(self, bucket, key, csv_data):
         with_retries(
             self.logger,
@@ -35,3 +85,19 @@ class S3Service:
             ContentType="text/csv"
         )
         self.logger.info(f"Saved silver file to s3://{bucket}/{key}")
+
+    def save_parquet(self, bucket, key, df, compression=PARQUET_COMPRESSION):
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False, compression=compression)
+        with_retries(
+            self.logger,
+            self.max_retries,
+            self.base_delay,
+            self.s3.put_object,
+            f"Uploading silver file to {key}",
+            Bucket=bucket,
+            Key=key,
+            Body=buffer.getvalue(),
+            ContentType=PARQUET_CONTENT_TYPE
+        )
+        self.logger.info(f"Saved silver file to s3://{bucket}/{key}")
@@ -0,0 +1,67 @@
+import pandas as pd
+
+# OMDb returns every field as display text ("1,234,567", "$292,576,195", "130 min", "N/A").
+# Silver parses them once into typed columns so gold and notebooks can aggregate directly.
+SILVER_SCHEMA = {
+    "rank": "integer",
+    "year": "year",
+    "imdbrating": "decimal",
+    "imdbratingcount": "integer",
+    "imdbvotes": "integer",
+    "metascore": "integer",
+    "boxoffice": "integer",
+    "runtime": "integer",
+    "released": "date",
+    # Text columns are listed so every partition has them, even one built only from movies OMDb had
+    # nothing for; gold reads them by name.
+    "title": "text",
+    "rated": "text",
+    "genre": "text",
+    "director": "text",
+    "writer": "text",
+    "actors": "text",
+    "plot": "text",
+    "language": "text",
+    "country": "text",
+    "awards": "text",
+}
+RELEASED_FORMAT = "%d %b %Y"
+
+def _number(series):
+    # Drops thousands separators, currency symbols and units; "N/A" and blanks become missing.
+    return pd.to_numeric(series.astype("string").str.replace(r"[^\d.]", "", regex=True), errors="coerce")
+
+def parse_integer(series):
+    return _number(series).round().astype("Int64")
+
+def parse_decimal(series):
+    return _number(series).astype("float64")
+
+def parse_year(series):
+    # Series report a range such as "2008–2013"; the first year is the release year.
+    years = series.astype("string").str.extract(r"(\d{4})", expand=False)
+    return pd.to_numeric(years, errors="coerce").astype("Int64")
+
+def parse_date(series):
+    return pd.to_datetime(series.astype("string"), format=RELEASED_FORMAT, errors="coerce")
+
+def parse_text(series):
+    return series.astype("string")
+
+PARSERS = {
+    "integer": parse_integer,
+    "decimal": parse_decimal,
+    "year": parse_year,
+    "date": parse_date,
+    "text": parse_text,
+}
+
+def apply_schema(df, schema=SILVER_SCHEMA, complete=False):
+    # complete adds absent schema columns as missing values, so every file of a table has the same columns
+    # even when none of its movies had e.g. box office.
+    for column, kind in schema.items():
+        if complete and column not in df.columns:
+            df[column] = None
+        if column in df.columns:
+            df[column] = PARSERS[kind](df[column])
+    return df
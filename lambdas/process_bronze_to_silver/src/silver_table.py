@@ -0,0 +1,106 @@
+import hashlib
+from datetime import datetime
+
+TABLE_PREFIX = "silver/movies/"
+STATE_FILE = "_state.json"
+KEY_COLUMN = "imdbid"
+
+def bronze_date(key):
+    # bronze/{date}/... -> {date}
+    return key.split("/")[1]
+
+def empty_state():
+    return {"watermark": None, "watermark_keys": [], "last_date": None, "movies": {}}
+
+# Silver as a date-partitioned Parquet table: silver/movies/date={date}/part-{digest}.parquet.
+# Partitions only ever gain files, so earlier versions of a movie stay readable as history.
+# The state object holds the bronze watermark and, per imdbid, the file with its current row.
+class SilverTable:
+    def __init__(self, s3_service, bucket, prefix=TABLE_PREFIX):
+        self.s3 = s3_service
+        self.bucket = bucket
+        self.prefix = prefix
+        self.state = empty_state()
+
+    @property
+    def state_key(self):
+        return f"{self.prefix}{STATE_FILE}"
+
+    def load_state(self):
+        self.state = self.s3.load_json_if_exists(self.bucket, self.state_key) or empty_state()
+        return self.state
+
+    def commit(self):
+        self.s3.save_json(self.bucket, self.state_key, self.state)
+
+    def list_start(self, run_date):
+        # Bronze keys sort by date, so listing can start at the older of the last processed date and this run.
+        dates = [date for date in (self.state["last_date"], run_date) if date]
+        return f"bronze/{min(dates)}/" if dates else None
+
+    def newer_than_watermark(self, objects):
+        # S3 timestamps have one-second resolution, so keys already taken at the watermark second are remembered.
+        watermark = self.state["watermark"]
+        if watermark is None:
+            selected = list(objects)
+        else:
+            watermark, seen = datetime.fromisoformat(watermark), set(self.state["watermark_keys"])
+            selected = [
+                obj for obj in objects
+                if obj["LastModified"] > watermark or (obj["LastModified"] == watermark and obj["Key"] not in seen)
+            ]
+        return sorted(selected, key=lambda obj: (obj["LastModified"], obj["Key"]))
+
+    def advance_watermark(self, objects):
+        if not objects:
+            return
+        latest = max(obj["LastModified"] for obj in objects)
+        keys = {obj["Key"] for obj in objects if obj["LastModified"] == latest}
+        if self.state["watermark"] and datetime.fromisoformat(self.state["watermark"]) == latest:
+            keys.update(self.state["watermark_keys"])
+        self.state["watermark"] = latest.isoformat()
+        self.state["watermark_keys"] = sorted(keys)
+        self.state["last_date"] = max(filter(None, [self.state["last_date"], *map(bronze_date, keys)]))
+
+    def partition_key(self, date, source_keys, imdb_ids):
+        # Named after its contents, so a retry after a failed commit overwrites the same file.
+        content = "\n".join([*sorted(source_keys), *sorted(imdb_ids)])
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+        return f"{self.prefix}date={date}/part-{digest}.parquet"
+
+    def upsert(self, date, df, source_keys):
+        key = self.partition_key(date, source_keys, df[KEY_COLUMN])
+        self.s3.save_parquet(self.bucket, key, df)
+        movies = self.state["movies"]
+        for imdb_id in df[KEY_COLUMN]:
+            movies[imdb_id] = {"date": date, "key": key}
+        return key
+
+    def missing(self, imdb_ids):
+        return [imdb_id for imdb_id in imdb_ids if imdb_id not in self.state["movies"]]
+
+    def is_latest(self, run_date):
+        return not self.state["last_date"] or run_date >= self.state["last_date"]
+
+    def retain(self, run_date, carried_forward_ids):
+        # A run's movies are the ones it enriched plus the ones it carried forward; the rest left the chart.
+        # Their rows stay in the partitions, but they are no longer part of the current table.
+        if not self.is_latest(run_date):
+            return 0
+        movies = self.state["movies"]
+        current = {imdb_id for imdb_id, entry in movies.items() if entry["date"] == run_date}
+        if not current and not carried_forward_ids:
+            return 0
+        dropped = [imdb_id for imdb_id in movies if imdb_id not in current and imdb_id not in carried_forward_ids]
+        for imdb_id in dropped:
+            del movies[imdb_id]
+        return len(dropped)
+
+    def overlay_feed(self, run_date, feed):
+        # Current feed fields (rank, rating count) of carried-forward movies, applied over their rows on read.
+        # Movies enriched again get a fresh row, which upsert stores without an overlay.
+        if not self.is_latest(run_date):
+            return
+        for imdb_id, fields in feed.items():
+            if imdb_id in self.state["movies"]:
+                self.state["movies"][imdb_id]["feed"] = fields
@@ -11,18 +11,24 @@ S3_BUCKET_SOURCE = os.environ.get("S3_BUCKET_SOURCE")
 S3_BUCKET_TARGET = os.environ.get("S3_BUCKET_TARGET")
 MAX_RETRIES = int(os.environ.get("MAX_RETRIES", "3"))
 BASE_DELAY_SECONDS = int(os.environ.get("BASE_DELAY_SECONDS", "1"))
+SILVER_FORMAT = os.environ.get("SILVER_FORMAT", "csv").lower()
+SILVER_MODE = os.environ.get("SILVER_MODE", "snapshot").lower()
+SILVER_TABLE_PREFIX = "silver/movies/"
 
 def lambda_handler(event, context):
     logger.info("Starting process_silver_to_gold Lambda...")
 
     try:
-        key = f"silver/movies_normalized.csv"
-        logger.info(f"Triggered for silver bucket with prefix: {key}")
-
         s3_service = S3Service(logger, MAX_RETRIES, BASE_DELAY_SECONDS)
         processor = SilverToGoldProcessor(s3_service, S3_BUCKET_SOURCE, S3_BUCKET_TARGET)
 
-        record_count = processor.process(key)
+        if SILVER_MODE == "incremental":
+            logger.info(f"Triggered for silver table: {SILVER_TABLE_PREFIX}")
+            record_count = processor.process_table(SILVER_TABLE_PREFIX)
+        else:
+            key = f"silver/movies_normalized.{SILVER_FORMAT}"
+            logger.info(f"Triggered for silver bucket with prefix: {key}")
+            record_count = processor.process(key)
 
         return build_response(200, f"Processed {record_count} films from silver to gold.")
 
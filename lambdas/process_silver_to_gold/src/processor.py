@@ -1,5 +1,17 @@
 import pandas as pd
 
+PARQUET_SUFFIX = ".parquet"
+TABLE_STATE_FILE = "_state.json"
+TABLE_KEY_COLUMN = "imdbid"
+# Daily chart fields silver keeps next to carried-forward rows instead of rewriting them.
+FEED_COLUMNS = ['rank', 'imdbratingcount']
+# Every silver column the analytics below use.
+ANALYTICS_COLUMNS = [
+    'rank', 'title', 'year', 'imdbrating', 'imdbratingcount',
+    'released', 'runtime', 'genre', 'director', 'language',
+    'country', 'awards', 'metascore', 'imdbvotes', 'boxoffice'
+]
+
 class SilverToGoldProcessor:
     def __init__(self, s3_service, source_bucket, target_bucket):
         self.s3 = s3_service
@@ -7,7 +19,10 @@ class SilverToGoldProcessor:
         self.target_bucket = target_bucket
 
     def process(self, key):
-        normalized_data = self.s3.load_csv(self.source_bucket, key)
+        if key.endswith(PARQUET_SUFFIX):
+            normalized_data = self.s3.load_parquet(self.source_bucket, key, columns=ANALYTICS_COLUMNS)
+        else:
+            normalized_data = self.s3.load_csv(self.source_bucket, key)
         if normalized_data.empty:
             raise Exception("No data to process, empty csv file!")
         
@@ -18,17 +33,50 @@ class SilverToGoldProcessor:
 
         return len(normalized_data)
     
+    def process_table(self, prefix):
+        # The table state names the file holding each movie's current row; older versions are skipped.
+        state = self.s3.load_json_if_exists(self.source_bucket, f"{prefix}{TABLE_STATE_FILE}") or {}
+        ids_by_key = {}
+        for imdb_id, entry in state.get("movies", {}).items():
+            ids_by_key.setdefault(entry["key"], set()).add(imdb_id)
+        if not ids_by_key:
+            raise Exception(f"No data to process, silver table {prefix} is empty!")
+
+        frames = []
+        for key, ids in ids_by_key.items():
+            df = self.s3.load_parquet(self.source_bucket, key, columns=[TABLE_KEY_COLUMN, *ANALYTICS_COLUMNS])
+            frames.append(df[df[TABLE_KEY_COLUMN].isin(ids)])
+        normalized_data = pd.concat(frames, ignore_index=True)
+        feed = {imdb_id: entry["feed"] for imdb_id, entry in state["movies"].items() if entry.get("feed")}
+        if feed:
+            normalized_data = self.overlay_feed(normalized_data, feed)
+
+        normalized_data['rank'] = normalized_data['rank'].astype(int)
+        normalized_data = normalized_data.sort_values(by='rank')
+
+        self.process_analytics(normalized_data)
+
+        return len(normalized_data)
+
+    def overlay_feed(self, df, feed):
+        # Carried-forward movies keep their enriched row; today's feed fields (rank, rating count) replace
+        # the ones that row was written with.
+        # Only these: title, year and rating in the row are OMDb's and stay as enriched.
+        overlay = pd.DataFrame.from_dict(feed, orient="index")
+        for column in overlay.columns.intersection(FEED_COLUMNS).intersection(df.columns):
+            dtype = df[column].dtype
+            current = df[TABLE_KEY_COLUMN].map(overlay[column])
+            # Mapping leaves NaN for movies without an overlay, which would turn integer columns into floats.
+            df[column] = current.combine_first(df[column]).astype(dtype)
+        return df
+
     def process_analytics(self, df):
         prefix = "gold/"
 
         try:
             # 1. Top N IMDb Ratings
             topN_rated_df = (
-                df[[
-                    'rank', 'title', 'year', 'imdbrating', 'imdbratingcount',
-                    'released', 'runtime', 'genre', 'director', 'language',
-                    'country', 'awards', 'metascore', 'imdbvotes', 'boxoffice'
-                ]]
+                df[ANALYTICS_COLUMNS]
                 .sort_values(by='rank', ascending=False)
             )
             self.s3.save_csv(self.target_bucket, f"{prefix}topN_rated.csv", topN_rated_df.to_csv(index=False))
@@ -53,13 +101,8 @@ class SilverToGoldProcessor:
             self.s3.save_csv(self.target_bucket, f"{prefix}movies_per_year.csv", movies_per_year_df.to_csv(index=False))
             
             # 5. Total Box Office Revenue per Year
-            df['boxoffice_clean'] = (
-                df['boxoffice'].astype(str)
-                .str.replace('$', '', regex=False)
-                .str.replace(',', '', regex=False)  
-                .replace('nan', '0') 
-                .astype(int)
-            )
+            # Silver already holds box office as whole dollars; missing values count as 0.
+            df['boxoffice_clean'] = pd.to_numeric(df['boxoffice'], errors='coerce').fillna(0).astype('int64')
             box_office_df = (
                 df.groupby('year', as_index=False)['boxoffice_clean']
                 .sum()
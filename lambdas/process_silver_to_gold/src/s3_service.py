@@ -1,4 +1,5 @@
 import io
+import json
 import boto3
 import pandas as pd
 from src.utils import with_retries
@@ -14,6 +15,30 @@ class S3Service:
         response = self.s3.get_object(Bucket=bucket, Key=key)
         return pd.read_csv(io.BytesIO(response['Body'].read()))
 
+    def load_json_if_exists(self, bucket, key):
+        try:
+            response = self.s3.get_object(Bucket=bucket, Key=key)
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def load_parquet(self, bucket, key, columns=None):
+        # Only the requested columns are decoded; the rest of the file is skipped.
+        response = self.s3.get_object(Bucket=bucket, Key=key)
+        data = response['Body'].read()
+        try:
+            return pd.read_parquet(io.BytesIO(data), columns=columns)
+        except ValueError:
+            if columns is None:
+                raise
+            # Files written before silver kept every schema column can lack one, e.g. a partition of
+            # movies OMDb had no genre for; it reads as missing instead of failing the whole run.
+            self.logger.warning(f"{key} lacks some requested columns; reading it whole.")
+            df = pd.read_parquet(io.BytesIO(data))
+            missing = [column for column in columns if column not in df.columns]
+            # Object rather than float NaN, so text operations on a column of only missing values still work.
+            return df.assign(**{column: pd.Series(None, index=df.index, dtype=object) for column in missing})[columns]
+
     def save_csv(self, bucket, key, csv_data):
         with_retries(
             self.logger,
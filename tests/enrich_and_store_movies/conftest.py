@@ -25,7 +25,9 @@ os.environ['BASE_DELAY_SECONDS'] = '1'
 @pytest.fixture
 def mock_services():
     mock_omdb = MagicMock()
+    mock_omdb.auth_failed = False
     mock_s3 = MagicMock()
+    mock_s3.upload_json_many.side_effect = lambda bucket, items, max_workers=1, **kwargs: {key: True for key, _ in items}
     
     with patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.boto3.client') as mock_boto, \
          patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.OMDBService') as mock_omdb_class, \
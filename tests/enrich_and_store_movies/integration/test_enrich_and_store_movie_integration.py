@@ -1,4 +1,5 @@
 import pytest
+import gzip
 import json
 import os
 import boto3
@@ -39,7 +40,7 @@ def setup_test_environment():
 def test_lambda_handler_success(setup_test_environment):
     env = setup_test_environment
 
-    with patch('lambdas.enrich_and_store_movies.src.omdb_service.requests.get') as mock_get:
+    with patch('lambdas.enrich_and_store_movies.src.http_session.requests.Session.get') as mock_get:
         mock_response = MagicMock()
         mock_response.json.return_value = {
             "Title": "Test Movie",
@@ -75,4 +76,151 @@ def test_lambda_handler_success(setup_test_environment):
         assert stored_data['Title'] == "Test Movie"
         assert stored_data['Year'] == "2025"
         assert stored_data['Genre'] == "Action"
-        assert stored_data['Director'] == "John Doe"
\ No newline at end of file
+        assert stored_data['Director'] == "John Doe"
+def test_lambda_handler_resolves_claim_check(setup_test_environment):
+    env = setup_test_environment
+
+    movies = [{"id": f"tt{i:07d}", "title": f"Movie {i}"} for i in range(3)]
+    body = json.dumps({"movies": movies, "is_final_batch": True, "run_date": "2025-01-02"})
+    env['s3_client'].put_object(
+        Bucket=env['bucket_name'],
+        Key="claim-checks/2025-01-02/batch.json.gz",
+        Body=gzip.compress(body.encode("utf-8"))
+    )
+
+    with patch('lambdas.enrich_and_store_movies.src.http_session.requests.Session.get') as mock_get:
+        mock_get.return_value.json.return_value = {"Response": "True", "Genre": "Drama"}
+        mock_get.return_value.raise_for_status.return_value = None
+
+        event = {
+            "Records": [
+                {
+                    "messageId": "1",
+                    "body": json.dumps({
+                        "claim_check": {"bucket": env['bucket_name'], "key": "claim-checks/2025-01-02/batch.json.gz"}
+                    })
+                }
+            ]
+        }
+        result = env['lambda_handler'](event, None)
+
+    assert result["statusCode"] == 200
+    keys = {obj["Key"] for obj in env['s3_client'].list_objects_v2(Bucket=env['bucket_name'], Prefix="bronze/2025-01-02/")["Contents"]}
+    assert keys == {f"bronze/2025-01-02/{movie['id']}.json" for movie in movies} | {"bronze/2025-01-02/_SUCCESS"}
+
+def test_lambda_handler_ndjson_layout(setup_test_environment):
+    env = setup_test_environment
+
+    movies = [{"id": f"tt{i:07d}", "title": f"Movie {i}"} for i in range(3)]
+    with patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.BRONZE_LAYOUT', "ndjson"), \
+         patch('lambdas.enrich_and_store_movies.src.http_session.requests.Session.get') as mock_get:
+        mock_get.return_value.json.return_value = {"Response": "True", "Genre": "Drama"}
+        mock_get.return_value.raise_for_status.return_value = None
+
+        event = {"Records": [{"messageId": "1", "body": json.dumps({"movies": movies, "run_date": "2025-01-02"})}]}
+        result = env['lambda_handler'](event, None)
+
+    assert result["statusCode"] == 200
+    contents = env['s3_client'].list_objects_v2(Bucket=env['bucket_name'], Prefix="bronze/2025-01-02/")["Contents"]
+    assert len(contents) == 1
+    body = env['s3_client'].get_object(Bucket=env['bucket_name'], Key=contents[0]["Key"])["Body"].read().decode("utf-8")
+    records = [json.loads(line) for line in body.splitlines()]
+    assert [record["id"] for record in records] == [movie["id"] for movie in movies]
+    assert all(record["Genre"] == "Drama" for record in records)
+
+def test_lambda_handler_rerun_skips_identical_objects(setup_test_environment):
+    env = setup_test_environment
+
+    event = {"Records": [{"messageId": "1", "body": json.dumps({
+        "movies": [{"id": f"tt{i:07d}"} for i in range(3)], "run_date": "2025-01-02"
+    })}]}
+    with patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.BRONZE_SKIP_IDENTICAL', True), \
+         patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.S3Service') as mock_s3_class, \
+         patch('lambdas.enrich_and_store_movies.src.http_session.requests.Session.get') as mock_get:
+        from lambdas.enrich_and_store_movies.src.s3_service import S3Service
+        services = []
+        mock_s3_class.side_effect = lambda *args: services.append(S3Service(*args)) or services[-1]
+        mock_get.return_value.json.return_value = {"Response": "True", "Genre": "Drama"}
+        mock_get.return_value.raise_for_status.return_value = None
+
+        assert env['lambda_handler'](event, None)["statusCode"] == 200
+        assert env['lambda_handler'](event, None)["statusCode"] == 200
+
+    assert services[0].stats == {"written": 3, "skipped": 0}
+    assert services[1].stats == {"written": 0, "skipped": 3}
+
+def test_lambda_handler_redelivered_message_skips_omdb(setup_test_environment):
+    env = setup_test_environment
+
+    event = {"Records": [{"messageId": "1", "body": json.dumps({
+        "movies": [{"id": f"tt{i:07d}"} for i in range(3)], "run_date": "2025-01-02"
+    })}]}
+    with patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.PROCESSED_LEDGER_ENABLED', True), \
+         patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.BRONZE_LAYOUT', "ndjson"), \
+         patch('lambdas.enrich_and_store_movies.src.http_session.requests.Session.get') as mock_get:
+        mock_get.return_value.json.return_value = {"Response": "True", "Genre": "Drama"}
+        mock_get.return_value.raise_for_status.return_value = None
+
+        assert env['lambda_handler'](event, None)["statusCode"] == 200
+        first_delivery_calls = mock_get.call_count
+        assert env['lambda_handler'](event, None)["statusCode"] == 200
+
+    assert first_delivery_calls == 3
+    assert mock_get.call_count == 3
+
+def test_lambda_handler_closes_run_once_in_any_order(setup_test_environment):
+    env = setup_test_environment
+
+    batches = [[{"id": "tt0000001"}, {"id": "tt0000002"}], [{"id": "tt0000003"}], []]
+    run = {"run_id": "run-1", "expected_messages": 3, "expected_movies": 3}
+    events = [
+        {"Records": [{"messageId": str(idx), "body": json.dumps({
+            "movies": batch, "run_date": "2025-01-02", "is_final_batch": idx == 2, **run
+        })}]}
+        for idx, batch in enumerate(batches)
+    ]
+
+    def success_marker():
+        try:
+            return env['s3_client'].get_object(Bucket=env['bucket_name'], Key="bronze/2025-01-02/_SUCCESS")["Body"].read()
+        except env['s3_client'].exceptions.NoSuchKey:
+            return None
+
+    with patch('lambdas.enrich_and_store_movies.src.http_session.requests.Session.get') as mock_get:
+        mock_get.return_value.json.return_value = {"Response": "True", "Genre": "Drama"}
+        mock_get.return_value.raise_for_status.return_value = None
+
+        # The final batch lands first and a redelivery comes in before the run is complete.
+        assert env['lambda_handler'](events[2], None)["statusCode"] == 200
+        assert env['lambda_handler'](events[0], None)["statusCode"] == 200
+        assert env['lambda_handler'](events[0], None)["statusCode"] == 200
+        assert success_marker() is None
+
+        assert env['lambda_handler'](events[1], None)["statusCode"] == 200
+        assert success_marker() == b"run-1"
+
+        env['s3_client'].delete_object(Bucket=env['bucket_name'], Key="bronze/2025-01-02/_SUCCESS")
+        assert env['lambda_handler'](events[1], None)["statusCode"] == 200
+        assert success_marker() is None
+
+def test_lambda_handler_redelivery_closes_run_after_marker_failure(setup_test_environment):
+    env = setup_test_environment
+    import lambdas.enrich_and_store_movies.enrich_and_store_movie as enrich_module
+    event = {"Records": [{"messageId": "0", "body": json.dumps({
+        "movies": [], "run_date": "2025-01-02", "run_id": "run-1", "expected_messages": 1, "expected_movies": 0
+    })}]}
+    upload_string = enrich_module.S3Service.upload_string
+    calls = []
+
+    def fail_first_marker(self, bucket, key, *args, **kwargs):
+        calls.append(key)
+        if key.endswith("_SUCCESS") and len(calls) == 1:
+            raise Exception(f"Uploading to s3://{bucket}/{key} failed after 3 retries.")
+        return upload_string(self, bucket, key, *args, **kwargs)
+
+    with patch.object(enrich_module.S3Service, "upload_string", autospec=True, side_effect=fail_first_marker):
+        assert env['lambda_handler'](event, None)["batchItemFailures"] == [{"itemIdentifier": "0"}]
+        assert env['lambda_handler'](event, None)["statusCode"] == 200
+
+    marker = env['s3_client'].get_object(Bucket=env['bucket_name'], Key="bronze/2025-01-02/_SUCCESS")
+    assert marker["Body"].read() == b"run-1"
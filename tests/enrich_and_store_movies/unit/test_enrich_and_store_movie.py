@@ -1,5 +1,6 @@
 import pytest
 import json
+import threading
 import os
 from unittest.mock import MagicMock, patch
 from datetime import datetime
@@ -70,6 +71,9 @@ def mock_omdb_data():
 def mock_context():
     return MagicMock()
 
+def stored_objects(mock_s3):
+    return {key: data for c in mock_s3.upload_json_many.call_args_list for key, data in c[0][1]}
+
 class TestEnrichAndStoreMovie:
     
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.datetime')
@@ -85,13 +89,12 @@ class TestEnrichAndStoreMovie:
         mock_secrets_service_class.return_value = mock_secrets_service
         
         mocks['omdb'].fetch_movie_data.return_value = mock_omdb_data
-        mocks['s3'].upload_json.return_value = True
         
         result = lambda_handler(mock_event, mock_context)
         
         assert result["statusCode"] == 200
         assert "All records processed" in result["body"]
-        assert mocks['s3'].upload_json.call_count == 2
+        assert len(stored_objects(mocks['s3'])) == 2
 
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.datetime')
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
@@ -106,14 +109,13 @@ class TestEnrichAndStoreMovie:
         mock_secrets_service_class.return_value = mock_secrets_service
         
         mocks['omdb'].fetch_movie_data.return_value = mock_omdb_data
-        mocks['s3'].upload_json.return_value = True
         mocks['s3'].upload_string.return_value = True
         
         result = lambda_handler(mock_final_batch_event, mock_context)
         
         assert result["statusCode"] == 200
         assert "All records processed" in result["body"]
-        mocks['s3'].upload_json.assert_called_once()
+        assert len(stored_objects(mocks['s3'])) == 1
         mocks['s3'].upload_string.assert_called_once()
 
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
@@ -126,6 +128,7 @@ class TestEnrichAndStoreMovie:
         
         assert result["statusCode"] == 500
         assert "Secret not found" in result["body"]
+        assert result["batchItemFailures"] == [{"itemIdentifier": "test-message-1"}]
 
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.datetime')
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
@@ -143,7 +146,7 @@ class TestEnrichAndStoreMovie:
         
         assert result["statusCode"] == 200
         assert "All records processed" in result["body"]
-        mocks['s3'].upload_json.assert_not_called()
+        assert stored_objects(mocks['s3']) == {}
 
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.datetime')
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
@@ -172,7 +175,7 @@ class TestEnrichAndStoreMovie:
         
         assert result["statusCode"] == 200
         assert "All records processed" in result["body"]
-        mocks['s3'].upload_json.assert_not_called()
+        assert stored_objects(mocks['s3']) == {}
 
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.datetime')
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
@@ -206,7 +209,7 @@ class TestEnrichAndStoreMovie:
         
         assert result["statusCode"] == 200
         assert "All records processed" in result["body"]
-        mocks['s3'].upload_json.assert_not_called()
+        assert stored_objects(mocks['s3']) == {}
 
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.datetime')
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
@@ -221,12 +224,12 @@ class TestEnrichAndStoreMovie:
         mock_secrets_service_class.return_value = mock_secrets_service
         
         mocks['omdb'].fetch_movie_data.return_value = mock_omdb_data
-        mocks['s3'].upload_json.return_value = False
+        mocks['s3'].upload_json_many.side_effect = lambda bucket, items, max_workers=1, **kwargs: {key: False for key, _ in items}
         
         result = lambda_handler(mock_event, mock_context)
         
         assert result["statusCode"] == 500
-        assert "Failed to upload tt0111161 to S3" in result["body"]
+        assert "Failed to upload tt0111161, tt0068646 to S3" in result["body"]
 
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.datetime')
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
@@ -241,7 +244,6 @@ class TestEnrichAndStoreMovie:
         mock_secrets_service_class.return_value = mock_secrets_service
         
         mocks['omdb'].fetch_movie_data.return_value = mock_omdb_data
-        mocks['s3'].upload_json.return_value = True
         mocks['s3'].upload_string.return_value = False
         
         result = lambda_handler(mock_final_batch_event, mock_context)
@@ -262,13 +264,12 @@ class TestEnrichAndStoreMovie:
         mock_secrets_service_class.return_value = mock_secrets_service
         
         mocks['omdb'].fetch_movie_data.return_value = None
-        mocks['s3'].upload_json.return_value = True
         
         result = lambda_handler(mock_event, mock_context)
         
         assert result["statusCode"] == 200
         assert "All records processed" in result["body"]
-        mocks['s3'].upload_json.assert_called()
+        assert stored_objects(mocks['s3'])
 
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.datetime')
     @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
@@ -294,3 +295,313 @@ class TestEnrichAndStoreMovie:
         
         assert result["statusCode"] == 500
         assert "Error in message ID test-message-invalid-json" in result["body"]
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_uses_run_date_from_message(self, mock_secrets_service_class, mock_services,
+                                                       mock_context, mock_omdb_data):
+        mocks = mock_services
+
+        mock_secrets_service = MagicMock()
+        mock_secrets_service.get_omdb_api_key.return_value = "test_api_key"
+        mock_secrets_service_class.return_value = mock_secrets_service
+
+        mocks['omdb'].fetch_movie_data.return_value = mock_omdb_data
+        mocks['s3'].upload_string.return_value = True
+
+        event = {
+            "Records": [
+                {
+                    "messageId": "test-message-dated",
+                    "body": json.dumps({
+                        "movies": [{"id": "tt0111161", "title": "The Shawshank Redemption"}],
+                        "is_final_batch": True,
+                        "run_date": "2025-01-02"
+                    })
+                }
+            ]
+        }
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 200
+        assert list(stored_objects(mocks['s3'])) == ["bronze/2025-01-02/tt0111161.json"]
+        assert mocks['s3'].upload_string.call_args[0][1] == "bronze/2025-01-02/_SUCCESS"
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.RunLedger')
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_waits_until_run_is_complete(self, mock_secrets_service_class, mock_run_ledger_class,
+                                                       mock_services, mock_context, mock_omdb_data):
+        mocks = mock_services
+        mocks['omdb'].fetch_movie_data.return_value = mock_omdb_data
+        run_ledger = mock_run_ledger_class.return_value
+        run_ledger.progress.return_value = (2, 2)
+        movies = [{"id": "tt0111161"}]
+
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({
+            "movies": movies, "is_final_batch": True, "run_date": "2025-01-02",
+            "run_id": "run-1", "expected_messages": 3, "expected_movies": 3
+        })}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 200
+        run_ledger.record_done.assert_called_once_with("2025-01-02", "run-1", movies)
+        run_ledger.claim.assert_not_called()
+        mocks['s3'].upload_string.assert_not_called()
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.RunLedger')
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_last_message_of_run_writes_success(self, mock_secrets_service_class, mock_run_ledger_class,
+                                                               mock_services, mock_context, mock_omdb_data):
+        mocks = mock_services
+        mocks['omdb'].fetch_movie_data.return_value = mock_omdb_data
+        mocks['s3'].upload_string.return_value = True
+        run_ledger = mock_run_ledger_class.return_value
+        run_ledger.progress.return_value = (3, 3)
+        run_ledger.claim.return_value = True
+
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({
+            "movies": [{"id": "tt0111161"}], "is_final_batch": False, "run_date": "2025-01-02",
+            "run_id": "run-1", "expected_messages": 3, "expected_movies": 3
+        })}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 200
+        run_ledger.claim.assert_called_once_with("2025-01-02", "run-1")
+        mocks['s3'].upload_string.assert_called_once_with("test-integration-bucket", "bronze/2025-01-02/_SUCCESS", "run-1")
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.RunLedger')
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_lost_claim_writes_no_marker(self, mock_secrets_service_class, mock_run_ledger_class,
+                                                        mock_services, mock_context):
+        mocks = mock_services
+        run_ledger = mock_run_ledger_class.return_value
+        run_ledger.progress.return_value = (1, 0)
+        run_ledger.claim.return_value = False
+
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({
+            "movies": [], "run_date": "2025-01-02", "run_id": "run-1", "expected_messages": 1, "expected_movies": 0
+        })}]}
+
+        assert lambda_handler(event, mock_context)["statusCode"] == 200
+        mocks['s3'].upload_string.assert_not_called()
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.RunLedger')
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_releases_claim_when_marker_fails(self, mock_secrets_service_class, mock_run_ledger_class,
+                                                             mock_services, mock_context):
+        mocks = mock_services
+        mocks['s3'].upload_string.side_effect = Exception("Uploading to s3://bucket/bronze/2025-01-02/_SUCCESS failed")
+        run_ledger = mock_run_ledger_class.return_value
+        run_ledger.progress.return_value = (1, 0)
+        run_ledger.claim.return_value = True
+
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({
+            "movies": [], "run_date": "2025-01-02", "run_id": "run-1", "expected_messages": 1, "expected_movies": 0
+        })}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["batchItemFailures"] == [{"itemIdentifier": "m1"}]
+        run_ledger.release.assert_called_once_with("2025-01-02", "run-1")
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.ENRICH_CONCURRENCY', 4)
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_concurrent_enrichment(self, mock_secrets_service_class, mock_services, mock_context):
+        mocks = mock_services
+        mock_secrets_service_class.return_value.get_omdb_api_key.return_value = "test_api_key"
+        barrier = threading.Barrier(4, timeout=5)
+
+        def fetch(imdb_id, api_key):
+            # Only returns if four lookups are in flight at once.
+            barrier.wait()
+            return {"Genre": "Drama"} if imdb_id != "tt3" else None
+
+        mocks['omdb'].fetch_movie_data.side_effect = fetch
+        mocks['s3'].upload_json_many.side_effect = lambda bucket, items, max_workers=1, **kwargs: {
+            key: key != "bronze/2025-01-02/tt2.json" for key, _ in items
+        }
+
+        movies = [{"id": f"tt{i}"} for i in range(8)]
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({"movies": movies, "run_date": "2025-01-02"})}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 500
+        assert "Failed to upload tt2 to S3" in result["body"]
+        stored = stored_objects(mocks['s3'])
+        assert len(stored) == 8
+        assert stored["bronze/2025-01-02/tt3.json"] == {"id": "tt3"}
+        assert stored["bronze/2025-01-02/tt0.json"] == {"id": "tt0", "Genre": "Drama"}
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_refreshes_key_on_auth_failure(self, mock_secrets_service_class, mock_services, mock_context):
+        mocks = mock_services
+        secrets_service = mock_secrets_service_class.return_value
+        secrets_service.get_omdb_api_key.side_effect = ["old-key", "new-key"]
+
+        def fetch(imdb_id, api_key):
+            if api_key == "old-key":
+                mocks['omdb'].auth_failed = True
+                return None
+            return {"Genre": "Drama"}
+
+        mocks['omdb'].fetch_movie_data.side_effect = fetch
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({
+            "movies": [{"id": "tt1"}, {"id": "tt2"}], "run_date": "2025-01-02"
+        })}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 200
+        assert secrets_service.get_omdb_api_key.call_args_list[1][1] == {"force_refresh": True}
+        stored = stored_objects(mocks['s3'])
+        assert stored["bronze/2025-01-02/tt2.json"] == {"id": "tt2", "Genre": "Drama"}
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.BRONZE_LAYOUT', "ndjson")
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_ndjson_layout_writes_one_object(self, mock_secrets_service_class, mock_services, mock_context):
+        mocks = mock_services
+        mocks['omdb'].fetch_movie_data.return_value = {"Genre": "Drama"}
+        mocks['s3'].upload_ndjson.return_value = True
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({
+            "movies": [{"id": "tt1"}, {"id": "tt2"}], "run_date": "2025-01-02"
+        })}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 200
+        mocks['s3'].upload_json_many.assert_not_called()
+        bucket, key, records = mocks['s3'].upload_ndjson.call_args[0]
+        assert key.startswith("bronze/2025-01-02/batch-") and key.endswith(".ndjson")
+        assert records == [{"id": "tt1", "Genre": "Drama"}, {"id": "tt2", "Genre": "Drama"}]
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.BRONZE_LAYOUT', "ndjson")
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_ndjson_upload_failure(self, mock_secrets_service_class, mock_services, mock_context):
+        mocks = mock_services
+        mocks['omdb'].fetch_movie_data.return_value = {"Genre": "Drama"}
+        mocks['s3'].upload_ndjson.return_value = False
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({
+            "movies": [{"id": "tt1"}, {"id": "tt2"}], "run_date": "2025-01-02"
+        })}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 500
+        assert "Failed to upload tt1, tt2 to S3" in result["body"]
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_reports_only_failed_messages(self, mock_secrets_service_class, mock_services, mock_context):
+        mocks = mock_services
+        mocks['omdb'].fetch_movie_data.return_value = {"Genre": "Drama"}
+        mocks['s3'].upload_json_many.side_effect = lambda bucket, items, max_workers=1, **kwargs: {
+            key: not key.endswith("tt2.json") for key, _ in items
+        }
+        event = {"Records": [
+            {"messageId": f"m{i}", "body": json.dumps({"movies": [{"id": f"tt{i}"}], "run_date": "2025-01-02"})}
+            for i in range(1, 4)
+        ]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 500
+        assert result["batchItemFailures"] == [{"itemIdentifier": "m2"}]
+        assert set(stored_objects(mocks['s3'])) == {f"bronze/2025-01-02/tt{i}.json" for i in range(1, 4)}
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_holds_back_rest_of_failed_message_group(self, mock_secrets_service_class, mock_services,
+                                                                    mock_context):
+        mocks = mock_services
+        mocks['omdb'].fetch_movie_data.return_value = {"Genre": "Drama"}
+        event = {"Records": [
+            {"messageId": "a1", "attributes": {"MessageGroupId": "a"}, "body": "not json"},
+            {"messageId": "b1", "attributes": {"MessageGroupId": "b"},
+             "body": json.dumps({"movies": [{"id": "tt1"}], "run_date": "2025-01-02"})},
+            {"messageId": "a2", "attributes": {"MessageGroupId": "a"},
+             "body": json.dumps({"movies": [{"id": "tt2"}], "run_date": "2025-01-02", "is_final_batch": True})}
+        ]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["batchItemFailures"] == [{"itemIdentifier": "a1"}, {"itemIdentifier": "a2"}]
+        assert set(stored_objects(mocks['s3'])) == {"bronze/2025-01-02/tt1.json"}
+        mocks['s3'].upload_string.assert_not_called()
+
+    def test_lambda_handler_success_reports_no_failures(self, mock_services, mock_empty_event, mock_context):
+        with patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService'):
+            result = lambda_handler(mock_empty_event, mock_context)
+
+        assert result["statusCode"] == 200
+        assert result["batchItemFailures"] == []
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.PROCESSED_LEDGER_ENABLED', True)
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.ProcessedLedger')
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_redelivery_skips_processed_movies(self, mock_secrets_service_class, mock_ledger_class,
+                                                              mock_services, mock_context):
+        mocks = mock_services
+        ledger = mock_ledger_class.return_value
+        ledger.load.return_value = {"tt1"}
+        mocks['omdb'].fetch_movie_data.side_effect = lambda imdb_id, api_key: None if imdb_id == "tt3" else {"Genre": "Drama"}
+        movies = [{"id": "tt1"}, {"id": "tt2"}, {"id": "tt3"}]
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({"movies": movies, "run_date": "2025-01-02"})}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 200
+        assert [c[0][0] for c in mocks['omdb'].fetch_movie_data.call_args_list] == ["tt2", "tt3"]
+        assert set(stored_objects(mocks['s3'])) == {"bronze/2025-01-02/tt2.json", "bronze/2025-01-02/tt3.json"}
+        ledger.record.assert_called_once_with("2025-01-02", movies, {"tt1", "tt2"})
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.PROCESSED_LEDGER_ENABLED', True)
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.ProcessedLedger')
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_fully_processed_message_only_closes_run(self, mock_secrets_service_class, mock_ledger_class,
+                                                                    mock_services, mock_context):
+        mocks = mock_services
+        mock_ledger_class.return_value.load.return_value = {"tt1", "tt2"}
+        mocks['s3'].upload_string.return_value = True
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({
+            "movies": [{"id": "tt1"}, {"id": "tt2"}], "run_date": "2025-01-02", "is_final_batch": True
+        })}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 200
+        mocks['omdb'].fetch_movie_data.assert_not_called()
+        mocks['s3'].upload_json_many.assert_not_called()
+        mock_ledger_class.return_value.record.assert_not_called()
+        assert mocks['s3'].upload_string.call_args[0][1] == "bronze/2025-01-02/_SUCCESS"
+
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.BRONZE_LAYOUT', "ndjson")
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.PROCESSED_LEDGER_ENABLED', True)
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.ProcessedLedger')
+    @patch('lambdas.enrich_and_store_movies.enrich_and_store_movie.SecretsService')
+    def test_lambda_handler_ndjson_redelivery_reuses_stored_records(self, mock_secrets_service_class, mock_ledger_class,
+                                                                    mock_services, mock_context):
+        mocks = mock_services
+        mock_ledger_class.return_value.load.return_value = {"tt1"}
+        mocks['s3'].download_bytes.return_value = b'{"id":"tt1","Genre":"Crime"}\n{"id":"tt2"}'
+        mocks['s3'].upload_ndjson.return_value = True
+        mocks['omdb'].fetch_movie_data.return_value = {"Genre": "Drama"}
+        event = {"Records": [{"messageId": "m1", "body": json.dumps({
+            "movies": [{"id": "tt1"}, {"id": "tt2"}], "run_date": "2025-01-02"
+        })}]}
+
+        result = lambda_handler(event, mock_context)
+
+        assert result["statusCode"] == 200
+        assert [c[0][0] for c in mocks['omdb'].fetch_movie_data.call_args_list] == ["tt2"]
+        records = mocks['s3'].upload_ndjson.call_args[0][2]
+        assert records == [{"id": "tt1", "Genre": "Crime"}, {"id": "tt2", "Genre": "Drama"}]
+
+    def test_get_client_reuses_clients(self):
+        from lambdas.enrich_and_store_movies import enrich_and_store_movie as module
+
+        with patch.object(module, '_clients', {}), patch.object(module.boto3, 'client') as mock_client:
+            assert module.get_client("s3") is module.get_client("s3")
+            assert mock_client.call_count == 1
+            assert mock_client.call_args[0] == ("s3",)
+            assert mock_client.call_args[1]["config"].max_pool_connections >= 10
@@ -0,0 +1,40 @@
+import gzip
+import json
+import base64
+from unittest.mock import MagicMock
+from lambdas.enrich_and_store_movies.src.message_codec import resolve_message_body, GZIP_ENCODING
+
+BODY = {"movies": [{"id": "tt0111161"}], "is_final_batch": True, "run_date": "2025-01-02"}
+
+
+def gzip_envelope(body):
+    payload = base64.b64encode(gzip.compress(json.dumps(body).encode("utf-8"))).decode("ascii")
+    return json.dumps({"encoding": GZIP_ENCODING, "payload": payload})
+
+
+def test_plain_body():
+    s3_service = MagicMock()
+
+    assert resolve_message_body(json.dumps(BODY), s3_service) == BODY
+    s3_service.download_bytes.assert_not_called()
+
+
+def test_gzip_body():
+    assert resolve_message_body(gzip_envelope(BODY), MagicMock()) == BODY
+
+
+def test_claim_check_with_gzipped_object():
+    s3_service = MagicMock()
+    s3_service.download_bytes.return_value = gzip.compress(json.dumps(BODY).encode("utf-8"))
+    pointer = json.dumps({"claim_check": {"bucket": "bronze-bucket", "key": "claim-checks/2025-01-02/abc.json.gz"}})
+
+    assert resolve_message_body(pointer, s3_service) == BODY
+    s3_service.download_bytes.assert_called_once_with("bronze-bucket", "claim-checks/2025-01-02/abc.json.gz")
+
+
+def test_claim_check_with_plain_object():
+    s3_service = MagicMock()
+    s3_service.download_bytes.return_value = json.dumps(BODY).encode("utf-8")
+    pointer = json.dumps({"claim_check": {"bucket": "bronze-bucket", "key": "claim-checks/abc.json"}})
+
+    assert resolve_message_body(pointer, s3_service) == BODY
@@ -0,0 +1,152 @@
+import pytest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from lambdas.enrich_and_store_movies.src.omdb_cache import OMDbCache, MemoryCacheTier, S3CacheTier
+from lambdas.enrich_and_store_movies.src.omdb_service import OMDBService
+
+DATA = {"Title": "The Shawshank Redemption", "Director": "Frank Darabont", "imdbVotes": "2,830,928",
+        "BoxOffice": "$16,000,000", "Metascore": "82", "Response": "True"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return OMDbCache([MemoryCacheTier()], volatile_ttl=100, static_ttl=1000, clock=clock)
+
+
+def test_default_ttl_serves_next_daily_run_only(clock):
+    cache = OMDbCache([MemoryCacheTier()], clock=clock)
+    cache.put("tt0111161", DATA)
+
+    clock.now += 24 * 3600
+    assert cache.get("tt0111161") == (DATA, None)
+
+    clock.now += 24 * 3600
+    cached, fallback = cache.get("tt0111161")
+    assert cached is None
+    assert fallback["Director"] == "Frank Darabont"
+
+
+def test_memory_tier_evicts_least_recently_used():
+    tier = MemoryCacheTier(max_entries=2)
+    tier.put("a", 1)
+    tier.put("b", 2)
+    tier.get("a")
+    tier.put("c", 3)
+
+    assert tier.get("b") is None
+    assert tier.get("a") == 1
+    assert tier.get("c") == 3
+
+
+def test_cache_miss_then_hit(cache):
+    assert cache.get("tt1") == (None, None)
+
+    cache.put("tt1", DATA)
+
+    assert cache.get("tt1") == (DATA, None)
+    assert cache.stats == {"hits": 1, "stale": 0, "misses": 1, "fallbacks": 0, "writes": 1}
+
+
+def test_cache_stale_volatile_fields(cache, clock):
+    cache.put("tt1", DATA)
+    clock.now += 500
+
+    fresh, fallback = cache.get("tt1")
+
+    assert fresh is None
+    assert fallback == {"Title": "The Shawshank Redemption", "Director": "Frank Darabont", "Response": "True"}
+    assert cache.stats["stale"] == 1
+
+
+def test_cache_expired_static_fields(cache, clock):
+    cache.put("tt1", DATA)
+    clock.now += 1000
+
+    assert cache.get("tt1") == (None, None)
+
+
+def test_slower_tier_hit_is_promoted(clock):
+    memory, slow = MemoryCacheTier(), MemoryCacheTier()
+    slow.put("tt1", {"fetched_at": clock.now, "data": DATA})
+    cache = OMDbCache([memory, slow], volatile_ttl=100, static_ttl=1000, clock=clock)
+
+    assert cache.get("tt1") == (DATA, None)
+    assert memory.get("tt1")["data"] == DATA
+
+
+def test_fresher_slow_tier_entry_wins(clock):
+    memory, slow = MemoryCacheTier(), MemoryCacheTier()
+    memory.put("tt1", {"fetched_at": clock.now - 500, "data": {"Title": "old"}})
+    slow.put("tt1", {"fetched_at": clock.now - 10, "data": DATA})
+    cache = OMDbCache([memory, slow], volatile_ttl=100, static_ttl=1000, clock=clock)
+
+    assert cache.get("tt1") == (DATA, None)
+
+
+def test_s3_tier_round_trip():
+    client = MagicMock()
+    tier = S3CacheTier(client, "bucket", 3, 0, MagicMock())
+
+    tier.put("tt1", {"fetched_at": 1.0, "data": DATA})
+
+    kwargs = client.put_object.call_args[1]
+    assert kwargs["Key"] == "cache/omdb/tt1.json"
+    client.get_object.return_value = {"Body": MagicMock(read=MagicMock(return_value=kwargs["Body"]))}
+    assert tier.get("tt1") == {"fetched_at": 1.0, "data": DATA}
+
+
+def test_s3_tier_missing_entry():
+    client = MagicMock()
+    client.get_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+    logger = MagicMock()
+
+    assert S3CacheTier(client, "bucket", 3, 0, logger).get("tt1") is None
+    logger.warning.assert_not_called()
+
+
+def omdb_service_with(cache, payload):
+    session = MagicMock()
+    session.get.return_value.status_code = 200
+    session.get.return_value.json.return_value = payload
+    return OMDBService("http://test.com", 1, 0, MagicMock(), session=session, cache=cache), session
+
+
+def test_omdb_service_serves_cache_hits(cache):
+    service, session = omdb_service_with(cache, DATA)
+
+    assert service.fetch_movie_data("tt1", "key") == DATA
+    assert service.fetch_movie_data("tt1", "key") == DATA
+    session.get.assert_called_once()
+
+
+def test_omdb_service_falls_back_to_static_fields(cache, clock):
+    cache.put("tt1", DATA)
+    clock.now += 500
+    service, session = omdb_service_with(cache, {"Response": "False", "Error": "Request limit reached!"})
+
+    result = service.fetch_movie_data("tt1", "key")
+
+    assert result["Director"] == "Frank Darabont"
+    assert "imdbVotes" not in result
+    assert cache.stats["fallbacks"] == 1
+
+
+def test_omdb_service_does_not_cache_errors(cache):
+    service, session = omdb_service_with(cache, {"Response": "False", "Error": "Incorrect IMDb ID."})
+
+    assert service.fetch_movie_data("tt1", "key") is None
+    assert service.fetch_movie_data("tt1", "key") is None
+    assert session.get.call_count == 2
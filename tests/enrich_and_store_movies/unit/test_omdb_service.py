@@ -2,7 +2,8 @@ import pytest
 import json
 from unittest.mock import MagicMock, patch
 import requests
-from lambdas.enrich_and_store_movies.src.omdb_service import OMDBService
+from lambdas.enrich_and_store_movies.src.omdb_service import OMDBService, DAILY_LIMIT_ERROR
+from lambdas.enrich_and_store_movies.src.rate_limiter import RateLimiter
 
 @pytest.fixture
 def mock_logger():
@@ -66,7 +67,7 @@ class TestOMDBService:
         assert service.base_delay == 2
         assert service.logger == mock_logger
     
-    @patch('lambdas.enrich_and_store_movies.src.omdb_service.requests.get')
+    @patch('lambdas.enrich_and_store_movies.src.http_session.requests.Session.get')
     def test_get_success(self, mock_get, omdb_service):
         mock_response = MagicMock()
         mock_response.json.return_value = {"test": "data"}
@@ -75,11 +76,81 @@ class TestOMDBService:
         
         result = omdb_service._get("http://test.com")
         
-        mock_get.assert_called_once_with("http://test.com", timeout=10)
+        mock_get.assert_called_once_with("http://test.com", timeout=(3, 10))
         mock_response.raise_for_status.assert_called_once()
         assert result == {"test": "data"}
 
-    @patch('lambdas.enrich_and_store_movies.src.omdb_service.requests.get')
+    def test_get_uses_injected_session_and_timeout(self, mock_logger):
+        session = MagicMock()
+        session.get.return_value.json.return_value = {"test": "data"}
+        service = OMDBService("http://test.com", 3, 1, mock_logger, session=session, timeout=(1, 5))
+
+        assert service._get("http://test.com/?i=tt1") == {"test": "data"}
+        session.get.assert_called_once_with("http://test.com/?i=tt1", timeout=(1, 5))
+
+    def test_get_honours_retry_after(self, mock_logger):
+        session = MagicMock()
+        session.get.return_value.status_code = 429
+        session.get.return_value.headers = {"Retry-After": "12"}
+        session.get.return_value.raise_for_status.side_effect = requests.HTTPError("429 Too Many Requests")
+        rate_limiter = MagicMock()
+        service = OMDBService("http://test.com", 3, 1, mock_logger, session=session, rate_limiter=rate_limiter)
+
+        with pytest.raises(requests.HTTPError):
+            service._get("http://test.com/?i=tt1")
+
+        assert rate_limiter.acquire.call_count == 3
+        assert rate_limiter.pause.call_count == 3
+        rate_limiter.pause.assert_called_with(12.0)
+
+    @patch('lambdas.enrich_and_store_movies.src.utils.time.sleep')
+    def test_throttled_request_retried_without_backoff(self, mock_sleep, mock_logger):
+        throttled, ok = MagicMock(status_code=429, headers={"Retry-After": "2"}), MagicMock(status_code=200)
+        ok.json.return_value = {"Response": "True", "Title": "One"}
+        session = MagicMock()
+        session.get.side_effect = [throttled, ok]
+        rate_limiter = MagicMock()
+        service = OMDBService("http://test.com", 3, 1, mock_logger, session=session, rate_limiter=rate_limiter)
+
+        assert service.fetch_movie_data("tt1", "key") == {"Response": "True", "Title": "One"}
+        rate_limiter.pause.assert_called_once_with(2.0)
+        assert rate_limiter.acquire.call_count == 2
+        mock_sleep.assert_not_called()
+
+    def test_get_daily_limit_reached(self, mock_logger):
+        session = MagicMock()
+        session.get.return_value.status_code = 401
+        session.get.return_value.json.return_value = {"Response": "False", "Error": DAILY_LIMIT_ERROR}
+        rate_limiter = RateLimiter(daily_budget=1000)
+        service = OMDBService("http://test.com", 3, 1, mock_logger, session=session, rate_limiter=rate_limiter)
+
+        assert service.fetch_movie_data("tt1", "key") is None
+        assert service.quota_remaining() == 0
+        assert service.fetch_movie_data("tt2", "key") is None
+        session.get.assert_called_once()
+
+    def test_get_invalid_api_key_flags_auth_failure(self, mock_logger):
+        session = MagicMock()
+        session.get.return_value.status_code = 401
+        session.get.return_value.json.return_value = {"Response": "False", "Error": "Invalid API key!"}
+        service = OMDBService("http://test.com", 3, 1, mock_logger, session=session)
+
+        assert service.fetch_movie_data("tt1", "old-key") is None
+        assert service.auth_failed is True
+        session.get.assert_called_once()
+
+    def test_quota_remaining(self, mock_logger):
+        session = MagicMock()
+        session.get.return_value.status_code = 200
+        session.get.return_value.json.return_value = {"Response": "True"}
+        service = OMDBService("http://test.com", 3, 1, mock_logger, session=session, rate_limiter=RateLimiter(daily_budget=5))
+
+        service.fetch_movie_data("tt1", "key")
+
+        assert service.quota_remaining() == 4
+        assert OMDBService("http://test.com", 3, 1, mock_logger, session=session).quota_remaining() is None
+
+    @patch('lambdas.enrich_and_store_movies.src.http_session.requests.Session.get')
     def test_get_http_error(self, mock_get, omdb_service):
         mock_response = MagicMock()
         mock_response.raise_for_status.side_effect = requests.HTTPError("404 Not Found")
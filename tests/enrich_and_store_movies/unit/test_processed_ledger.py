@@ -0,0 +1,54 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from lambdas.enrich_and_store_movies.src.processed_ledger import ProcessedLedger
+from lambdas.enrich_and_store_movies.src.s3_service import batch_id
+
+MOVIES = [{"id": "tt2"}, {"id": "tt1"}]
+
+
+@pytest.fixture
+def client():
+    return MagicMock()
+
+
+@pytest.fixture
+def ledger(client, mock_logger):
+    return ProcessedLedger(client, "bucket", 2, 0, mock_logger)
+
+
+def test_key_is_derived_from_the_message(ledger):
+    assert ledger.key("2025-01-02", MOVIES) == f"bronze/2025-01-02/_processed/{batch_id('2025-01-02', MOVIES)}.json"
+    assert ledger.key("2025-01-02", MOVIES) == ledger.key("2025-01-02", list(reversed(MOVIES)))
+
+
+def test_load_missing_ledger(ledger, client, mock_logger):
+    client.get_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+
+    assert ledger.load("2025-01-02", MOVIES) == set()
+    mock_logger.warning.assert_not_called()
+
+
+def test_load_unreadable_ledger_is_empty(ledger, client, mock_logger):
+    client.get_object.side_effect = ClientError({"Error": {"Code": "AccessDenied"}}, "GetObject")
+
+    assert ledger.load("2025-01-02", MOVIES) == set()
+    mock_logger.warning.assert_called_once()
+
+
+def test_record_then_load(ledger, client):
+    assert ledger.record("2025-01-02", MOVIES, {"tt2", "tt1"}) is True
+
+    kwargs = client.put_object.call_args[1]
+    assert json.loads(kwargs["Body"]) == {"enriched": ["tt1", "tt2"]}
+
+    client.get_object.return_value = {"Body": MagicMock(read=MagicMock(return_value=kwargs["Body"].encode()))}
+    assert ledger.load("2025-01-02", MOVIES) == {"tt1", "tt2"}
+
+
+def test_record_failure_is_not_fatal(ledger, client, mock_logger):
+    client.put_object.side_effect = Exception("S3 down")
+
+    assert ledger.record("2025-01-02", MOVIES, {"tt1"}) is False
+    mock_logger.warning.assert_called()
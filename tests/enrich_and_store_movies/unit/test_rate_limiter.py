@@ -0,0 +1,101 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+from lambdas.enrich_and_store_movies.src.rate_limiter import (
+    RateLimiter, QuotaExhaustedError, parse_retry_after, DEFAULT_RETRY_AFTER_SECONDS
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.day = date(2025, 1, 2)
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def today(self):
+        return self.day
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def limiter(clock, **kwargs):
+    return RateLimiter(clock=clock, sleep=clock.sleep, today=clock.today, **kwargs)
+
+
+def test_unlimited_never_waits(clock):
+    rate_limiter = limiter(clock)
+
+    for _ in range(100):
+        rate_limiter.acquire()
+
+    assert clock.sleeps == []
+    assert rate_limiter.remaining() is None
+
+
+def test_requests_per_second(clock):
+    rate_limiter = limiter(clock, requests_per_second=2)
+
+    for _ in range(6):
+        rate_limiter.acquire()
+
+    # Two tokens up front, then one every half second.
+    assert clock.now == pytest.approx(102.0)
+
+
+def test_daily_budget(clock):
+    rate_limiter = limiter(clock, daily_budget=3)
+
+    for _ in range(3):
+        rate_limiter.acquire()
+
+    assert rate_limiter.remaining() == 0
+    with pytest.raises(QuotaExhaustedError):
+        rate_limiter.acquire()
+
+
+def test_daily_budget_resets_next_day(clock):
+    rate_limiter = limiter(clock, daily_budget=1)
+    rate_limiter.acquire()
+
+    clock.day += timedelta(days=1)
+
+    assert rate_limiter.remaining() == 1
+    rate_limiter.acquire()
+
+
+def test_pause_blocks_next_acquire(clock):
+    rate_limiter = limiter(clock)
+
+    rate_limiter.pause(5)
+    rate_limiter.acquire()
+
+    assert clock.sleeps == [5]
+
+
+def test_exhaust_without_budget(clock):
+    rate_limiter = limiter(clock)
+
+    rate_limiter.exhaust()
+
+    assert rate_limiter.remaining() == 0
+    with pytest.raises(QuotaExhaustedError):
+        rate_limiter.acquire()
+
+
+def test_parse_retry_after():
+    now = datetime(2025, 1, 2, 12, 0, tzinfo=timezone.utc)
+
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(format_datetime(now + timedelta(seconds=30), usegmt=True), now) == 30.0
+    assert parse_retry_after(None) == DEFAULT_RETRY_AFTER_SECONDS
+    assert parse_retry_after("soon") == DEFAULT_RETRY_AFTER_SECONDS
@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from lambdas.enrich_and_store_movies.src.run_ledger import RunLedger
+from lambdas.enrich_and_store_movies.src.s3_service import batch_id
+
+
+@pytest.fixture
+def client():
+    return MagicMock()
+
+
+@pytest.fixture
+def ledger(client, mock_logger):
+    return RunLedger(client, "bucket", 2, 0, mock_logger)
+
+
+def test_record_done_key_carries_movie_count(ledger, client):
+    movies = [{"id": "tt1"}, {"id": "tt2"}]
+
+    ledger.record_done("2025-01-02", "run-1", movies)
+
+    key = client.put_object.call_args[1]["Key"]
+    assert key == f"bronze/2025-01-02/_runs/run-1/done/{batch_id('2025-01-02', movies)}-2"
+
+
+def test_progress_counts_messages_and_movies(ledger, client):
+    client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "bronze/d/_runs/r/done/aaa-3"}, {"Key": "bronze/d/_runs/r/done/bbb-0"}]},
+        {"Contents": [{"Key": "bronze/d/_runs/r/done/ccc-2"}]},
+        {}
+    ]
+
+    assert ledger.progress("d", "r") == (3, 5)
+    client.get_paginator.return_value.paginate.assert_called_once_with(Bucket="bucket", Prefix="bronze/d/_runs/r/done/")
+
+
+def test_claim_is_conditional(ledger, client):
+    assert ledger.claim("2025-01-02", "run-1") is True
+    assert client.put_object.call_args[1]["IfNoneMatch"] == "*"
+
+
+@pytest.mark.parametrize("code", ["PreconditionFailed", "ConditionalRequestConflict"])
+def test_claim_already_taken(ledger, client, code):
+    client.put_object.side_effect = ClientError({"Error": {"Code": code}}, "PutObject")
+
+    assert ledger.claim("2025-01-02", "run-1") is False
+
+
+def test_claim_other_errors_propagate(ledger, client):
+    client.put_object.side_effect = ClientError({"Error": {"Code": "AccessDenied"}}, "PutObject")
+
+    with pytest.raises(ClientError):
+        ledger.claim("2025-01-02", "run-1")
+
+
+def test_release_deletes_claim(ledger, client):
+    ledger.release("2025-01-02", "run-1")
+
+    client.delete_object.assert_called_once_with(Bucket="bucket", Key="bronze/2025-01-02/_runs/run-1/_closed")
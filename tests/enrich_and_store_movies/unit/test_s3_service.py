@@ -1,8 +1,9 @@
 import pytest
 import json
+import threading
 from unittest.mock import MagicMock, patch
 from botocore.exceptions import ClientError
-from lambdas.enrich_and_store_movies.src.s3_service import S3Service
+from lambdas.enrich_and_store_movies.src.s3_service import S3Service, batch_object_key
 
 @pytest.fixture
 def s3_service(mock_s3_client, mock_logger):
@@ -233,3 +234,100 @@ class TestS3Service:
             Body=expected_body,
             ContentType="application/json"
         )
+
+    def test_download_bytes(self, s3_service, mock_s3_client):
+        mock_s3_client.get_object.return_value = {"Body": MagicMock(read=MagicMock(return_value=b"data"))}
+
+        assert s3_service.download_bytes("bucket", "key") == b"data"
+        mock_s3_client.get_object.assert_called_once_with(Bucket="bucket", Key="key")
+
+    def test_upload_many_reports_per_key(self, s3_service, mock_s3_client):
+        def put_object(Bucket, Key, Body, ContentType):
+            if Key == "bad":
+                raise ClientError({"Error": {"Code": "AccessDenied"}}, "PutObject")
+
+        mock_s3_client.put_object.side_effect = put_object
+
+        with patch('lambdas.enrich_and_store_movies.src.utils.time.sleep'):
+            result = s3_service.upload_many("bucket", [("a", "1"), ("bad", "2"), ("c", "3")], max_workers=3)
+
+        assert result == {"a": True, "bad": False, "c": True}
+
+    def test_upload_many_runs_concurrently(self, s3_service, mock_s3_client):
+        barrier = threading.Barrier(4, timeout=5)
+        mock_s3_client.put_object.side_effect = lambda **kwargs: barrier.wait()
+
+        result = s3_service.upload_many("bucket", [(f"k{i}", "x") for i in range(8)], max_workers=4)
+
+        assert all(result.values())
+        assert mock_s3_client.put_object.call_count == 8
+
+    def test_upload_json_many(self, s3_service, mock_s3_client, sample_data):
+        result = s3_service.upload_json_many("bucket", [("good", sample_data), ("bad", {"x": object()})], max_workers=1)
+
+        assert result == {"good": True, "bad": False}
+        body = mock_s3_client.put_object.call_args[1]["Body"]
+        assert body == json.dumps(sample_data, indent=2)
+
+    def test_upload_many_empty(self, s3_service, mock_s3_client):
+        assert s3_service.upload_many("bucket", []) == {}
+        mock_s3_client.put_object.assert_not_called()
+
+    def test_upload_ndjson(self, s3_service, mock_s3_client):
+        assert s3_service.upload_ndjson("bucket", "batch.ndjson", [{"id": "tt1"}, {"id": "tt2", "Year": "1994"}]) is True
+
+        kwargs = mock_s3_client.put_object.call_args[1]
+        assert kwargs["Body"] == '{"id":"tt1"}\n{"id":"tt2","Year":"1994"}'
+        assert kwargs["ContentType"] == "application/x-ndjson"
+
+    def test_upload_ndjson_invalid_data(self, s3_service, mock_s3_client):
+        assert s3_service.upload_ndjson("bucket", "batch.ndjson", [{"x": object()}]) is False
+        mock_s3_client.put_object.assert_not_called()
+
+    def test_upload_string_skips_identical_object(self, s3_service, mock_s3_client):
+        import hashlib
+        mock_s3_client.head_object.return_value = {
+            "Metadata": {"content-sha256": hashlib.sha256(b"body").hexdigest()}, "ETag": '"other"'
+        }
+
+        assert s3_service.upload_string("bucket", "key", "body", skip_if_identical=True) is True
+
+        mock_s3_client.put_object.assert_not_called()
+        assert s3_service.stats == {"written": 0, "skipped": 1}
+
+    def test_upload_string_skips_on_matching_etag(self, s3_service, mock_s3_client):
+        import hashlib
+        mock_s3_client.head_object.return_value = {"ETag": f'"{hashlib.md5(b"body").hexdigest()}"'}
+
+        assert s3_service.upload_string("bucket", "key", "body", skip_if_identical=True) is True
+        mock_s3_client.put_object.assert_not_called()
+
+    def test_upload_string_writes_changed_object_with_hash(self, s3_service, mock_s3_client):
+        import hashlib
+        mock_s3_client.head_object.return_value = {"Metadata": {"content-sha256": "old"}, "ETag": '"old"'}
+
+        assert s3_service.upload_string("bucket", "key", "body", skip_if_identical=True) is True
+
+        kwargs = mock_s3_client.put_object.call_args[1]
+        assert kwargs["Metadata"] == {"content-sha256": hashlib.sha256(b"body").hexdigest()}
+        assert s3_service.stats == {"written": 1, "skipped": 0}
+
+    def test_upload_string_writes_missing_object(self, s3_service, mock_s3_client, mock_logger):
+        mock_s3_client.head_object.side_effect = ClientError({"Error": {"Code": "404"}}, "HeadObject")
+
+        assert s3_service.upload_string("bucket", "key", "body", skip_if_identical=True) is True
+
+        mock_s3_client.put_object.assert_called_once()
+        mock_logger.warning.assert_not_called()
+
+    def test_upload_string_without_skip_never_checks(self, s3_service, mock_s3_client):
+        s3_service.upload_string("bucket", "key", "body")
+
+        mock_s3_client.head_object.assert_not_called()
+        assert "Metadata" not in mock_s3_client.put_object.call_args[1]
+
+def test_batch_object_key_matches_producer_deduplication_id():
+    import hashlib
+    digest = hashlib.sha256(b"2025-01-02|tt1,tt2").hexdigest()
+
+    assert batch_object_key("2025-01-02", [{"id": "tt2"}, {"id": "tt1"}]) == f"bronze/2025-01-02/batch-{digest[:16]}.ndjson"
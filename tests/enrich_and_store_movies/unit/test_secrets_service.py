@@ -1,7 +1,7 @@
 import pytest
 import json
 from unittest.mock import MagicMock, patch
-from lambdas.enrich_and_store_movies.src.secrets_service import SecretsService
+from lambdas.enrich_and_store_movies.src.secrets_service import SecretsService, SecretCache
 
 @pytest.fixture
 def secrets_service(mock_secrets_client, mock_logger):
@@ -179,3 +179,28 @@ class TestSecretsService:
         result = secrets_service.get_omdb_api_key("test-secret")
         
         assert result is None
+
+    def test_secret_cache_serves_within_ttl(self, mock_secrets_client, mock_logger):
+        clock = MagicMock(return_value=0)
+        service = SecretsService(mock_secrets_client, 3, 1, mock_logger, cache=SecretCache(60, clock=clock))
+        mock_secrets_client.get_secret_value.return_value = {"SecretString": json.dumps({"omdbapi_key": "k1"})}
+
+        assert service.get_omdb_api_key("secret") == "k1"
+        clock.return_value = 59
+        assert service.get_omdb_api_key("secret") == "k1"
+        mock_secrets_client.get_secret_value.assert_called_once()
+
+        clock.return_value = 60
+        mock_secrets_client.get_secret_value.return_value = {"SecretString": json.dumps({"omdbapi_key": "k2"})}
+        assert service.get_omdb_api_key("secret") == "k2"
+
+    def test_secret_cache_force_refresh(self, mock_secrets_client, mock_logger):
+        service = SecretsService(mock_secrets_client, 3, 1, mock_logger, cache=SecretCache(60))
+        mock_secrets_client.get_secret_value.return_value = {"SecretString": json.dumps({"omdbapi_key": "k1"})}
+        service.get_omdb_api_key("secret")
+
+        mock_secrets_client.get_secret_value.return_value = {"SecretString": json.dumps({"omdbapi_key": "k2"})}
+
+        assert service.get_omdb_api_key("secret", force_refresh=True) == "k2"
+        assert service.get_omdb_api_key("secret") == "k2"
+        assert mock_secrets_client.get_secret_value.call_count == 2
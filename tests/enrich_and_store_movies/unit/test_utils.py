@@ -2,6 +2,7 @@ import pytest
 import json
 from unittest.mock import MagicMock
 from lambdas.fetch_top_movies.src.utils import build_response, with_retries
+from lambdas.enrich_and_store_movies.src.utils import build_batch_response
 
 def test_build_response_success():
     result = build_response(200, "Success")
@@ -17,6 +18,13 @@ def test_build_response_error():
     assert result["body"] == json.dumps({"message": "Error occurred"})
 
 
+def test_build_batch_response_lists_failed_messages():
+    result = build_batch_response(500, "Error occurred", ["m1", "m2"])
+
+    assert result["statusCode"] == 500
+    assert result["batchItemFailures"] == [{"itemIdentifier": "m1"}, {"itemIdentifier": "m2"}]
+
+
 def test_with_retries_success():
     mock_logger = MagicMock()
     call_count = 0
@@ -25,6 +25,8 @@ def mock_services():
          patch('lambdas.fetch_top_movies.fetch_top_movies.IMDBService') as mock_imdb_class:
 
         mock_sqs_class.return_value = mock_sqs
+        mock_sqs.send_batches.return_value = []
+        mock_imdb.content_unchanged.return_value = False
         mock_imdb_class.return_value = mock_imdb
         
         yield {
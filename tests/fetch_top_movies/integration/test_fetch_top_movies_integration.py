@@ -38,7 +38,7 @@ def setup_test_environment():
 def test_lambda_handler_full_integration_success(setup_test_environment, mock_imdb_data):
     env = setup_test_environment
     
-    with patch('lambdas.fetch_top_movies.src.imdb_service.requests.get') as mock_get:
+    with patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get') as mock_get:
         mock_response = MagicMock()
         mock_response.json.return_value = mock_imdb_data
         mock_response.raise_for_status.return_value = None
@@ -66,7 +66,7 @@ def test_lambda_handler_full_integration_success(setup_test_environment, mock_im
 def test_lambda_handler_single_batch(setup_test_environment, mock_imdb_data):
     env = setup_test_environment
     
-    with patch('lambdas.fetch_top_movies.src.imdb_service.requests.get') as mock_get:
+    with patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get') as mock_get:
         mock_response = MagicMock()
         mock_response.json.return_value = mock_imdb_data
         mock_response.raise_for_status.return_value = None
@@ -83,4 +83,56 @@ def test_lambda_handler_single_batch(setup_test_environment, mock_imdb_data):
         
         message = json.loads(messages['Messages'][0]['Body'])
         assert len(message['movies']) == 3
-        assert message['is_final_batch'] is True
\ No newline at end of file
+        assert message['is_final_batch'] is True
+
+def test_lambda_handler_streaming_feed(setup_test_environment, mock_imdb_data):
+    env = setup_test_environment
+    payload = json.dumps(mock_imdb_data).encode("utf-8")
+
+    with patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get') as mock_get, \
+         patch('lambdas.fetch_top_movies.fetch_top_movies.STREAM_IMDB_FEED', True):
+        mock_response = MagicMock()
+        mock_response.__enter__.return_value = mock_response
+        mock_response.iter_content.return_value = [payload[i:i + 100] for i in range(0, len(payload), 100)]
+        mock_get.return_value = mock_response
+
+        event = {"top_n": 3, "batch_size": 5}
+        result = env['lambda_handler'](event, None)
+
+        assert result["statusCode"] == 200
+
+        messages = env['sqs_client'].receive_message(QueueUrl=env['queue_url'], MaxNumberOfMessages=10)
+        message = json.loads(messages['Messages'][0]['Body'])
+        assert [movie['id'] for movie in message['movies']] == ["tt0111161", "tt0068646", "tt0071562"]
+
+
+def test_lambda_handler_skips_unchanged_feed(setup_test_environment, mock_imdb_data):
+    env = setup_test_environment
+    s3 = boto3.client('s3', region_name='us-east-1')
+    s3.create_bucket(Bucket='test-state-bucket')
+    payload = json.dumps(mock_imdb_data).encode("utf-8")
+
+    def fake_get(url, timeout, headers):
+        response = MagicMock()
+        response.headers = {"ETag": '"v1"'}
+        response.status_code = 304 if headers.get("If-None-Match") == '"v1"' else 200
+        response.content = payload
+        response.json.return_value = json.loads(payload)
+        return response
+
+    with patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get', side_effect=fake_get), \
+         patch('lambdas.fetch_top_movies.fetch_top_movies.STATE_S3_BUCKET', 'test-state-bucket'):
+        event = {"top_n": 3, "batch_size": 5}
+        first = env['lambda_handler'](event, None)
+        second = env['lambda_handler'](event, None)
+
+    assert first["statusCode"] == 200
+    assert "All movies sent to SQS" in first["body"]
+    assert second["statusCode"] == 200
+    assert "No change in IMDb feed" in second["body"]
+
+    state = json.loads(s3.get_object(Bucket='test-state-bucket', Key='state/fetch_top_movies/imdb_feed_top_3.json')['Body'].read())
+    assert state["etag"] == '"v1"'
+
+    messages = env['sqs_client'].receive_message(QueueUrl=env['queue_url'], MaxNumberOfMessages=10)
+    assert len(messages['Messages']) == 1
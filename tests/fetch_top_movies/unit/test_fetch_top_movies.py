@@ -1,12 +1,16 @@
 import os
 import pytest
 from unittest.mock import patch, MagicMock
-from lambdas.fetch_top_movies.fetch_top_movies import lambda_handler
+from lambdas.fetch_top_movies.fetch_top_movies import lambda_handler, FEED_UNCHANGED
+from lambdas.fetch_top_movies.src.sqs_service import partition_by_shard, processed_ledger_key
 
 @pytest.fixture
 def mock_context():
     return MagicMock()
 
+def sent_messages(mock_sqs):
+    return [(c[0][0], c[1]['is_final_batch']) for c in mock_sqs.send_batches.call_args_list]
+
 class TestFetchTopMovies:
     
     def test_lambda_handler_success(self, mock_services, mock_event, mock_context, mock_imdb_data):
@@ -14,7 +18,6 @@ class TestFetchTopMovies:
         
         mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
         mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
-        mocks['sqs'].send_batch.return_value = True
         
         result = lambda_handler(mock_event, mock_context)
         
@@ -22,14 +25,13 @@ class TestFetchTopMovies:
         assert "All movies sent to SQS" in result["body"]
         mocks['imdb'].fetch_movie_data.assert_called_once()
         mocks['imdb'].get_top_rated_movies.assert_called_once()
-        mocks['sqs'].send_batch.assert_called()
+        mocks['sqs'].send_batches.assert_called()
 
     def test_lambda_handler_default_parameters(self, mock_services, mock_context, mock_imdb_data):
         mocks = mock_services
         
         mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
         mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"][:10]
-        mocks['sqs'].send_batch.return_value = True
         
         result = lambda_handler({}, mock_context)
         
@@ -43,7 +45,6 @@ class TestFetchTopMovies:
         
         mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
         mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"][:5]
-        mocks['sqs'].send_batch.return_value = True
         
         result = lambda_handler(event, mock_context)
         
@@ -92,7 +93,7 @@ class TestFetchTopMovies:
         
         mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
         mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
-        mocks['sqs'].send_batch.return_value = False
+        mocks['sqs'].send_batches.side_effect = [[], [0]]
         
         result = lambda_handler(mock_event, mock_context)
         
@@ -104,7 +105,7 @@ class TestFetchTopMovies:
         
         mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
         mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
-        mocks['sqs'].send_batch.side_effect = Exception("SQS Error")
+        mocks['sqs'].send_batches.side_effect = Exception("SQS Error")
         
         result = lambda_handler(mock_event, mock_context)
         
@@ -118,12 +119,14 @@ class TestFetchTopMovies:
         
         mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
         mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"][:3]
-        mocks['sqs'].send_batch.return_value = True
         
         result = lambda_handler(event, mock_context)
         
         assert result["statusCode"] == 200
-        assert mocks['sqs'].send_batch.call_count == 2
+        assert sent_messages(mocks['sqs']) == [
+            ([mock_imdb_data["items"][:2]], False),
+            ([mock_imdb_data["items"][2:3]], True)
+        ]
 
     def test_lambda_handler_single_batch(self, mock_services, mock_context, mock_imdb_data):
         mocks = mock_services
@@ -132,12 +135,11 @@ class TestFetchTopMovies:
         
         mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
         mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"][:2]
-        mocks['sqs'].send_batch.return_value = True
         
         result = lambda_handler(event, mock_context)
         
         assert result["statusCode"] == 200
-        mocks['sqs'].send_batch.assert_called_once()
+        assert sent_messages(mocks['sqs']) == [([], False), ([mock_imdb_data["items"][:2]], True)]
 
     def test_lambda_handler_batch_final_flag(self, mock_services, mock_context, mock_imdb_data):
         mocks = mock_services
@@ -146,16 +148,14 @@ class TestFetchTopMovies:
         
         mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
         mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"][:3]
-        mocks['sqs'].send_batch.return_value = True
         
         result = lambda_handler(event, mock_context)
         
         assert result["statusCode"] == 200
         
-        calls = mocks['sqs'].send_batch.call_args_list
-        assert len(calls) == 2
-        assert calls[0][1]['is_final_batch'] == False
-        assert calls[1][1]['is_final_batch'] == True
+        final_call = mocks['sqs'].send_batches.call_args_list[-1]
+        assert final_call[0][0] == [mock_imdb_data["items"][2:3]]
+        assert final_call[1]['is_final_batch'] is True
 
     def test_lambda_handler_first_batch_fails(self, mock_services, mock_context, mock_imdb_data):
         mocks = mock_services
@@ -164,10 +164,267 @@ class TestFetchTopMovies:
         
         mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
         mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"][:3]
-        mocks['sqs'].send_batch.side_effect = [False, True]
+        mocks['sqs'].send_batches.return_value = [0]
         
         result = lambda_handler(event, mock_context)
         
         assert result["statusCode"] == 500
-        assert "Batch sending failed" in result["body"]
-        mocks['sqs'].send_batch.assert_called_once()
+        assert "Batch sending failed for movies: tt0111161, tt0068646" in result["body"]
+        mocks['sqs'].send_batches.assert_called_once()
+
+    def test_lambda_handler_batches_sent_in_one_call(self, mock_services, mock_context, mock_imdb_data):
+        mocks = mock_services
+        
+        event = {"top_n": 5, "batch_size": 1}
+        
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
+        
+        result = lambda_handler(event, mock_context)
+        
+        assert result["statusCode"] == 200
+        assert sent_messages(mocks['sqs']) == [
+            ([[movie] for movie in mock_imdb_data["items"][:4]], False),
+            ([[mock_imdb_data["items"][4]]], True)
+        ]
+
+    def test_lambda_handler_streaming_mode(self, mock_services, mock_event, mock_context, mock_imdb_data):
+        mocks = mock_services
+        stream = iter(mock_imdb_data["items"])
+
+        mocks['imdb'].stream_movie_items.return_value = stream
+        mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
+
+        with patch('lambdas.fetch_top_movies.fetch_top_movies.STREAM_IMDB_FEED', True):
+            result = lambda_handler(mock_event, mock_context)
+
+        assert result["statusCode"] == 200
+        mocks['imdb'].fetch_movie_data.assert_not_called()
+        mocks['imdb'].get_top_rated_movies.assert_called_once_with(stream, 10)
+
+    def test_lambda_handler_streaming_mode_open_fails(self, mock_services, mock_event, mock_context):
+        mocks = mock_services
+        mocks['imdb'].stream_movie_items.side_effect = Exception("IMDB API Error")
+
+        with patch('lambdas.fetch_top_movies.fetch_top_movies.STREAM_IMDB_FEED', True):
+            result = lambda_handler(mock_event, mock_context)
+
+        assert result["statusCode"] == 500
+        assert "Failed to fetch movie data" in result["body"]
+
+    def test_lambda_handler_feed_not_modified(self, mock_services, mock_event, mock_context):
+        mocks = mock_services
+        mocks['imdb'].fetch_movie_data.return_value = FEED_UNCHANGED
+
+        result = lambda_handler(mock_event, mock_context)
+
+        assert result["statusCode"] == 200
+        assert "No change in IMDb feed" in result["body"]
+        mocks['imdb'].get_top_rated_movies.assert_not_called()
+        mocks['sqs'].send_batches.assert_not_called()
+
+    def test_lambda_handler_streamed_feed_hash_unchanged(self, mock_services, mock_event, mock_context, mock_imdb_data):
+        mocks = mock_services
+        mocks['imdb'].stream_movie_items.return_value = iter(mock_imdb_data["items"])
+        mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
+        mocks['imdb'].content_unchanged.return_value = True
+
+        with patch('lambdas.fetch_top_movies.fetch_top_movies.STREAM_IMDB_FEED', True):
+            result = lambda_handler(mock_event, mock_context)
+
+        assert result["statusCode"] == 200
+        assert "No change in IMDb feed" in result["body"]
+        mocks['imdb'].commit_feed_state.assert_called_once()
+        mocks['sqs'].send_batches.assert_not_called()
+
+    def test_lambda_handler_commits_state_after_send(self, mock_services, mock_event, mock_context, mock_imdb_data):
+        mocks = mock_services
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
+
+        result = lambda_handler(mock_event, mock_context)
+
+        assert result["statusCode"] == 200
+        mocks['imdb'].commit_feed_state.assert_called_once()
+
+    def test_lambda_handler_no_state_commit_on_send_failure(self, mock_services, mock_event, mock_context, mock_imdb_data):
+        mocks = mock_services
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
+        mocks['sqs'].send_batches.side_effect = [[], [0]]
+
+        result = lambda_handler(mock_event, mock_context)
+
+        assert result["statusCode"] == 500
+        mocks['imdb'].commit_feed_state.assert_not_called()
+
+    def test_lambda_handler_state_commit_failure_is_not_fatal(self, mock_services, mock_event, mock_context, mock_imdb_data):
+        mocks = mock_services
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
+        mocks['imdb'].commit_feed_state.side_effect = Exception("S3 down")
+
+        result = lambda_handler(mock_event, mock_context)
+
+        assert result["statusCode"] == 200
+
+    def test_lambda_handler_state_store_wiring(self, mock_services, mock_context):
+        mocks = mock_services
+
+        with patch('lambdas.fetch_top_movies.fetch_top_movies.STATE_S3_BUCKET', 'state-bucket'):
+            lambda_handler({"top_n": 25, "force_refresh": True}, mock_context)
+
+        kwargs = mocks['imdb_class'].call_args[1]
+        assert kwargs['state_store'].bucket == 'state-bucket'
+        assert kwargs['state_key'] == 'imdb_feed_top_25.json'
+        assert kwargs['force_refresh'] is True
+
+    def test_lambda_handler_delta_enqueue(self, mock_services, mock_context, mock_imdb_data):
+        mocks = mock_services
+        movies = mock_imdb_data["items"][:3]
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = movies
+
+        with patch('lambdas.fetch_top_movies.fetch_top_movies.STATE_S3_BUCKET', 'state-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.BRONZE_S3_BUCKET', 'bronze-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.DELTA_ENQUEUE', True), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.ManifestService') as mock_manifest_class, \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.S3StateStore'):
+            mock_manifest = mock_manifest_class.return_value
+            mock_manifest.plan.return_value = ([movies[2]], {"tt0111161": "bronze/2025-01-01/tt0111161.json"})
+
+            result = lambda_handler({"top_n": 3, "batch_size": 1, "run_date": "2025-01-02"}, mock_context)
+
+        assert result["statusCode"] == 200
+        mock_manifest.plan.assert_called_once_with(movies, "2025-01-02", ignore_previous=False)
+        assert sent_messages(mocks['sqs']) == [([], False), ([[movies[2]]], True)]
+        mock_manifest.save_references.assert_called_once_with(
+            "2025-01-02", {"tt0111161": "bronze/2025-01-01/tt0111161.json"}, movies
+        )
+        ledgers = mock_manifest.assign_ledgers.call_args[0][0]
+        assert ledgers == {movies[2]["id"]: processed_ledger_key("2025-01-02", [movies[2]])}
+        mock_manifest.commit.assert_called_once()
+        assert mocks['sqs_class'].call_args[1]['run_date'] == "2025-01-02"
+
+    def test_lambda_handler_refetches_feed_while_movies_unconfirmed(self, mock_services, mock_context):
+        mocks = mock_services
+
+        with patch('lambdas.fetch_top_movies.fetch_top_movies.STATE_S3_BUCKET', 'state-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.BRONZE_S3_BUCKET', 'bronze-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.DELTA_ENQUEUE', True), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.ManifestService') as mock_manifest_class, \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.S3StateStore'):
+            mock_manifest_class.return_value.has_unconfirmed.return_value = True
+            lambda_handler({"top_n": 3}, mock_context)
+            assert mocks['imdb_class'].call_args[1]['force_refresh'] is True
+
+            mock_manifest_class.return_value.has_unconfirmed.return_value = False
+            lambda_handler({"top_n": 3}, mock_context)
+            assert mocks['imdb_class'].call_args[1]['force_refresh'] is False
+
+    def test_lambda_handler_ndjson_layout_assigns_batch_keys(self, mock_services, mock_context, mock_imdb_data):
+        mocks = mock_services
+        movies = mock_imdb_data["items"][:3]
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = movies
+
+        with patch('lambdas.fetch_top_movies.fetch_top_movies.STATE_S3_BUCKET', 'state-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.BRONZE_S3_BUCKET', 'bronze-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.DELTA_ENQUEUE', True), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.BRONZE_LAYOUT', "ndjson"), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.ManifestService') as mock_manifest_class, \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.S3StateStore'):
+            mock_manifest = mock_manifest_class.return_value
+            mock_manifest.plan.return_value = (movies[1:], {})
+
+            result = lambda_handler({"top_n": 3, "batch_size": 1, "run_date": "2025-01-02"}, mock_context)
+
+        assert result["statusCode"] == 200
+        keys = mock_manifest.assign_keys.call_args[0][0]
+        assert set(keys) == {movie["id"] for movie in movies[1:]}
+        assert len(set(keys.values())) == 2
+        assert all(key.startswith("bronze/2025-01-02/batch-") for key in keys.values())
+
+    def test_lambda_handler_delta_nothing_changed_sends_empty_final_batch(self, mock_services, mock_context, mock_imdb_data):
+        mocks = mock_services
+        movies = mock_imdb_data["items"][:2]
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = movies
+
+        with patch('lambdas.fetch_top_movies.fetch_top_movies.STATE_S3_BUCKET', 'state-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.BRONZE_S3_BUCKET', 'bronze-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.DELTA_ENQUEUE', True), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.ManifestService') as mock_manifest_class, \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.S3StateStore'):
+            mock_manifest_class.return_value.plan.return_value = ([], {"tt0111161": "k1", "tt0068646": "k2"})
+
+            result = lambda_handler({"top_n": 2}, mock_context)
+
+        assert result["statusCode"] == 200
+        assert sent_messages(mocks['sqs']) == [([], False), ([[]], True)]
+        run = mocks['sqs'].send_batches.call_args[1]['run']
+        assert (run['expected_messages'], run['expected_movies']) == (1, 0)
+
+    def test_lambda_handler_delta_plan_failure(self, mock_services, mock_context, mock_imdb_data):
+        mocks = mock_services
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
+
+        with patch('lambdas.fetch_top_movies.fetch_top_movies.STATE_S3_BUCKET', 'state-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.BRONZE_S3_BUCKET', 'bronze-bucket'), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.DELTA_ENQUEUE', True), \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.ManifestService') as mock_manifest_class, \
+             patch('lambdas.fetch_top_movies.fetch_top_movies.S3StateStore'):
+            mock_manifest_class.return_value.plan.side_effect = Exception("S3 down")
+
+            result = lambda_handler({"top_n": 5}, mock_context)
+
+        assert result["statusCode"] == 500
+        assert "Failed to plan delta enqueue" in result["body"]
+        mocks['sqs'].send_batches.assert_not_called()
+
+    def test_lambda_handler_packs_by_message_bytes(self, mock_services, mock_context, mock_imdb_data):
+        mocks = mock_services
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = mock_imdb_data["items"]
+
+        result = lambda_handler({"top_n": 5, "message_bytes": 64 * 1024}, mock_context)
+
+        assert result["statusCode"] == 200
+        assert sent_messages(mocks['sqs']) == [([], False), ([mock_imdb_data["items"]], True)]
+
+    def test_lambda_handler_oversized_movie(self, mock_services, mock_context):
+        mocks = mock_services
+        huge_movie = {"id": "tt9999999", "rank": 1, "plot": "x" * 300_000}
+        mocks['imdb'].fetch_movie_data.return_value = {"items": [huge_movie]}
+        mocks['imdb'].get_top_rated_movies.return_value = [huge_movie]
+
+        result = lambda_handler({"top_n": 1}, mock_context)
+
+        assert result["statusCode"] == 500
+        assert "tt9999999" in result["body"]
+        mocks['sqs'].send_batches.assert_not_called()
+
+    def test_lambda_handler_sharded_message_groups(self, mock_services, mock_context, mock_imdb_data):
+        mocks = mock_services
+        items = mock_imdb_data["items"]
+        mocks['imdb'].fetch_movie_data.return_value = mock_imdb_data
+        mocks['imdb'].get_top_rated_movies.return_value = items
+
+        result = lambda_handler({"top_n": 5, "batch_size": 1, "message_groups": 3}, mock_context)
+
+        assert result["statusCode"] == 200
+        expected = partition_by_shard(items, 3)
+        pending_call, final_call = mocks['sqs'].send_batches.call_args_list
+
+        assert final_call[1]['is_final_batch'] is True
+        assert final_call[1]['shards'] == list(expected)
+        assert final_call[0][0] == [[movies[-1]] for movies in expected.values()]
+        assert pending_call[1]['is_final_batch'] is False
+        assert len(pending_call[0][0]) == len(items) - len(expected)
+        assert pending_call[1]['run'] == final_call[1]['run']
+        assert final_call[1]['run']['expected_messages'] == len(items)
+        assert final_call[1]['run']['expected_movies'] == len(items)
+
+        lambda_handler({"top_n": 5, "batch_size": 1, "message_groups": 3}, mock_context)
+        assert mocks['sqs'].send_batches.call_args[1]['run'] == final_call[1]['run']
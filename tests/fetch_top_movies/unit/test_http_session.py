@@ -0,0 +1,15 @@
+from requests.adapters import HTTPAdapter
+from lambdas.fetch_top_movies.src.http_session import get_session
+
+
+def test_get_session_is_reused():
+    assert get_session(4) is get_session(4)
+    assert get_session(4) is not get_session(5)
+
+
+def test_get_session_pool_size():
+    adapter = get_session(7).get_adapter("https://example.com")
+
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter._pool_maxsize == 7
+    assert get_session(7).headers["Connection"] == "keep-alive"
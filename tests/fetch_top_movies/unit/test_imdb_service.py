@@ -2,7 +2,8 @@ import pytest
 import json
 from unittest.mock import MagicMock, patch
 import requests
-from lambdas.fetch_top_movies.src.imdb_service import IMDBService
+from lambdas.fetch_top_movies.src.imdb_service import IMDBService, FEED_UNCHANGED
+from lambdas.fetch_top_movies.src.state_store import InMemoryStateStore
 
 
 @pytest.fixture
@@ -34,7 +35,7 @@ def test_init(mock_logger):
     assert service.logger == mock_logger
 
 
-@patch('lambdas.fetch_top_movies.src.imdb_service.requests.get')
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
 def test_fetch_success(mock_get, imdb_service):
     mock_response = MagicMock()
     mock_response.json.return_value = {"items": [{"rank": "1", "id": "movie1"}]}
@@ -43,11 +44,11 @@ def test_fetch_success(mock_get, imdb_service):
     result = imdb_service._fetch("https://test-url.com")
     
     assert result == {"items": [{"rank": "1", "id": "movie1"}]}
-    mock_get.assert_called_once_with("https://test-url.com", timeout=10)
+    mock_get.assert_called_once_with("https://test-url.com", timeout=(3, 10))
     mock_response.raise_for_status.assert_called_once()
 
 
-@patch('lambdas.fetch_top_movies.src.imdb_service.requests.get')
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
 def test_fetch_http_error(mock_get, imdb_service):
     mock_response = MagicMock()
     mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError("404 Not Found")
@@ -194,3 +195,195 @@ def test_get_top_rated_movies_logs_invalid_rank_warning_no_id(imdb_service):
     assert len(result) == 1
     assert result[0]["id"] == "movie1"
     imdb_service.logger.warning.assert_called_once_with("Skipping movie with invalid rank: N/A")
+
+
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
+def test_stream_movie_items(mock_get, imdb_service):
+    payload = json.dumps({"items": [{"rank": "2", "id": "movie2"}, {"rank": "1", "id": "movie1"}]}).encode("utf-8")
+    mock_response = MagicMock()
+    mock_response.__enter__.return_value = mock_response
+    mock_response.iter_content.return_value = [payload[:10], payload[10:]]
+    mock_get.return_value = mock_response
+
+    result = list(imdb_service.stream_movie_items())
+
+    assert result == [{"rank": "2", "id": "movie2"}, {"rank": "1", "id": "movie1"}]
+    mock_get.assert_called_once_with("https://test-url.com", timeout=(3, 10), stream=True, headers={})
+    mock_response.iter_content.assert_called_once_with(chunk_size=imdb_service.chunk_size)
+    mock_response.__exit__.assert_called_once()
+
+
+@patch('lambdas.fetch_top_movies.src.imdb_service.with_retries')
+def test_stream_movie_items_opens_eagerly(mock_with_retries, imdb_service):
+    mock_with_retries.side_effect = Exception("Connection refused")
+
+    with pytest.raises(Exception, match="Connection refused"):
+        imdb_service.stream_movie_items()
+
+
+def test_get_top_rated_movies_from_iterator(imdb_service):
+    items = iter([
+        {"rank": "2", "id": "movie2"},
+        {"rank": "1", "id": "movie1"}
+    ])
+
+    result = imdb_service.get_top_rated_movies(items, 1)
+
+    assert result == [{"rank": 1, "id": "movie1"}]
+
+
+def test_get_top_rated_movies_keeps_feed_order_on_ties(imdb_service):
+    items = [
+        {"rank": "2", "id": "first"},
+        {"rank": "1", "id": "top"},
+        {"rank": "2", "id": "second"},
+        {"rank": "2", "id": "third"}
+    ]
+
+    result = imdb_service.get_top_rated_movies(items, 3)
+
+    assert [m["id"] for m in result] == ["top", "first", "second"]
+
+
+def test_get_top_rated_movies_large_generator(imdb_service):
+    items = ({"rank": str(rank), "id": f"tt{rank}"} for rank in range(10_000, 0, -1))
+
+    result = imdb_service.get_top_rated_movies(items, 3)
+
+    assert [m["rank"] for m in result] == [1, 2, 3]
+
+
+@pytest.fixture
+def state_store():
+    return InMemoryStateStore()
+
+
+@pytest.fixture
+def stateful_imdb_service(mock_logger, state_store):
+    return IMDBService(
+        url="https://test-url.com",
+        max_retries=3,
+        base_delay=0.1,
+        logger=mock_logger,
+        state_store=state_store,
+        state_key="feed.json"
+    )
+
+
+def make_response(payload, status_code=200, etag='"abc"', last_modified="Wed, 01 Jan 2025 00:00:00 GMT"):
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = payload
+    response.json.return_value = json.loads(payload) if payload else None
+    response.headers = {"ETag": etag, "Last-Modified": last_modified}
+    response.__enter__.return_value = response
+    response.iter_content.return_value = [payload]
+    return response
+
+
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
+def test_fetch_movie_data_first_run_sends_no_validators(mock_get, stateful_imdb_service, state_store):
+    payload = b'{"items": [{"rank": "1", "id": "movie1"}]}'
+    mock_get.return_value = make_response(payload)
+
+    result = stateful_imdb_service.fetch_movie_data()
+
+    assert result == {"items": [{"rank": "1", "id": "movie1"}]}
+    mock_get.assert_called_once_with("https://test-url.com", timeout=(3, 10), headers={})
+    assert state_store.load("feed.json") is None
+
+
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
+def test_commit_feed_state_saves_validators_and_hash(mock_get, stateful_imdb_service, state_store):
+    mock_get.return_value = make_response(b'{"items": []}')
+
+    stateful_imdb_service.fetch_movie_data()
+    assert stateful_imdb_service.commit_feed_state() is True
+
+    saved = state_store.load("feed.json")
+    assert saved["etag"] == '"abc"'
+    assert saved["last_modified"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert len(saved["content_sha256"]) == 64
+
+
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
+def test_fetch_movie_data_not_modified(mock_get, stateful_imdb_service, state_store):
+    state_store.save("feed.json", {"etag": '"abc"', "last_modified": "Wed, 01 Jan 2025 00:00:00 GMT", "content_sha256": "x"})
+    mock_get.return_value = make_response(b"", status_code=304)
+
+    result = stateful_imdb_service.fetch_movie_data()
+
+    assert result is FEED_UNCHANGED
+    mock_get.assert_called_once_with(
+        "https://test-url.com",
+        timeout=(3, 10),
+        headers={"If-None-Match": '"abc"', "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    )
+    mock_get.return_value.raise_for_status.assert_not_called()
+
+
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
+def test_fetch_movie_data_same_content_new_etag(mock_get, stateful_imdb_service, state_store):
+    payload = b'{"items": []}'
+    mock_get.return_value = make_response(payload, etag='"old"')
+    stateful_imdb_service.fetch_movie_data()
+    stateful_imdb_service.commit_feed_state()
+
+    mock_get.return_value = make_response(payload, etag='"new"')
+    result = stateful_imdb_service.fetch_movie_data()
+
+    assert result is FEED_UNCHANGED
+    assert state_store.load("feed.json")["etag"] == '"new"'
+
+
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
+def test_fetch_movie_data_changed_content(mock_get, stateful_imdb_service, state_store):
+    state_store.save("feed.json", {"etag": '"abc"', "last_modified": None, "content_sha256": "stale"})
+    mock_get.return_value = make_response(b'{"items": [{"rank": "1", "id": "movie1"}]}', etag='"def"')
+
+    result = stateful_imdb_service.fetch_movie_data()
+
+    assert result == {"items": [{"rank": "1", "id": "movie1"}]}
+    assert stateful_imdb_service.content_unchanged() is False
+    mock_get.assert_called_once_with("https://test-url.com", timeout=(3, 10), headers={"If-None-Match": '"abc"'})
+
+
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
+def test_fetch_movie_data_force_refresh_ignores_state(mock_get, mock_logger, state_store):
+    state_store.save("feed.json", {"etag": '"abc"', "last_modified": None, "content_sha256": "x"})
+    service = IMDBService("https://test-url.com", 3, 0.1, mock_logger,
+                          state_store=state_store, state_key="feed.json", force_refresh=True)
+    mock_get.return_value = make_response(b'{"items": []}')
+
+    result = service.fetch_movie_data()
+
+    assert result == {"items": []}
+    mock_get.assert_called_once_with("https://test-url.com", timeout=(3, 10), headers={})
+
+
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
+def test_stream_movie_items_not_modified(mock_get, stateful_imdb_service, state_store):
+    state_store.save("feed.json", {"etag": '"abc"', "last_modified": None, "content_sha256": "x"})
+    mock_get.return_value = make_response(b"", status_code=304)
+
+    result = stateful_imdb_service.stream_movie_items()
+
+    assert result is FEED_UNCHANGED
+    mock_get.assert_called_once_with("https://test-url.com", timeout=(3, 10), stream=True, headers={"If-None-Match": '"abc"'})
+
+
+@patch('lambdas.fetch_top_movies.src.http_session.requests.Session.get')
+def test_stream_movie_items_hashes_whole_body(mock_get, stateful_imdb_service):
+    payload = b'{"items": [{"rank": "1", "id": "movie1"}], "errorMessage": ""}'
+    mock_get.return_value = make_response(payload)
+
+    stateful_imdb_service.get_top_rated_movies(stateful_imdb_service.stream_movie_items(), 10)
+    stateful_imdb_service.commit_feed_state()
+    mock_get.return_value = make_response(payload, etag='"other"')
+    stateful_imdb_service.get_top_rated_movies(stateful_imdb_service.stream_movie_items(), 10)
+
+    assert stateful_imdb_service.content_unchanged() is True
+
+
+def test_commit_feed_state_without_store(imdb_service):
+    assert imdb_service.commit_feed_state() is False
@@ -0,0 +1,99 @@
+import json
+import pytest
+from lambdas.fetch_top_movies.src.json_stream import iter_array_items
+
+
+def chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_iter_array_items_single_chunk():
+    payload = json.dumps({"items": [{"id": "tt1"}, {"id": "tt2"}], "errorMessage": ""})
+
+    result = list(iter_array_items([payload.encode("utf-8")], "items"))
+
+    assert result == [{"id": "tt1"}, {"id": "tt2"}]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64])
+def test_iter_array_items_split_across_chunks(size):
+    items = [{"id": f"tt{i}", "rank": str(i), "title": "Amélie – ★"} for i in range(20)]
+    payload = json.dumps({"count": 12345, "meta": {"items": []}, "items": items}, indent=2)
+
+    result = list(iter_array_items(chunked(payload, size), "items"))
+
+    assert result == items
+
+
+def test_iter_array_items_key_after_other_fields():
+    payload = '{"errorMessage": "", "total": 2, "items": [1, 22, 333]}'
+
+    result = list(iter_array_items(chunked(payload, 3), "items"))
+
+    assert result == [1, 22, 333]
+
+
+def test_iter_array_items_missing_key():
+    payload = '{"errorMessage": "Invalid API key"}'
+
+    assert list(iter_array_items([payload], "items")) == []
+
+
+def test_iter_array_items_empty_array():
+    assert list(iter_array_items(['{"items": []}'], "items")) == []
+
+
+def test_iter_array_items_is_lazy():
+    def chunks():
+        yield b'{"items": [{"id": "tt1"},'
+        raise RuntimeError("connection dropped")
+
+    stream = iter_array_items(chunks(), "items")
+
+    assert next(stream) == {"id": "tt1"}
+    with pytest.raises(RuntimeError, match="connection dropped"):
+        next(stream)
+
+
+def test_iter_array_items_truncated_payload():
+    with pytest.raises(ValueError):
+        list(iter_array_items([b'{"items": [{"id": "tt1"}, {"id": '], "items"))
+
+
+def test_iter_array_items_not_an_object():
+    with pytest.raises(ValueError):
+        list(iter_array_items([b'[1, 2, 3]'], "items"))
+
+
+@pytest.mark.parametrize("size", [1, 2, 5])
+def test_iter_array_items_escapes_split_across_chunks(size):
+    items = [{"title": 'He said "hi" \\ left', "tags": ["[x]", "{y}"]}, "a\"]}", -1.5e3, True, None]
+    payload = json.dumps({"note": "skip \"me\" ]}", "items": items})
+
+    assert list(iter_array_items(chunked(payload, size), "items")) == items
+
+
+def test_skipped_values_are_not_buffered():
+    from lambdas.fetch_top_movies.src.json_stream import _Buffer
+
+    big = json.dumps({"meta": [{"text": "x" * 100} for _ in range(1000)], "items": [1]})
+    buffer = _Buffer(chunked(big, 256))
+    buffer.expect("{")
+    assert buffer.decode_value() == "meta"
+    buffer.expect(":")
+
+    longest = 0
+    read_more = buffer.read_more
+
+    def tracking_read_more():
+        nonlocal longest
+        result = read_more()
+        longest = max(longest, len(buffer.text))
+        return result
+
+    buffer.read_more = tracking_read_more
+    buffer.skip_value()
+
+    assert longest <= 256 + 1
+    assert buffer.peek() == ","
@@ -0,0 +1,189 @@
+import pytest
+from unittest.mock import MagicMock
+from lambdas.fetch_top_movies.src.manifest_service import ManifestService, movie_hash
+from lambdas.fetch_top_movies.src.state_store import InMemoryStateStore
+
+
+@pytest.fixture
+def mock_logger():
+    return MagicMock()
+
+
+@pytest.fixture
+def state_store():
+    return InMemoryStateStore()
+
+
+@pytest.fixture
+def bronze_store():
+    return InMemoryStateStore()
+
+
+@pytest.fixture
+def manifest_service(state_store, mock_logger, bronze_store):
+    return ManifestService(state_store, "manifest.json", mock_logger, bronze_store=bronze_store)
+
+
+def send_and_confirm(manifest_service, bronze_store, movies, run_date, stored=None):
+    # Plans a run and has the consumer confirm every sent movie (or only `stored`) in one ledger.
+    to_enqueue, carried_forward = manifest_service.plan(movies, run_date)
+    ledger = f"bronze/{run_date}/_processed/batch.json"
+    manifest_service.assign_ledgers({movie["id"]: ledger for movie in to_enqueue if movie.get("id")})
+    manifest_service.commit()
+    ids = [movie["id"] for movie in to_enqueue] if stored is None else stored
+    bronze_store.save(ledger, {"enriched": ids})
+    return to_enqueue, carried_forward
+
+
+@pytest.fixture
+def movies():
+    return [
+        {"id": "tt1", "rank": 1, "title": "Movie 1"},
+        {"id": "tt2", "rank": 2, "title": "Movie 2"},
+        {"id": "tt3", "rank": 3, "title": "Movie 3"}
+    ]
+
+
+def test_movie_hash_ignores_key_order():
+    assert movie_hash({"id": "tt1", "title": "A"}) == movie_hash({"title": "A", "id": "tt1"})
+    assert movie_hash({"id": "tt1", "title": "A"}) != movie_hash({"id": "tt1", "title": "B"})
+
+
+def test_movie_hash_ignores_daily_feed_fields():
+    movie = {"id": "tt1", "title": "A", "year": "1994", "rank": "1", "imDbRatingCount": "100"}
+
+    assert movie_hash(movie) == movie_hash({**movie, "rank": "2", "imDbRatingCount": "101"})
+    assert movie_hash(movie) != movie_hash({**movie, "year": "1995"})
+
+
+def test_plan_first_run_enqueues_everything(manifest_service, movies):
+    to_enqueue, carried_forward = manifest_service.plan(movies, "2025-01-01")
+
+    assert to_enqueue == movies
+    assert carried_forward == {}
+
+
+def test_plan_carries_unchanged_movies_forward(manifest_service, bronze_store, movies):
+    send_and_confirm(manifest_service, bronze_store, movies, "2025-01-01")
+
+    changed = [{**movies[0], "rank": 2}, {**movies[1], "title": "Renamed"}, movies[2], {"id": "tt4", "title": "New"}]
+    to_enqueue, carried_forward = manifest_service.plan(changed, "2025-01-02")
+
+    assert [m["id"] for m in to_enqueue] == ["tt2", "tt4"]
+    assert carried_forward == {"tt1": "bronze/2025-01-01/tt1.json", "tt3": "bronze/2025-01-01/tt3.json"}
+
+
+def test_plan_sends_unconfirmed_movies_again(manifest_service, bronze_store, movies):
+    send_and_confirm(manifest_service, bronze_store, movies, "2025-01-01", stored=["tt1"])
+
+    to_enqueue, carried_forward = manifest_service.plan(movies, "2025-01-02")
+
+    assert [m["id"] for m in to_enqueue] == ["tt2", "tt3"]
+    assert carried_forward == {"tt1": "bronze/2025-01-01/tt1.json"}
+
+
+def test_plan_without_bronze_store_never_trusts_pending_entries(state_store, mock_logger, movies):
+    manifest_service = ManifestService(state_store, "manifest.json", mock_logger)
+    manifest_service.plan(movies, "2025-01-01")
+    manifest_service.commit()
+
+    to_enqueue, carried_forward = manifest_service.plan(movies, "2025-01-02")
+
+    assert to_enqueue == movies
+    assert carried_forward == {}
+
+
+def test_plan_warns_when_no_processed_ledger_exists(manifest_service, mock_logger, movies):
+    manifest_service.plan(movies, "2025-01-01")
+    manifest_service.assign_ledgers({movie["id"]: "bronze/2025-01-01/_processed/batch.json" for movie in movies})
+    manifest_service.commit()
+
+    to_enqueue, _ = manifest_service.plan(movies, "2025-01-02")
+
+    assert to_enqueue == movies
+    assert "PROCESSED_LEDGER_ENABLED" in mock_logger.warning.call_args[0][0]
+
+
+def test_plan_trusts_entries_saved_before_confirmation(manifest_service, state_store, movies):
+    state_store.save("manifest.json", {"movies": {"tt1": {"hash": movie_hash(movies[0]), "key": "bronze/old/tt1.json"}}})
+
+    _, carried_forward = manifest_service.plan(movies, "2025-01-02")
+
+    assert carried_forward == {"tt1": "bronze/old/tt1.json"}
+
+
+def test_commit_keeps_original_key_for_carried_movies(manifest_service, state_store, bronze_store, movies):
+    send_and_confirm(manifest_service, bronze_store, movies, "2025-01-01")
+    manifest_service.plan(movies, "2025-01-02")
+    manifest_service.commit()
+
+    saved = state_store.load("manifest.json")
+    assert saved["run_date"] == "2025-01-02"
+    assert saved["movies"]["tt1"] == {"hash": movie_hash(movies[0]), "key": "bronze/2025-01-01/tt1.json"}
+    assert set(saved["movies"]) == {"tt1", "tt2", "tt3"}
+
+
+def test_plan_drops_movies_that_left_the_list(manifest_service, state_store, movies):
+    manifest_service.plan(movies, "2025-01-01")
+    manifest_service.commit()
+
+    manifest_service.plan(movies[:1], "2025-01-02")
+    manifest_service.commit()
+
+    assert set(state_store.load("manifest.json")["movies"]) == {"tt1"}
+
+
+def test_plan_ignore_previous(manifest_service, movies):
+    manifest_service.plan(movies, "2025-01-01")
+    manifest_service.commit()
+
+    to_enqueue, carried_forward = manifest_service.plan(movies, "2025-01-02", ignore_previous=True)
+
+    assert to_enqueue == movies
+    assert carried_forward == {}
+
+
+def test_plan_movie_without_id_is_always_enqueued(manifest_service):
+    to_enqueue, _ = manifest_service.plan([{"rank": 1}], "2025-01-01")
+    manifest_service.commit()
+    to_enqueue_again, _ = manifest_service.plan([{"rank": 1}], "2025-01-02")
+
+    assert to_enqueue == to_enqueue_again == [{"rank": 1}]
+
+
+def test_assign_keys_points_movies_at_batch_objects(manifest_service, state_store, bronze_store, movies):
+    manifest_service.plan(movies, "2025-01-01")
+    manifest_service.assign_keys({"tt1": "bronze/2025-01-01/batch-a.ndjson", "tt9": "bronze/2025-01-01/batch-b.ndjson"})
+    manifest_service.assign_ledgers({"tt1": "bronze/2025-01-01/_processed/a.json"})
+    manifest_service.commit()
+    bronze_store.save("bronze/2025-01-01/_processed/a.json", {"enriched": ["tt1"]})
+    _, carried_forward = manifest_service.plan(movies, "2025-01-02")
+
+    saved = state_store.load("manifest.json")
+    assert saved["movies"]["tt1"]["key"] == "bronze/2025-01-01/batch-a.ndjson"
+    assert "tt9" not in saved["movies"]
+    assert carried_forward == {"tt1": "bronze/2025-01-01/batch-a.ndjson"}
+
+
+def test_commit_without_plan(manifest_service, state_store):
+    assert manifest_service.commit() is False
+    assert state_store.load("manifest.json") is None
+
+
+def test_has_unconfirmed(manifest_service, bronze_store, movies):
+    assert not manifest_service.has_unconfirmed()
+
+    send_and_confirm(manifest_service, bronze_store, movies, "2025-01-01", stored=["tt1", "tt2"])
+    assert manifest_service.has_unconfirmed()
+
+    send_and_confirm(manifest_service, bronze_store, movies, "2025-01-02")
+    assert not manifest_service.has_unconfirmed()
+
+
+def test_save_references_writes_carried_forward_file(manifest_service, bronze_store, movies):
+    manifest_service.save_references("2025-01-02", {"tt1": "bronze/2025-01-01/tt1.json"}, movies)
+
+    assert bronze_store.load("bronze/2025-01-02/_carried_forward.json") == {
+        "movies": {"tt1": "bronze/2025-01-01/tt1.json"},
+        "feed": {"tt1": movies[0]}
+    }
@@ -0,0 +1,90 @@
+import gzip
+import json
+import base64
+import pytest
+from unittest.mock import MagicMock
+from lambdas.fetch_top_movies.src.message_codec import (
+    compress_body, ClaimCheckStore, MessageEncoder, GZIP_ENCODING
+)
+
+
+@pytest.fixture
+def mock_logger():
+    return MagicMock()
+
+
+@pytest.fixture
+def mock_s3_client():
+    return MagicMock()
+
+
+@pytest.fixture
+def claim_check_store(mock_s3_client, mock_logger):
+    return ClaimCheckStore(mock_s3_client, "bronze-bucket", 3, 0.1, mock_logger)
+
+
+def large_body(movies=200):
+    return json.dumps({"movies": [{"id": f"tt{i}", "plot": "A long plot. " * 20} for i in range(movies)]})
+
+
+def test_compress_body_round_trip():
+    body = large_body()
+
+    compressed = json.loads(compress_body(body))
+
+    assert compressed["encoding"] == GZIP_ENCODING
+    assert gzip.decompress(base64.b64decode(compressed["payload"])).decode("utf-8") == body
+
+
+def test_claim_check_store_put(claim_check_store, mock_s3_client):
+    body = large_body()
+
+    pointer = claim_check_store.put(body, "2025-01-02")
+
+    assert pointer["bucket"] == "bronze-bucket"
+    assert pointer["key"].startswith("claim-checks/2025-01-02/")
+    kwargs = mock_s3_client.put_object.call_args[1]
+    assert kwargs["Key"] == pointer["key"]
+    assert kwargs["ContentEncoding"] == "gzip"
+    assert gzip.decompress(kwargs["Body"]).decode("utf-8") == body
+
+
+def test_claim_check_key_is_stable(claim_check_store):
+    body = large_body()
+
+    assert claim_check_store.put(body, "2025-01-02") == claim_check_store.put(body, "2025-01-02")
+
+
+def test_encoder_passes_small_bodies_through(claim_check_store, mock_s3_client):
+    body = json.dumps({"movies": [{"id": "tt1"}]})
+
+    assert MessageEncoder(compress=True, claim_check_store=claim_check_store).encode(body) == body
+    mock_s3_client.put_object.assert_not_called()
+
+
+def test_encoder_compresses(mock_s3_client):
+    body = large_body()
+
+    encoded = MessageEncoder(compress=True).encode(body)
+
+    assert json.loads(encoded)["encoding"] == GZIP_ENCODING
+    assert len(encoded) < len(body)
+
+
+def test_encoder_claim_checks_past_threshold(claim_check_store, mock_s3_client):
+    body = large_body()
+
+    encoded = MessageEncoder(claim_check_store=claim_check_store, claim_check_bytes=1024).encode(body, "2025-01-02")
+
+    pointer = json.loads(encoded)["claim_check"]
+    assert pointer["key"] == mock_s3_client.put_object.call_args[1]["Key"]
+
+
+def test_encoder_compresses_before_claim_checking(claim_check_store, mock_s3_client):
+    body = large_body()
+    compressed_size = len(compress_body(body))
+
+    encoded = MessageEncoder(True, claim_check_store, claim_check_bytes=compressed_size).encode(body)
+
+    assert json.loads(encoded)["encoding"] == GZIP_ENCODING
+    mock_s3_client.put_object.assert_not_called()
@@ -1,7 +1,10 @@
 import pytest
 import json
 from unittest.mock import MagicMock, patch
-from lambdas.fetch_top_movies.src.sqs_service import SQSService
+from lambdas.fetch_top_movies.src.sqs_service import (
+    SQSService, pack_movies, shard_of, partition_by_shard, deduplication_id, batch_object_key, processed_ledger_key,
+    run_id, MAX_MESSAGE_BYTES
+)
 
 
 @pytest.fixture
@@ -59,139 +62,302 @@ def test_send_single_with_sqs_error(sqs_service, mock_sqs_client):
         sqs_service._send_single(message_body, message_group_id, deduplication_id)
 
 
-@patch('lambdas.fetch_top_movies.src.sqs_service.with_retries')
-@patch('lambdas.fetch_top_movies.src.sqs_service.uuid.uuid4')
-def test_send_batch_success(mock_uuid, mock_with_retries, sqs_service, mock_logger):
-    mock_uuid.return_value = "test-uuid"
-    mock_with_retries.return_value = True
-    
-    batch = ["movie1", "movie2", "movie3"]
-    is_final_batch = False
-    
-    result = sqs_service.send_batch(batch, is_final_batch)
-    
-    expected_message_body = json.dumps({
-        "movies": batch,
-        "is_final_batch": is_final_batch
-    })
-    
-    assert result is True
-    mock_with_retries.assert_called_once_with(
-        mock_logger,
-        3,
-        0.1,
-        sqs_service._send_single,
-        "Sending batch with 3 movies to SQS",
-        expected_message_body,
-        "movies-group",
-        "test-uuid"
-    )
+def test_send_batches_message_body_format(sqs_service, mock_sqs_client):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    batch = ["movie1", "movie2"]
+
+    result = sqs_service.send_batches([batch], is_final_batch=True)
+
+    assert result == []
+    entry = mock_sqs_client.send_message_batch.call_args[1]["Entries"][0]
+    assert json.loads(entry["MessageBody"]) == {"movies": batch, "is_final_batch": True}
+    assert entry["MessageGroupId"] == "movies-group"
+    assert entry["MessageDeduplicationId"] == deduplication_id(None, batch)
+
+
+def test_send_batches_default_final_batch_false(sqs_service, mock_sqs_client):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+
+    sqs_service.send_batches([["movie1"]])
+
+    entry = mock_sqs_client.send_message_batch.call_args[1]["Entries"][0]
+    assert json.loads(entry["MessageBody"])["is_final_batch"] is False
+
+
+def test_send_batches_empty_batch(sqs_service, mock_sqs_client):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+
+    result = sqs_service.send_batches([[]], is_final_batch=True)
+
+    assert result == []
+    entry = mock_sqs_client.send_message_batch.call_args[1]["Entries"][0]
+    assert json.loads(entry["MessageBody"]) == {"movies": [], "is_final_batch": True}
 
 
 @patch('lambdas.fetch_top_movies.src.sqs_service.with_retries')
-@patch('lambdas.fetch_top_movies.src.sqs_service.uuid.uuid4')
-def test_send_batch_final_batch(mock_uuid, mock_with_retries, sqs_service, mock_logger):
-    mock_uuid.return_value = "test-uuid-final"
-    mock_with_retries.return_value = True
-    
-    batch = ["movie1", "movie2"]
-    is_final_batch = True
-    
-    result = sqs_service.send_batch(batch, is_final_batch)
-    
-    expected_message_body = json.dumps({
-        "movies": batch,
-        "is_final_batch": is_final_batch
-    })
-    
-    assert result is True
-    mock_with_retries.assert_called_once_with(
-        mock_logger,
-        3,
-        0.1,
-        sqs_service._send_single,
-        "Sending batch with 2 movies to SQS",
-        expected_message_body,
-        "movies-group",
-        "test-uuid-final"
+def test_send_batches_with_retries_failure(mock_with_retries, sqs_service, mock_logger):
+    mock_with_retries.side_effect = Exception("Retry failed")
+
+    result = sqs_service.send_batches([["movie1"], ["movie2"]])
+
+    assert result == [0, 1]
+    mock_logger.error.assert_called()
+
+
+def test_send_entries_returns_failed(sqs_service, mock_sqs_client):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": [{"Id": "0"}]}
+    entries = [{"Id": "0", "MessageBody": "{}"}]
+
+    result = sqs_service._send_entries(entries)
+
+    assert result == [{"Id": "0"}]
+    mock_sqs_client.send_message_batch.assert_called_once_with(
+        QueueUrl="https://sqs.us-east-1.amazonaws.com/123456789012/test-queue",
+        Entries=entries
     )
 
 
-@patch('lambdas.fetch_top_movies.src.sqs_service.with_retries')
-@patch('lambdas.fetch_top_movies.src.sqs_service.uuid.uuid4')
-def test_send_batch_empty_batch(mock_uuid, mock_with_retries, sqs_service, mock_logger):
-    mock_uuid.return_value = "test-uuid-empty"
-    mock_with_retries.return_value = True
-    
-    batch = []
-    is_final_batch = False
-    
-    result = sqs_service.send_batch(batch, is_final_batch)
-    
-    expected_message_body = json.dumps({
-        "movies": batch,
-        "is_final_batch": is_final_batch
-    })
-    
-    assert result is True
-    mock_with_retries.assert_called_once_with(
-        mock_logger,
-        3,
-        0.1,
-        sqs_service._send_single,
-        "Sending batch with 0 movies to SQS",
-        expected_message_body,
-        "movies-group",
-        "test-uuid-empty"
+def test_send_batches_packs_ten_entries_per_call(sqs_service, mock_sqs_client):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    batches = [[{"id": f"tt{i}"}] for i in range(25)]
+
+    result = sqs_service.send_batches(batches)
+
+    assert result == []
+    assert mock_sqs_client.send_message_batch.call_count == 3
+    sizes = [len(c[1]["Entries"]) for c in mock_sqs_client.send_message_batch.call_args_list]
+    assert sizes == [10, 10, 5]
+    mock_sqs_client.send_message.assert_not_called()
+
+    first_entry = mock_sqs_client.send_message_batch.call_args_list[0][1]["Entries"][0]
+    assert first_entry["Id"] == "0"
+    assert first_entry["MessageGroupId"] == "movies-group"
+    assert json.loads(first_entry["MessageBody"]) == {"movies": [{"id": "tt0"}], "is_final_batch": False}
+
+
+def test_send_batches_splits_calls_by_payload_size(sqs_service, mock_sqs_client):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    batches = [[{"id": f"tt{i}", "plot": "x" * 100_000}] for i in range(3)]
+
+    sqs_service.send_batches(batches)
+
+    sizes = [len(c[1]["Entries"]) for c in mock_sqs_client.send_message_batch.call_args_list]
+    assert sizes == [2, 1]
+
+
+def test_send_batches_retries_failed_entries_individually(sqs_service, mock_sqs_client):
+    mock_sqs_client.send_message_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [{"Id": "1", "Code": "InternalError", "Message": "boom", "SenderFault": False}]
+    }
+    batches = [[{"id": "tt0"}], [{"id": "tt1"}]]
+
+    result = sqs_service.send_batches(batches)
+
+    assert result == []
+    mock_sqs_client.send_message.assert_called_once()
+    assert json.loads(mock_sqs_client.send_message.call_args[1]["MessageBody"])["movies"] == [{"id": "tt1"}]
+
+
+@patch('lambdas.fetch_top_movies.src.utils.time.sleep')
+def test_send_batches_reports_entries_that_failed_for_good(mock_sleep, sqs_service, mock_sqs_client):
+    mock_sqs_client.send_message_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [{"Id": "1", "Code": "InternalError", "Message": "boom", "SenderFault": False}]
+    }
+    mock_sqs_client.send_message.side_effect = Exception("SQS Error")
+    batches = [[{"id": "tt0"}], [{"id": "tt1"}]]
+
+    result = sqs_service.send_batches(batches)
+
+    assert result == [1]
+    assert mock_sqs_client.send_message.call_count == 3
+
+
+@patch('lambdas.fetch_top_movies.src.utils.time.sleep')
+def test_send_batches_whole_call_failure(mock_sleep, sqs_service, mock_sqs_client):
+    mock_sqs_client.send_message_batch.side_effect = Exception("SQS down")
+    batches = [[{"id": "tt0"}], [{"id": "tt1"}]]
+
+    result = sqs_service.send_batches(batches)
+
+    assert result == [0, 1]
+    mock_sqs_client.send_message.assert_not_called()
+
+
+def test_send_batches_empty(sqs_service, mock_sqs_client):
+    assert sqs_service.send_batches([]) == []
+    mock_sqs_client.send_message_batch.assert_not_called()
+
+
+def test_send_batches_includes_run_date(mock_sqs_client, mock_logger):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    service = SQSService(mock_sqs_client, "queue-url", 3, 0.1, mock_logger, run_date="2025-01-02")
+
+    service.send_batches([[{"id": "tt1"}]], is_final_batch=True)
+
+    body = json.loads(mock_sqs_client.send_message_batch.call_args[1]["Entries"][0]["MessageBody"])
+    assert body == {"movies": [{"id": "tt1"}], "is_final_batch": True, "run_date": "2025-01-02"}
+
+
+def test_send_batches_sharded_entries(mock_sqs_client, mock_logger):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    service = SQSService(mock_sqs_client, "queue-url", 3, 0.1, mock_logger, run_date="2025-01-02")
+
+    service.send_batches(
+        [[{"id": "tt0"}], [{"id": "tt1"}]], is_final_batch=True, shards=[0, 3],
+        run={"run_id": "run-1", "expected_messages": 4, "expected_movies": 7}
     )
 
+    entries = mock_sqs_client.send_message_batch.call_args[1]["Entries"]
+    assert [e["MessageGroupId"] for e in entries] == ["movies-group-0", "movies-group-3"]
+    assert json.loads(entries[1]["MessageBody"]) == {
+        "movies": [{"id": "tt1"}],
+        "is_final_batch": True,
+        "run_date": "2025-01-02",
+        "shard": 3,
+        "run_id": "run-1",
+        "expected_messages": 4,
+        "expected_movies": 7
+    }
 
-@patch('lambdas.fetch_top_movies.src.sqs_service.with_retries')
-@patch('lambdas.fetch_top_movies.src.sqs_service.uuid.uuid4')
-def test_send_batch_with_retries_failure(mock_uuid, mock_with_retries, sqs_service, mock_logger):
-    mock_uuid.return_value = "test-uuid-fail"
-    mock_with_retries.side_effect = Exception("Retry failed")
-    
-    batch = ["movie1"]
-    
-    with pytest.raises(Exception, match="Retry failed"):
-        sqs_service.send_batch(batch)
 
+def test_deduplication_id_is_deterministic():
+    batch = [{"id": "tt2"}, {"id": "tt1"}]
 
-def test_send_batch_message_body_format(sqs_service):
-    batch = ["movie1", "movie2"]
-    is_final_batch = True
-    
-    with patch('lambdas.fetch_top_movies.src.sqs_service.with_retries') as mock_with_retries, \
-         patch('lambdas.fetch_top_movies.src.sqs_service.uuid.uuid4') as mock_uuid:
-        
-        mock_uuid.return_value = "test-uuid"
-        mock_with_retries.return_value = True
-        
-        sqs_service.send_batch(batch, is_final_batch)
-        
-       
-        call_args = mock_with_retries.call_args
-        message_body = call_args[0][5] 
-        
-        parsed_body = json.loads(message_body)
-        assert parsed_body["movies"] == batch
-        assert parsed_body["is_final_batch"] == is_final_batch
-
-
-def test_send_batch_default_final_batch_false(sqs_service):
-    batch = ["movie1"]
-    
-    with patch('lambdas.fetch_top_movies.src.sqs_service.with_retries') as mock_with_retries, \
-         patch('lambdas.fetch_top_movies.src.sqs_service.uuid.uuid4') as mock_uuid:
-        
-        mock_uuid.return_value = "test-uuid"
-        mock_with_retries.return_value = True
-        
-        sqs_service.send_batch(batch)  
-        
-        call_args = mock_with_retries.call_args
-        message_body = call_args[0][5] 
-        
-        parsed_body = json.loads(message_body)
-        assert parsed_body["is_final_batch"] is False
+    assert deduplication_id("2025-01-02", batch) == deduplication_id("2025-01-02", list(reversed(batch)))
+    assert deduplication_id("2025-01-02", batch) != deduplication_id("2025-01-03", batch)
+    assert deduplication_id("2025-01-02", batch) != deduplication_id("2025-01-02", [{"id": "tt1"}])
+    assert len(deduplication_id("2025-01-02", batch)) <= 128
+
+
+def test_batch_object_key():
+    batch = [{"id": "tt2"}, {"id": "tt1"}]
+
+    assert batch_object_key("2025-01-02", batch) == f"bronze/2025-01-02/batch-{deduplication_id('2025-01-02', batch)[:16]}.ndjson"
+
+
+def test_send_batches_reuses_deduplication_id_on_rerun(mock_sqs_client, mock_logger):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    service = SQSService(mock_sqs_client, "queue-url", 3, 0.1, mock_logger, run_date="2025-01-02")
+    batches = [[{"id": "tt0"}, {"id": "tt1"}], [{"id": "tt2"}]]
+
+    service.send_batches(batches)
+    service.send_batches(batches)
+
+    first, second = [
+        [e["MessageDeduplicationId"] for e in c[1]["Entries"]]
+        for c in mock_sqs_client.send_message_batch.call_args_list
+    ]
+    assert first == second
+    assert len(set(first)) == 2
+
+
+def test_shard_of_is_stable():
+    assert shard_of("tt0111161", 4) == shard_of("tt0111161", 4)
+    assert shard_of("tt0111161", 1) == 0
+    assert all(0 <= shard_of(f"tt{i}", 4) < 4 for i in range(50))
+
+
+def test_partition_by_shard():
+    movies = [{"id": f"tt{i}"} for i in range(40)]
+
+    shards = partition_by_shard(movies, 4)
+
+    assert list(shards) == sorted(shards)
+    assert sorted(m["id"] for group in shards.values() for m in group) == sorted(m["id"] for m in movies)
+    for shard, group in shards.items():
+        assert all(shard_of(m["id"], 4) == shard for m in group)
+
+
+def test_pack_movies_respects_max_movies():
+    movies = [{"id": f"tt{i}"} for i in range(5)]
+
+    assert pack_movies(movies, max_movies=2) == [movies[0:2], movies[2:4], movies[4:5]]
+
+
+def test_pack_movies_fills_byte_budget():
+    movies = [{"id": f"tt{i}", "plot": "x" * 1000} for i in range(20)]
+
+    batches = pack_movies(movies, max_bytes=5 * 1024)
+
+    assert sum(len(b) for b in batches) == 20
+    assert len(batches) < 20
+    for batch in batches:
+        body = json.dumps({"movies": batch, "is_final_batch": False, "run_date": "2025-01-01"})
+        assert len(body.encode("utf-8")) <= 5 * 1024
+
+
+def test_pack_movies_never_exceeds_hard_limit():
+    movies = [{"id": f"tt{i}", "plot": "x" * 50_000} for i in range(12)]
+
+    batches = pack_movies(movies, max_bytes=10 * MAX_MESSAGE_BYTES)
+
+    for batch in batches:
+        body = json.dumps({"movies": batch, "is_final_batch": True, "run_date": "2025-01-01"})
+        assert len(body.encode("utf-8")) <= MAX_MESSAGE_BYTES
+
+
+def test_pack_movies_counts_multibyte_characters():
+    movies = [{"id": f"tt{i}", "title": "\u00e9" * 200} for i in range(8)]
+
+    batches = pack_movies(movies, max_bytes=4 * 1024)
+
+    assert len(batches) > 1
+    for batch in batches:
+        assert len(json.dumps({"movies": batch}).encode("utf-8")) <= 4 * 1024
+
+
+def test_pack_movies_movie_over_budget_goes_alone():
+    movies = [{"id": "tt1"}, {"id": "tt2", "plot": "x" * 10_000}, {"id": "tt3"}]
+
+    batches = pack_movies(movies, max_bytes=2 * 1024)
+
+    assert batches == [[movies[0]], [movies[1]], [movies[2]]]
+
+
+def test_pack_movies_oversized_movie():
+    with pytest.raises(ValueError, match="Movie tt1 is .* over the SQS message limit"):
+        pack_movies([{"id": "tt1", "plot": "x" * MAX_MESSAGE_BYTES}])
+
+
+def test_pack_movies_without_message_limit():
+    movies = [{"id": f"tt{i}", "plot": "x" * 100_000} for i in range(5)]
+
+    batches = pack_movies(movies, max_bytes=1024 * 1024, message_limit=None)
+
+    assert batches == [movies]
+
+
+def test_send_batches_uses_encoder(mock_sqs_client, mock_logger):
+    mock_sqs_client.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    encoder = MagicMock()
+    encoder.encode.return_value = '{"claim_check": {"bucket": "b", "key": "k"}}'
+    service = SQSService(mock_sqs_client, "queue-url", 3, 0.1, mock_logger, run_date="2025-01-02", encoder=encoder)
+
+    service.send_batches([[{"id": "tt1"}]])
+
+    entry = mock_sqs_client.send_message_batch.call_args[1]["Entries"][0]
+    assert entry["MessageBody"] == encoder.encode.return_value
+    assert entry["MessageDeduplicationId"] == deduplication_id("2025-01-02", [{"id": "tt1"}])
+    assert json.loads(encoder.encode.call_args[0][0])["movies"] == [{"id": "tt1"}]
+
+
+def test_pack_movies_empty():
+    assert pack_movies([]) == []
+
+
+def test_processed_ledger_key_matches_consumer_batch_id():
+    batch = [{"id": "tt2"}, {"id": "tt1"}]
+
+    assert processed_ledger_key("2025-01-02", batch) == (
+        f"bronze/2025-01-02/_processed/{deduplication_id('2025-01-02', batch)[:16]}.json"
+    )
+
+
+def test_run_id_depends_on_batching():
+    movies = [{"id": "tt1"}, {"id": "tt2"}, {"id": "tt3"}]
+
+    assert run_id("2025-01-02", [movies[:2], movies[2:]]) == run_id("2025-01-02", [movies[2:], movies[:2]])
+    assert run_id("2025-01-02", [movies[:2], movies[2:]]) != run_id("2025-01-02", [movies[:1], movies[1:]])
+    assert run_id("2025-01-02", [movies]) != run_id("2025-01-03", [movies])
@@ -0,0 +1,75 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from lambdas.fetch_top_movies.src.state_store import S3StateStore, InMemoryStateStore
+
+
+@pytest.fixture
+def mock_logger():
+    return MagicMock()
+
+
+@pytest.fixture
+def mock_s3_client():
+    return MagicMock()
+
+
+@pytest.fixture
+def state_store(mock_s3_client, mock_logger):
+    return S3StateStore(
+        client=mock_s3_client,
+        bucket="state-bucket",
+        prefix="state/",
+        max_retries=3,
+        base_delay=0.1,
+        logger=mock_logger
+    )
+
+
+def test_load_existing_state(state_store, mock_s3_client):
+    mock_s3_client.get_object.return_value = {"Body": MagicMock(read=lambda: b'{"etag": "abc"}')}
+
+    result = state_store.load("feed.json")
+
+    assert result == {"etag": "abc"}
+    mock_s3_client.get_object.assert_called_once_with(Bucket="state-bucket", Key="state/feed.json")
+
+
+def test_load_missing_state(state_store, mock_s3_client, mock_logger):
+    mock_s3_client.get_object.side_effect = ClientError(
+        error_response={'Error': {'Code': 'NoSuchKey', 'Message': 'Not found'}},
+        operation_name='GetObject'
+    )
+
+    assert state_store.load("feed.json") is None
+    mock_logger.warning.assert_not_called()
+
+
+def test_load_other_error_falls_back_to_none(state_store, mock_s3_client, mock_logger):
+    mock_s3_client.get_object.side_effect = ClientError(
+        error_response={'Error': {'Code': 'AccessDenied', 'Message': 'Denied'}},
+        operation_name='GetObject'
+    )
+
+    assert state_store.load("feed.json") is None
+    mock_logger.warning.assert_called_once()
+
+
+def test_save_state(state_store, mock_s3_client):
+    state_store.save("feed.json", {"etag": "abc"})
+
+    mock_s3_client.put_object.assert_called_once_with(
+        Bucket="state-bucket",
+        Key="state/feed.json",
+        Body=json.dumps({"etag": "abc"}),
+        ContentType="application/json"
+    )
+
+
+def test_in_memory_state_store():
+    store = InMemoryStateStore()
+
+    assert store.load("feed.json") is None
+    store.save("feed.json", {"etag": "abc"})
+    assert store.load("feed.json") == {"etag": "abc"}
@@ -45,6 +45,7 @@ def mock_s3_service():
     mock_s3 = MagicMock()
     mock_s3.list_json_objects.return_value = ["bronze/2025-07-23/file1.json"]
     mock_s3.load_json.return_value = {"key": "value"}
+    mock_s3.load_json_if_exists.return_value = None
     return mock_s3
 
 @pytest.fixture
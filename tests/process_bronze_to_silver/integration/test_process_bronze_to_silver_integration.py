@@ -53,3 +53,176 @@ def test_lambda_handler_success(setup_test_environment):
     response = env['s3_client'].get_object(Bucket=env['target_bucket'], Key="silver/movies_normalized.csv")
     stored_data = response['Body'].read().decode('utf-8')
     assert "Test Movie" in stored_data
+
+def test_lambda_handler_with_carried_forward_movies(setup_test_environment):
+    env = setup_test_environment
+
+    env['s3_client'].put_object(
+        Bucket=env['source_bucket'],
+        Key="bronze/2025-07-21/tt1111111.json",
+        Body=json.dumps({"id": "tt1111111", "title": "Old Movie"})
+    )
+    env['s3_client'].put_object(
+        Bucket=env['source_bucket'],
+        Key="bronze/2025-07-22/tt2222222.json",
+        Body=json.dumps({"id": "tt2222222", "title": "New Movie"})
+    )
+    env['s3_client'].put_object(
+        Bucket=env['source_bucket'],
+        Key="bronze/2025-07-22/_carried_forward.json",
+        Body=json.dumps({"movies": {"tt1111111": "bronze/2025-07-21/tt1111111.json"}})
+    )
+
+    result = env['lambda_handler']({"date": "2025-07-22"}, None)
+
+    assert result["statusCode"] == 200
+    assert "Processed 2 records" in result["body"]
+
+    response = env['s3_client'].get_object(Bucket=env['target_bucket'], Key="silver/movies_normalized.csv")
+    stored_data = response['Body'].read().decode('utf-8')
+    assert "Old Movie" in stored_data
+    assert "New Movie" in stored_data
+
+def test_lambda_handler_with_ndjson_batches(setup_test_environment):
+    env = setup_test_environment
+
+    env['s3_client'].put_object(
+        Bucket=env['source_bucket'],
+        Key="bronze/2025-07-21/batch-0123456789abcdef.ndjson",
+        Body="\n".join(json.dumps(m) for m in [
+            {"id": "tt1111111", "title": "Old Movie"},
+            {"id": "tt3333333", "title": "Replaced Movie"}
+        ])
+    )
+    env['s3_client'].put_object(
+        Bucket=env['source_bucket'],
+        Key="bronze/2025-07-22/batch-fedcba9876543210.ndjson",
+        Body="\n".join(json.dumps(m) for m in [
+            {"id": "tt2222222", "title": "New Movie"},
+            {"id": "tt3333333", "title": "Updated Movie"}
+        ])
+    )
+    env['s3_client'].put_object(
+        Bucket=env['source_bucket'],
+        Key="bronze/2025-07-22/_carried_forward.json",
+        Body=json.dumps({"movies": {"tt1111111": "bronze/2025-07-21/batch-0123456789abcdef.ndjson"}})
+    )
+
+    result = env['lambda_handler']({"date": "2025-07-22"}, None)
+
+    assert result["statusCode"] == 200
+    assert "Processed 3 records" in result["body"]
+
+    response = env['s3_client'].get_object(Bucket=env['target_bucket'], Key="silver/movies_normalized.csv")
+    stored_data = response['Body'].read().decode('utf-8')
+    assert "Old Movie" in stored_data
+    assert "Updated Movie" in stored_data
+    assert "Replaced Movie" not in stored_data
+
+def test_lambda_handler_writes_typed_columns(setup_test_environment):
+    env = setup_test_environment
+
+    env['s3_client'].put_object(
+        Bucket=env['source_bucket'],
+        Key="bronze/2025-07-22/tt0068646.json",
+        Body=json.dumps({
+            "id": "tt0068646", "rank": "2", "title": "The Godfather", "Year": "1972", "imdbRating": "9.2",
+            "imdbVotes": "2,000,000", "BoxOffice": "$134,966,411", "Runtime": "175 min",
+            "Released": "24 Mar 1972", "Metascore": "N/A"
+        })
+    )
+
+    result = env['lambda_handler']({"date": "2025-07-22"}, None)
+
+    assert result["statusCode"] == 200
+    response = env['s3_client'].get_object(Bucket=env['target_bucket'], Key="silver/movies_normalized.csv")
+    header, row = response['Body'].read().decode('utf-8').splitlines()
+    stored = dict(zip(header.split(","), row.split(",")))
+    assert stored["imdbvotes"] == "2000000"
+    assert stored["boxoffice"] == "134966411"
+    assert stored["runtime"] == "175"
+    assert stored["released"] == "1972-03-24"
+    assert stored["metascore"] == ""
+
+def test_lambda_handler_writes_parquet(setup_test_environment):
+    import io
+    import pandas as pd
+    env = setup_test_environment
+
+    env['s3_client'].put_object(
+        Bucket=env['source_bucket'],
+        Key="bronze/2025-07-22/tt0068646.json",
+        Body=json.dumps({
+            "id": "tt0068646", "rank": "2", "title": "The Godfather", "Year": "1972", "BoxOffice": "$134,966,411",
+            "Released": "24 Mar 1972", "Ratings": [{"Source": "Internet Movie Database", "Value": "9.2/10"}]
+        })
+    )
+
+    with patch.dict(os.environ, {'SILVER_FORMAT': 'parquet'}):
+        import lambdas.process_bronze_to_silver.process_bronze_to_silver as process_module
+        importlib.reload(process_module)
+        result = process_module.lambda_handler({"date": "2025-07-22"}, None)
+
+    assert result["statusCode"] == 200
+    response = env['s3_client'].get_object(Bucket=env['target_bucket'], Key="silver/movies_normalized.parquet")
+    stored = pd.read_parquet(io.BytesIO(response['Body'].read()))
+    assert stored.loc[0, "boxoffice"] == 134966411
+    assert stored.loc[0, "released"] == pd.Timestamp("1972-03-24")
+    assert stored.loc[0, "ratings"][0]["Value"] == "9.2/10"
+
+def test_lambda_handler_upserts_into_incremental_table(setup_test_environment):
+    import io
+    import pandas as pd
+    env = setup_test_environment
+    s3 = env['s3_client']
+
+    def put_batch(date, name, movies):
+        s3.put_object(Bucket=env['source_bucket'], Key=f"bronze/{date}/{name}.ndjson",
+                      Body="\n".join(json.dumps(movie) for movie in movies))
+
+    def read_table():
+        state = json.loads(s3.get_object(Bucket=env['target_bucket'], Key="silver/movies/_state.json")['Body'].read())
+        return state, {
+            imdb_id: pd.read_parquet(io.BytesIO(s3.get_object(Bucket=env['target_bucket'], Key=entry["key"])['Body'].read()))
+            for imdb_id, entry in state["movies"].items()
+        }
+
+    with patch.dict(os.environ, {'SILVER_MODE': 'incremental'}):
+        import lambdas.process_bronze_to_silver.process_bronze_to_silver as process_module
+        importlib.reload(process_module)
+
+        put_batch("2025-07-21", "batch-a", [
+            {"id": "tt1", "rank": "1", "title": "One", "imdbVotes": "1,000"},
+            {"id": "tt2", "rank": "2", "title": "Two", "imdbVotes": "2,000"},
+            {"id": "tt3", "rank": "3", "title": "Three", "imdbVotes": "3,000"}
+        ])
+        first = process_module.lambda_handler({"date": "2025-07-21"}, None)
+
+        # Next day only tt2 changed, tt1 is carried forward and tt3 left the chart.
+        put_batch("2025-07-22", "batch-b", [{"id": "tt2", "rank": "2", "title": "Two", "imdbVotes": "2,500"}])
+        s3.put_object(Bucket=env['source_bucket'], Key="bronze/2025-07-22/_carried_forward.json",
+                      Body=json.dumps({
+                          "movies": {"tt1": "bronze/2025-07-21/batch-a.ndjson"},
+                          "feed": {"tt1": {"id": "tt1", "rank": "4", "title": "Movie 1", "imDbRating": "9.0"}}
+                      }))
+        second = process_module.lambda_handler({"date": "2025-07-22"}, None)
+        repeated = process_module.lambda_handler({"date": "2025-07-22"}, None)
+    importlib.reload(process_module)
+
+    assert "Processed 3 records" in first["body"]
+    assert "Processed 1 records" in second["body"]
+    assert "Processed 0 records" in repeated["body"]
+
+    state, rows = read_table()
+    assert set(state["movies"]) == {"tt1", "tt2"}
+    assert state["movies"]["tt1"]["date"] == "2025-07-21"
+    assert state["movies"]["tt2"]["key"].startswith("silver/movies/date=2025-07-22/")
+    assert state["last_date"] == "2025-07-22"
+    # tt1's row is not rewritten; its current rank travels in the state, its OMDb title and rating stay.
+    assert state["movies"]["tt1"]["feed"] == {"rank": 4}
+    assert "feed" not in state["movies"]["tt2"]
+    tt2 = rows["tt2"].set_index("imdbid").loc["tt2"]
+    assert tt2["imdbvotes"] == 2500
+    # Partitions keep earlier versions as history.
+    assert rows["tt1"]["imdbid"].tolist() == ["tt1", "tt2", "tt3"]
+    assert "boxoffice" in rows["tt2"].columns
@@ -1,7 +1,7 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from lambdas.process_bronze_to_silver.process_bronze_to_silver import lambda_handler
-from lambdas.process_bronze_to_silver.src.processor import BronzeToSilverProcessor
+from lambdas.process_bronze_to_silver.src.processor import BronzeToSilverProcessor, ColumnBuffers
 from lambdas.process_bronze_to_silver.src.s3_service import S3Service
 
 @pytest.fixture
@@ -39,11 +39,12 @@ def test_lambda_handler_no_files(mock_event, mock_context, mock_s3_service):
         assert result["statusCode"] == 500
         assert "No .json files found" in result["body"]
 
-def test_processor_normalize_records(mock_processor):
-    json_objects = [{"Key": "Value"}, {"AnotherKey": "AnotherValue"}]
-    mock_processor.s3.load_json.side_effect = json_objects
+def test_processor_column_buffers():
+    buffers = ColumnBuffers()
+    for obj in [{"Key": "Value"}, {"AnotherKey": "AnotherValue"}]:
+        buffers.append(obj)
 
-    df = mock_processor.normalize_records(json_objects)
+    df = buffers.to_frame()
 
     assert len(df) == 2
     assert "key" in df.columns
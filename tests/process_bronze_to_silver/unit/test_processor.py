@@ -1,6 +1,9 @@
+import time
 import pytest
+import threading
 from unittest.mock import MagicMock
-from lambdas.process_bronze_to_silver.src.processor import BronzeToSilverProcessor
+import pandas as pd
+from lambdas.process_bronze_to_silver.src.processor import BronzeToSilverProcessor, ColumnBuffers
 
 @pytest.fixture
 def processor(mock_s3_service):
@@ -15,16 +18,212 @@ def test_process_success(processor, mock_s3_service):
     assert record_count == 1
     mock_s3_service.save_csv.assert_called_once()
 
+def test_process_writes_parquet(mock_s3_service):
+    processor = BronzeToSilverProcessor(mock_s3_service, "source-bucket", "target-bucket", output_format="parquet")
+
+    processor.process("bronze/2025-07-23/")
+
+    mock_s3_service.save_csv.assert_not_called()
+    bucket, key, df = mock_s3_service.save_parquet.call_args[0]
+    assert (bucket, key) == ("target-bucket", "silver/movies_normalized.parquet")
+    assert df.loc[0, "key"] == "value"
+
+def test_rejects_unknown_output_format(mock_s3_service):
+    with pytest.raises(ValueError, match="Unsupported silver format 'orc'"):
+        BronzeToSilverProcessor(mock_s3_service, "source-bucket", "target-bucket", output_format="orc")
+
 def test_process_no_files(processor, mock_s3_service):
     mock_s3_service.list_json_objects.return_value = []
 
     with pytest.raises(Exception, match="No .json files found"):
         processor.process("bronze/2025-07-23/")
 
-def test_normalize_records(processor):
-    json_objects = [{"Key": "Value"}, {"AnotherKey": "AnotherValue"}]
-    df = processor.normalize_records(json_objects)
+def test_process_lowercases_columns(processor, mock_s3_service):
+    mock_s3_service.list_json_objects.return_value = ["bronze/2025-07-23/a.json", "bronze/2025-07-23/b.json"]
+    mock_s3_service.load_json.side_effect = [{"Key": "Value"}, {"AnotherKey": "AnotherValue"}]
+
+    assert processor.process("bronze/2025-07-23/") == 2
+
+    header = mock_s3_service.save_csv.call_args[0][2].splitlines()[0]
+    assert header == "key,anotherkey"
+
+def test_process_includes_carried_forward_movies(processor, mock_s3_service):
+    mock_s3_service.list_json_objects.return_value = ["bronze/2025-07-23/tt2.json"]
+    mock_s3_service.load_json.return_value = {"imdbID": "tt2"}
+    mock_s3_service.load_json_if_exists.side_effect = lambda bucket, key: {
+        "bronze/2025-07-23/_carried_forward.json": {"movies": {"tt1": "bronze/2025-07-22/tt1.json"}},
+        "bronze/2025-07-22/tt1.json": {"imdbID": "tt1"}
+    }.get(key)
+
+    record_count = processor.process("bronze/2025-07-23/")
+
+    assert record_count == 2
+    csv_data = mock_s3_service.save_csv.call_args[0][2]
+    assert "tt1" in csv_data and "tt2" in csv_data
+
+def test_process_only_carried_forward_movies(processor, mock_s3_service):
+    mock_s3_service.list_json_objects.return_value = []
+    mock_s3_service.load_json_if_exists.side_effect = lambda bucket, key: {
+        "bronze/2025-07-23/_carried_forward.json": {"movies": {"tt1": "bronze/2025-07-22/tt1.json"}},
+        "bronze/2025-07-22/tt1.json": {"imdbID": "tt1"}
+    }.get(key)
+
+    assert processor.process("bronze/2025-07-23/") == 1
+
+def test_process_overlays_todays_feed_on_carried_forward_movies(processor, mock_s3_service):
+    mock_s3_service.list_json_objects.return_value = []
+    mock_s3_service.load_json_if_exists.side_effect = lambda bucket, key: {
+        "bronze/2025-07-23/_carried_forward.json": {
+            "movies": {"tt1": "bronze/2025-07-22/tt1.json"},
+            "feed": {"tt1": {"id": "tt1", "rank": "5", "imDbRatingCount": "1001"}}
+        },
+        "bronze/2025-07-22/tt1.json": {"id": "tt1", "rank": "3", "imDbRatingCount": "1000", "Title": "One"}
+    }.get(key)
+
+    processor.process("bronze/2025-07-23/")
+
+    csv_data = mock_s3_service.save_csv.call_args[0][2]
+    assert csv_data.splitlines() == ["id,rank,imdbratingcount,title", "tt1,5,1001,One"]
+
+def test_overlay_keeps_omdb_fields_the_feed_disagrees_with(processor, mock_s3_service):
+    mock_s3_service.list_json_objects.return_value = []
+    mock_s3_service.load_json_if_exists.side_effect = lambda bucket, key: {
+        "bronze/2025-07-23/_carried_forward.json": {
+            "movies": {"tt1": "bronze/2025-07-22/tt1.json"},
+            "feed": {"tt1": {"id": "tt1", "rank": "5", "title": "Movie 1", "imDbRating": "9.0"}}
+        },
+        "bronze/2025-07-22/tt1.json": {"id": "tt1", "rank": "3", "Title": "One", "imdbRating": "8.1"}
+    }.get(key)
+
+    processor.process("bronze/2025-07-23/")
+
+    csv_data = mock_s3_service.save_csv.call_args[0][2]
+    assert csv_data.splitlines() == ["id,rank,title,imdbrating", "tt1,5,One,8.1"]
+
+def test_carried_forward_prefers_todays_object(processor, mock_s3_service):
+    mock_s3_service.load_json_if_exists.return_value = {"movies": {"tt1": "bronze/2025-07-22/tt1.json"}}
+
+    references = processor.load_references("bronze/2025-07-23/")
+    keys = processor.carried_forward_keys(references, {"tt1"})
+
+    assert keys == {}
+
+def test_load_carried_forward_skips_missing_objects(processor, mock_s3_service):
+    mock_s3_service.load_json_if_exists.side_effect = [None, {"imdbID": "tt2"}]
+
+    result = processor.load_carried_forward({"tt1": "bronze/old/tt1.json", "tt2": "bronze/old/tt2.json"})
+
+    assert result == [{"imdbID": "tt2"}]
+    mock_s3_service.logger.warning.assert_called_once()
+
+def test_process_reads_ndjson_batches(processor, mock_s3_service):
+    mock_s3_service.list_json_objects.return_value = [
+        "bronze/2025-07-23/batch-a.ndjson",
+        "bronze/2025-07-23/tt3.json"
+    ]
+    mock_s3_service.load_ndjson.return_value = [{"id": "tt1"}, {"id": "tt2"}]
+    mock_s3_service.load_json.return_value = {"id": "tt3"}
+
+    assert processor.process("bronze/2025-07-23/") == 3
+    mock_s3_service.load_ndjson.assert_called_once_with("source-bucket", "bronze/2025-07-23/batch-a.ndjson")
+
+def test_carried_forward_skips_movies_in_todays_batches(processor, mock_s3_service):
+    mock_s3_service.list_json_objects.return_value = ["bronze/2025-07-23/batch-b.ndjson"]
+    mock_s3_service.load_ndjson.return_value = [{"id": "tt1", "title": "New"}]
+    mock_s3_service.load_json_if_exists.return_value = {"movies": {"tt1": "bronze/2025-07-22/batch-a.ndjson"}}
+
+    assert processor.process("bronze/2025-07-23/") == 1
+    mock_s3_service.load_ndjson_if_exists.assert_not_called()
+
+def test_load_carried_forward_picks_referenced_lines_from_batches(processor, mock_s3_service):
+    mock_s3_service.load_ndjson_if_exists.return_value = [{"id": "tt1"}, {"id": "tt2"}, {"id": "tt3"}]
+
+    result = processor.load_carried_forward({
+        "tt1": "bronze/2025-07-22/batch-a.ndjson",
+        "tt3": "bronze/2025-07-22/batch-a.ndjson"
+    })
+
+    assert result == [{"id": "tt1"}, {"id": "tt3"}]
+    mock_s3_service.load_ndjson_if_exists.assert_called_once()
+
+def test_load_many_preserves_key_order_when_concurrent(mock_s3_service):
+    processor = BronzeToSilverProcessor(mock_s3_service, "source-bucket", "target-bucket", max_workers=4)
+    keys = [f"bronze/2025-07-23/tt{i}.json" for i in range(8)]
+
+    def load_json(bucket, key):
+        # Later keys finish first, so completion order differs from key order.
+        time.sleep(0.01 * (8 - int(key.rsplit("tt", 1)[1].split(".")[0])))
+        return {"id": key}
+
+    mock_s3_service.load_json.side_effect = load_json
+
+    result = processor.load_many(keys)
+
+    assert [key for key, _ in result] == keys
+    assert [records[0]["id"] for _, records in result] == keys
+
+def test_load_many_runs_concurrently(mock_s3_service):
+    processor = BronzeToSilverProcessor(mock_s3_service, "source-bucket", "target-bucket", max_workers=4)
+    barrier = threading.Barrier(4, timeout=5)
+    mock_s3_service.load_json.side_effect = lambda bucket, key: barrier.wait() and {"id": key}
+
+    assert len(processor.load_many([f"k{i}.json" for i in range(8)])) == 8
+
+def test_iter_many_bounds_loads_in_flight(mock_s3_service):
+    processor = BronzeToSilverProcessor(mock_s3_service, "source-bucket", "target-bucket", max_workers=2)
+    started = []
+    mock_s3_service.load_json.side_effect = lambda bucket, key: started.append(key) or {"id": key}
+    keys = [f"k{i}.json" for i in range(20)]
+
+    loaded = processor.iter_many(keys)
+    assert next(loaded)[0] == "k0.json"
+    # Two loads per worker ahead, plus the one submitted when the first result was taken.
+    time.sleep(0.05)
+    assert len(started) == 5
+
+    assert [key for key, _ in loaded] == keys[1:]
+    assert len(started) == 20
+
+def test_load_many_reports_every_failed_key(mock_s3_service):
+    processor = BronzeToSilverProcessor(mock_s3_service, "source-bucket", "target-bucket", max_workers=3)
+
+    def load_json(bucket, key):
+        if key in ("b.json", "d.json"):
+            raise Exception("Access Denied")
+        return {"id": key}
+
+    mock_s3_service.load_json.side_effect = load_json
+
+    with pytest.raises(Exception, match="Failed to load 2 of 4 bronze object\\(s\\): b.json, d.json"):
+        processor.load_many(["a.json", "b.json", "c.json", "d.json"])
+    assert mock_s3_service.load_json.call_count == 4
+    assert mock_s3_service.logger.error.call_count == 2
+
+def test_column_buffers_pad_missing_fields():
+    buffers = ColumnBuffers()
+    buffers.append({"Title": "A", "Year": "1994"})
+    buffers.append({"Title": "B", "Genre": "Drama", "Nested": {"x": 1}})
+    buffers.append({"Year": "1972", "Ratings": [{"Source": "IMDb"}]})
+
+    df = buffers.to_frame()
+
+    assert list(df.columns) == ["title", "year", "genre", "ratings"]
+    assert df["title"].tolist()[:2] == ["A", "B"]
+    assert df["genre"].isna().tolist() == [True, False, True]
+    assert df["ratings"].tolist()[2] == [{"Source": "IMDb"}]
+
+def test_column_buffers_match_frame_of_dicts():
+    json_objects = [
+        {"Title": "A", "imdbRating": "9.3", "Rank": 1},
+        {"Title": "B", "BoxOffice": "$1", "Rank": 2, "Response": True},
+        {"title": "C"}
+    ]
+    expected = pd.DataFrame([
+        {k.lower(): v for k, v in obj.items()} for obj in json_objects
+    ])
+
+    buffers = ColumnBuffers()
+    for obj in json_objects:
+        buffers.append(obj)
 
-    assert len(df) == 2
-    assert "key" in df.columns
-    assert "anotherkey" in df.columns
+    assert buffers.to_frame().to_csv(index=False) == expected.to_csv(index=False)
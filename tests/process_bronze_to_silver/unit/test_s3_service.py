@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from lambdas.process_bronze_to_silver.src.s3_service import S3Service
 
 @pytest.fixture
@@ -44,3 +44,73 @@ def test_save_csv(s3_service):
         Body=b"csv_data",
         ContentType="text/csv"
     )
+
+def test_list_json_objects_skips_metadata_files(s3_service):
+    mock_s3 = MagicMock()
+    mock_s3.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [
+            {"Key": "bronze/2025-07-23/tt1.json"},
+            {"Key": "bronze/2025-07-23/_carried_forward.json"},
+            {"Key": "bronze/2025-07-23/_processed/0123456789abcdef.json"},
+            {"Key": "bronze/2025-07-23/_SUCCESS"}
+        ]}
+    ]
+    s3_service.s3 = mock_s3
+
+    result = s3_service.list_json_objects("bucket", "bronze/2025-07-23/")
+
+    assert result == ["bronze/2025-07-23/tt1.json"]
+
+def test_load_json_if_exists_missing(s3_service):
+    mock_s3 = MagicMock()
+    mock_s3.exceptions.NoSuchKey = type("NoSuchKey", (Exception,), {})
+    mock_s3.get_object.side_effect = mock_s3.exceptions.NoSuchKey()
+    s3_service.s3 = mock_s3
+
+    assert s3_service.load_json_if_exists("bucket", "key") is None
+
+def test_list_json_objects_includes_ndjson_batches(s3_service):
+    mock_s3 = MagicMock()
+    mock_s3.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [
+            {"Key": "bronze/2025-07-23/batch-a.ndjson"},
+            {"Key": "bronze/2025-07-23/tt1.json"}
+        ]}
+    ]
+    s3_service.s3 = mock_s3
+
+    result = s3_service.list_json_objects("bucket", "bronze/2025-07-23/")
+
+    assert result == ["bronze/2025-07-23/batch-a.ndjson", "bronze/2025-07-23/tt1.json"]
+
+def test_load_ndjson(s3_service):
+    mock_s3 = MagicMock()
+    mock_s3.get_object.return_value = {
+        "Body": MagicMock(iter_lines=lambda: iter([b'{"id": "tt1"}', b'', b'{"id": "tt2"}']))
+    }
+    s3_service.s3 = mock_s3
+
+    assert s3_service.load_ndjson("bucket", "key") == [{"id": "tt1"}, {"id": "tt2"}]
+
+def test_client_pool_and_retries(mock_logger):
+    with patch("lambdas.process_bronze_to_silver.src.s3_service.boto3.client") as mock_client:
+        S3Service(mock_logger, max_retries=4, base_delay=1, max_pool_connections=32)
+
+    config = mock_client.call_args[1]["config"]
+    assert config.max_pool_connections == 32
+    assert config.retries == {"max_attempts": 4, "mode": "standard"}
+
+def test_save_parquet(s3_service):
+    import io
+    import pandas as pd
+    mock_s3 = MagicMock()
+    s3_service.s3 = mock_s3
+    df = pd.DataFrame({"title": ["A"], "imdbvotes": pd.array([1000], dtype="Int64")})
+
+    s3_service.save_parquet("bucket", "key.parquet", df)
+
+    kwargs = mock_s3.put_object.call_args.kwargs
+    assert kwargs["ContentType"] == "application/vnd.apache.parquet"
+    stored = pd.read_parquet(io.BytesIO(kwargs["Body"]))
+    assert stored["imdbvotes"].tolist() == [1000]
+    assert str(stored["imdbvotes"].dtype) == "Int64"
@@ -0,0 +1,49 @@
+import pandas as pd
+from lambdas.process_bronze_to_silver.src.schema import (
+    apply_schema, parse_integer, parse_decimal, parse_year, parse_date
+)
+
+def test_parse_integer_strips_formatting():
+    series = pd.Series(["1,234,567", "$292,576,195", "130 min", "N/A", None, 7])
+
+    assert parse_integer(series).tolist() == [1234567, 292576195, 130, pd.NA, pd.NA, 7]
+    assert str(parse_integer(series).dtype) == "Int64"
+
+def test_parse_decimal():
+    result = parse_decimal(pd.Series(["9.3", "N/A", 8.5]))
+
+    assert result.dtype == "float64"
+    assert result[0] == 9.3 and pd.isna(result[1]) and result[2] == 8.5
+
+def test_parse_year_takes_first_year_of_a_range():
+    assert parse_year(pd.Series(["1994", "2008–2013", "N/A", 1972])).tolist() == [1994, 2008, pd.NA, 1972]
+
+def test_parse_date():
+    result = parse_date(pd.Series(["07 Jan 1947", "N/A", None]))
+
+    assert result[0] == pd.Timestamp("1947-01-07")
+    assert result[1:].isna().all()
+
+def test_apply_schema_leaves_other_columns_alone():
+    df = pd.DataFrame({
+        "title": ["The Godfather"], "imdbvotes": ["2,000,000"], "boxoffice": ["$134,966,411"],
+        "runtime": ["175 min"], "released": ["24 Mar 1972"], "imdbrating": ["9.2"], "metascore": ["100"]
+    })
+
+    result = apply_schema(df)
+
+    assert result.loc[0, "title"] == "The Godfather"
+    assert result.loc[0, "imdbvotes"] == 2000000
+    assert result.loc[0, "boxoffice"] == 134966411
+    assert result.loc[0, "runtime"] == 175
+    assert result.loc[0, "released"] == pd.Timestamp("1972-03-24")
+    assert result.loc[0, "imdbrating"] == 9.2
+    assert result.loc[0, "metascore"] == 100
+
+def test_apply_schema_complete_adds_text_columns():
+    result = apply_schema(pd.DataFrame({"title": ["One"], "rank": ["1"]}), complete=True)
+
+    assert {"genre", "director", "language", "country", "awards"} <= set(result.columns)
+    assert str(result["genre"].dtype) == "string"
+    assert result["genre"].isna().all()
+    assert result.loc[0, "title"] == "One"
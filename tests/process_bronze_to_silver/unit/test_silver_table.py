@@ -0,0 +1,64 @@
+import pandas as pd
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from lambdas.process_bronze_to_silver.src.silver_table import SilverTable
+
+def at(second):
+    return datetime(2025, 7, 22, 3, 0, second, tzinfo=timezone.utc)
+
+def make_table(state=None):
+    s3 = MagicMock()
+    s3.load_json_if_exists.return_value = state
+    table = SilverTable(s3, "silver-bucket")
+    table.load_state()
+    return table
+
+def test_first_run_takes_every_object_oldest_first():
+    table = make_table()
+    objects = [{"Key": "bronze/2025-07-22/b.ndjson", "LastModified": at(2)},
+               {"Key": "bronze/2025-07-21/a.ndjson", "LastModified": at(1)}]
+
+    assert table.list_start("2025-07-22") == "bronze/2025-07-22/"
+    assert [obj["Key"] for obj in table.newer_than_watermark(objects)] == [
+        "bronze/2025-07-21/a.ndjson", "bronze/2025-07-22/b.ndjson"
+    ]
+
+def test_watermark_skips_processed_objects_including_ones_from_the_same_second():
+    table = make_table()
+    table.advance_watermark([{"Key": "bronze/2025-07-22/a.ndjson", "LastModified": at(1)}])
+    objects = [{"Key": "bronze/2025-07-22/a.ndjson", "LastModified": at(1)},
+               {"Key": "bronze/2025-07-22/late.ndjson", "LastModified": at(1)},
+               {"Key": "bronze/2025-07-22/old.ndjson", "LastModified": at(0)},
+               {"Key": "bronze/2025-07-23/b.ndjson", "LastModified": at(5)}]
+
+    new = table.newer_than_watermark(objects)
+    table.advance_watermark(new)
+
+    assert [obj["Key"] for obj in new] == ["bronze/2025-07-22/late.ndjson", "bronze/2025-07-23/b.ndjson"]
+    assert table.state["watermark"] == at(5).isoformat()
+    assert table.state["watermark_keys"] == ["bronze/2025-07-23/b.ndjson"]
+    assert table.state["last_date"] == "2025-07-23"
+    assert table.list_start("2025-07-24") == "bronze/2025-07-23/"
+
+def test_upsert_points_movies_at_their_newest_file():
+    table = make_table()
+    first = table.upsert("2025-07-21", pd.DataFrame({"imdbid": ["tt1", "tt2"]}), ["bronze/2025-07-21/a.ndjson"])
+    second = table.upsert("2025-07-22", pd.DataFrame({"imdbid": ["tt2"]}), ["bronze/2025-07-22/b.ndjson"])
+
+    assert first.startswith("silver/movies/date=2025-07-21/part-") and first.endswith(".parquet")
+    assert table.state["movies"] == {
+        "tt1": {"date": "2025-07-21", "key": first},
+        "tt2": {"date": "2025-07-22", "key": second}
+    }
+    assert table.s3.save_parquet.call_count == 2
+
+def test_retain_drops_movies_that_left_the_run():
+    table = make_table({"watermark": None, "watermark_keys": [], "last_date": "2025-07-22", "movies": {
+        "tt1": {"date": "2025-07-21", "key": "a"},
+        "tt2": {"date": "2025-07-21", "key": "a"},
+        "tt3": {"date": "2025-07-22", "key": "b"}
+    }})
+
+    assert table.retain("2025-07-21", set()) == 0
+    assert table.retain("2025-07-22", {"tt1"}) == 1
+    assert set(table.state["movies"]) == {"tt1", "tt3"}
@@ -31,3 +31,109 @@ def test_lambda_handler_success(environment_variables, s3_buckets):
     response = s3_client.get_object(Bucket=target_bucket, Key="gold/topN_rated.csv")
     stored_data = response['Body'].read().decode('utf-8')
     assert "Test Movie" in stored_data
+
+@mock_aws
+def test_lambda_handler_reads_parquet(environment_variables, s3_buckets):
+    import io
+    import os
+    import pandas as pd
+    from unittest.mock import patch
+    s3_client = s3_buckets['s3_client']
+
+    silver = pd.DataFrame({
+        "id": ["tt1234567", "tt7654321"], "title": ["Test Movie", "Other Movie"], "rank": [1, 2],
+        "year": [2025, 2024], "imdbrating": [8.5, 7.0], "imdbratingcount": [100000, 5000],
+        "released": pd.to_datetime(["2025-07-22", "2024-01-01"]), "runtime": [120, 95], "genre": ["Action", "Drama"],
+        "director": ["John Doe", "Jane Doe"], "language": ["English", "English"], "country": ["USA", "UK"],
+        "awards": [None, None], "metascore": [75, None], "imdbvotes": [50000, 1000], "boxoffice": [100000000, None],
+        "plot": ["not needed by gold", "not needed by gold"]
+    }).astype({"metascore": "Int64", "boxoffice": "Int64"})
+    buffer = io.BytesIO()
+    silver.to_parquet(buffer, index=False)
+    s3_client.put_object(Bucket=s3_buckets['source_bucket'], Key="silver/movies_normalized.parquet", Body=buffer.getvalue())
+
+    with patch.dict(os.environ, {'SILVER_FORMAT': 'parquet'}):
+        import lambdas.process_silver_to_gold.process_silver_to_gold as process_module
+        importlib.reload(process_module)
+        result = process_module.lambda_handler({}, None)
+
+    assert result["statusCode"] == 200
+    assert "Processed 2 films from silver to gold." in result["body"]
+    response = s3_client.get_object(Bucket=s3_buckets['target_bucket'], Key="gold/box_office_per_year.csv")
+    assert response['Body'].read().decode('utf-8').splitlines()[1:] == ["2025,100000000", "2024,0"]
+    response = s3_client.get_object(Bucket=s3_buckets['target_bucket'], Key="gold/topN_rated.csv")
+    assert "plot" not in response['Body'].read().decode('utf-8').splitlines()[0]
+
+@mock_aws
+def test_lambda_handler_reads_current_rows_of_incremental_table(environment_variables, s3_buckets):
+    import io
+    import os
+    import pandas as pd
+    from unittest.mock import patch
+    s3_client = s3_buckets['s3_client']
+
+    def put_partition(key, rows):
+        df = pd.DataFrame(rows)
+        for column in ["imdbratingcount", "released", "runtime", "genre", "director", "language", "awards",
+                       "metascore", "imdbvotes"]:
+            df[column] = None
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        s3_client.put_object(Bucket=s3_buckets['source_bucket'], Key=key, Body=buffer.getvalue())
+
+    movie = {"title": "One", "rank": 1, "year": 1994, "imdbrating": 9.0, "country": "USA"}
+    put_partition("silver/movies/date=2025-07-21/part-a.parquet", [
+        {**movie, "imdbid": "tt1", "boxoffice": 100},
+        {**movie, "imdbid": "tt2", "rank": 2, "boxoffice": 200},
+        {**movie, "imdbid": "tt3", "rank": 3, "boxoffice": 300}
+    ])
+    put_partition("silver/movies/date=2025-07-22/part-b.parquet", [{**movie, "imdbid": "tt2", "rank": 2, "boxoffice": 250}])
+    s3_client.put_object(Bucket=s3_buckets['source_bucket'], Key="silver/movies/_state.json", Body=json.dumps({
+        "movies": {
+            "tt1": {"date": "2025-07-21", "key": "silver/movies/date=2025-07-21/part-a.parquet",
+                    "feed": {"rank": 7, "title": "One"}},
+            "tt2": {"date": "2025-07-22", "key": "silver/movies/date=2025-07-22/part-b.parquet"}
+        }
+    }))
+
+    with patch.dict(os.environ, {'SILVER_MODE': 'incremental'}):
+        import lambdas.process_silver_to_gold.process_silver_to_gold as process_module
+        importlib.reload(process_module)
+        result = process_module.lambda_handler({}, None)
+    importlib.reload(process_module)
+
+    assert result["statusCode"] == 200
+    assert "Processed 2 films from silver to gold." in result["body"]
+    response = s3_client.get_object(Bucket=s3_buckets['target_bucket'], Key="gold/box_office_per_year.csv")
+    assert response['Body'].read().decode('utf-8').splitlines()[1:] == ["1994,350"]
+    response = s3_client.get_object(Bucket=s3_buckets['target_bucket'], Key="gold/topN_rated.csv")
+    assert [line.split(",")[0] for line in response['Body'].read().decode('utf-8').splitlines()[1:]] == ["7", "2"]
+
+@mock_aws
+def test_lambda_handler_reads_partition_without_omdb_fields(environment_variables, s3_buckets):
+    import io
+    import os
+    import pandas as pd
+    from unittest.mock import patch
+    s3_client = s3_buckets['s3_client']
+
+    # Only the feed's fields: every movie in this partition came back from OMDb empty.
+    buffer = io.BytesIO()
+    pd.DataFrame([
+        {"imdbid": "tt1", "rank": 1, "title": "One", "year": 1994, "imdbratingcount": 10},
+        {"imdbid": "tt2", "rank": 2, "title": "Two", "year": 1972, "imdbratingcount": 20}
+    ]).to_parquet(buffer, index=False)
+    key = "silver/movies/date=2025-07-21/part-a.parquet"
+    s3_client.put_object(Bucket=s3_buckets['source_bucket'], Key=key, Body=buffer.getvalue())
+    s3_client.put_object(Bucket=s3_buckets['source_bucket'], Key="silver/movies/_state.json", Body=json.dumps({
+        "movies": {"tt1": {"date": "2025-07-21", "key": key}, "tt2": {"date": "2025-07-21", "key": key}}
+    }))
+
+    with patch.dict(os.environ, {'SILVER_MODE': 'incremental'}):
+        import lambdas.process_silver_to_gold.process_silver_to_gold as process_module
+        importlib.reload(process_module)
+        result = process_module.lambda_handler({}, None)
+    importlib.reload(process_module)
+
+    assert result["statusCode"] == 200
+    assert "Processed 2 films from silver to gold." in result["body"]
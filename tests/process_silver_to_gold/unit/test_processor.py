@@ -21,7 +21,7 @@ def test_process_success(processor, mock_s3_service):
         'year': [2020, 2021, 2022],
         'imdbratingcount': [1000, 2000, 3000],
         'released': ['2020-01-01', '2021-01-01', '2022-01-01'],
-        'runtime': ['120 min', '130 min', '140 min'],
+        'runtime': [120, 130, 140],
         'genre': ['Action, Drama', 'Comedy', 'Horror'],
         'director': ['Director1', 'Director2', 'Director3'],
         'language': ['English', 'Spanish', 'French'],
@@ -29,7 +29,7 @@ def test_process_success(processor, mock_s3_service):
         'awards': ['None', 'Oscar', 'Golden Globe'],
         'metascore': [80, 85, 90],
         'imdbvotes': [10000, 20000, 30000],
-        'boxoffice': ['$1,000,000', '$2,000,000', '$3,000,000']
+        'boxoffice': [1000000, 2000000, None]
     })
     mock_s3_service.load_csv.return_value = mock_df
 
@@ -37,6 +37,8 @@ def test_process_success(processor, mock_s3_service):
 
     assert record_count == 3
     mock_s3_service.save_csv.assert_called()
+    saved = {c[0][1]: c[0][2] for c in mock_s3_service.save_csv.call_args_list}
+    assert saved["gold/box_office_per_year.csv"].splitlines()[1:] == ["2022,0", "2021,2000000", "2020,1000000"]
 
 def test_process_empty_csv(processor, mock_s3_service):
     mock_df = MagicMock()
@@ -45,3 +47,20 @@ def test_process_empty_csv(processor, mock_s3_service):
 
     with pytest.raises(Exception, match="No data to process, empty csv file!"):
         processor.process("silver/movies_normalized.csv")
+
+def test_overlay_feed_replaces_only_feed_columns_and_keeps_dtypes(processor):
+    df = pd.DataFrame({
+        "imdbid": ["tt1", "tt2"], "rank": [1, 2], "title": ["One", "Two"], "year": [1999, 2001],
+        "imdbrating": [8.1, 7.5], "imdbratingcount": [1000, 2000]
+    })
+    feed = {"tt1": {"rank": 7, "imdbratingcount": 1016, "title": "Movie 1", "year": 2000, "imdbrating": 9.0}}
+
+    result = processor.overlay_feed(df, feed)
+
+    assert result["rank"].tolist() == [7, 2]
+    assert result["imdbratingcount"].tolist() == [1016, 2000]
+    assert result["title"].tolist() == ["One", "Two"]
+    assert result["imdbrating"].tolist() == [8.1, 7.5]
+    assert str(result["year"].dtype) == "int64"
+    assert str(result["imdbratingcount"].dtype) == "int64"
+    assert result.to_csv(index=False).splitlines()[1] == "tt1,7,One,1999,8.1,1016"
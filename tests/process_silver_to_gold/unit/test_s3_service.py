@@ -31,3 +31,33 @@ def test_save_csv(s3_service):
         Body=b"csv_data",
         ContentType="text/csv"
     )
+
+def test_load_parquet_reads_only_requested_columns(s3_service):
+    import io
+    import pandas as pd
+    buffer = io.BytesIO()
+    pd.DataFrame({"title": ["A"], "year": [1994], "plot": ["long text"]}).to_parquet(buffer, index=False)
+    mock_s3 = MagicMock()
+    mock_s3.get_object.return_value = {"Body": MagicMock(read=lambda: buffer.getvalue())}
+    s3_service.s3 = mock_s3
+
+    result = s3_service.load_parquet("bucket", "key.parquet", columns=["title", "year"])
+
+    assert list(result.columns) == ["title", "year"]
+    assert result.loc[0, "year"] == 1994
+
+
+def test_load_parquet_fills_missing_columns(s3_service):
+    import io
+    import pandas as pd
+    buffer = io.BytesIO()
+    pd.DataFrame({"title": ["A"], "year": [1994]}).to_parquet(buffer, index=False)
+    mock_s3 = MagicMock()
+    mock_s3.get_object.return_value = {"Body": MagicMock(read=lambda: buffer.getvalue())}
+    s3_service.s3 = mock_s3
+
+    result = s3_service.load_parquet("bucket", "key.parquet", columns=["title", "genre", "year"])
+
+    assert list(result.columns) == ["title", "genre", "year"]
+    assert result["genre"].isna().all()
+    assert result.loc[0, "year"] == 1994